@@ -22,6 +22,10 @@ def parse_args():
         "--file_name", default="train_data.csv", type=str, help="train file name"
     )
 
+    parser.add_argument(
+        "--elo_state_dir", default=None, type=str, help="Elo snapshot directory (None : 매번 전체 추정)"
+    )
+
     parser.add_argument(
         "--model_dir", default="models/", type=str, help="model directory"
     )
@@ -64,10 +68,36 @@ def parse_args():
     parser.add_argument("--stride", default=50, type=int, help="stride")
     parser.add_argument("--shuffle_n", default=3, type=int, help="number of shuffle")
 
+    # categorical featurs
+    parser.add_argument('--cate_feats', type=str, nargs="+",
+                        default=["assessmentItemID",
+                                 "testId",
+                                 "KnowledgeTag",
+                                 "big",
+                                 "past_correct",
+                                 "same_item_cnt",
+                        ],
+                        help="category features")
+
+    # continous featurs
+    parser.add_argument('--conti_feats', type=str, nargs="+",
+                        default=["ass_aver",
+                                 "user_aver",
+                                 "problem_id_mean",
+                                 "month_mean",
+                                 "elo",
+                        ],
+                        help="numeric features")
+
     # k-fold
     parser.add_argument("--split", default="user", type=str, help="data split strategy")
     parser.add_argument("--n_splits", default=5, type=str, help="number of k-fold splits")
 
     args = parser.parse_args()
 
+    # Saint 는 비율 feature (ass_aver, user_aver, problem_id_mean, month_mean, elo) 도 0~100 code 의 embedding 으로 사용
+    if args.model == "Saint":
+        args.cate_feats = args.cate_feats + args.conti_feats
+        args.conti_feats = []
+
     return args
@@ -44,7 +44,8 @@ class LSTM(nn.Module):
 
     def forward(self, input):
 
-        test, question, tag, _, mask, interaction = input
+        cate, _, mask, interaction, _ = input
+        test, question, tag = cate["testId"], cate["assessmentItemID"], cate["KnowledgeTag"]
 
         batch_size = interaction.size(0)
 
@@ -86,22 +87,19 @@ class LSTMATTN(nn.Module):
         # Embedding
         # interaction은 현재 correct로 구성되어있다. correct(1, 2) + padding(0)
         self.embedding_interaction = nn.Embedding(3, self.hidden_dim // 3)
-        self.embedding_test = nn.Embedding(self.args.n_test + 1, self.hidden_dim // 3)
-        self.embedding_question = nn.Embedding(self.args.n_questions + 1, self.hidden_dim // 3)
-        self.embedding_tag = nn.Embedding(self.args.n_tag + 1, self.hidden_dim // 3)
-        #self.embedding_ass_aver = nn.Embedding(self.args.n_ass_aver, self.hidden_dim // 3)
-        #self.embedding_user_aver = nn.Embedding(self.args.n_user_aver, self.hidden_dim // 3)
-        self.embedding_big = nn.Embedding(self.args.n_big + 1, self.hidden_dim // 3)
-        self.embedding_past_correct = nn.Embedding(self.args.n_past_correct + 1, self.hidden_dim // 3)
-        self.embedding_same_item_cnt = nn.Embedding(self.args.n_same_item_cnt + 1, self.hidden_dim // 3)
-        #self.embedding_problem_id_mean = nn.Embedding(self.args.n_problem_id_mean, self.hidden_dim // 3)
-        #self.embedding_month_mean = nn.Embedding(self.args.n_month_mean, self.hidden_dim // 3)
-        #self.embedding_elo = nn.Embedding(self.args.n_elo, self.hidden_dim // 3)
+        # category feature (args.cate_feats) 마다 embedding
+        self.embedding_cate = nn.ModuleDict(
+            {
+                col: nn.Embedding(num + 1, self.hidden_dim // 3)
+                for col, num in args.n_embeddings.items()
+            }
+        )
 
 
         # embedding combination projection
-        self.comb_proj_cont = nn.Linear(5, self.hidden_dim)
-        self.comb_proj_cate = nn.Linear((self.hidden_dim // 3) * 7, self.hidden_dim)
+        # continuous feature (args.conti_feats) 는 그대로 이어 붙여서 projection
+        self.comb_proj_cont = nn.Linear(len(args.conti_loc), self.hidden_dim)
+        self.comb_proj_cate = nn.Linear((self.hidden_dim // 3) * (len(args.cate_loc) + 1), self.hidden_dim)
         self.comb_proj = nn.Linear(self.hidden_dim * 2, self.hidden_dim)
         # self.cont_col = [5,6,10,11,12]
         # self.n_cont = len(self.cont_col)
@@ -129,56 +127,14 @@ class LSTMATTN(nn.Module):
         self.activation = nn.Sigmoid()
 
     def forward(self, input):
-        #test, question, tag, _, mask, interaction = input
-        #print(input)
-        #test, question, tag, _, mask, interaction, ass_aver, user_aver= input  
-        #print(input)
-        (test, question, tag, _, mask, ass_aver, user_aver, big, 
-        past_correct, same_item_cnt, problem_id_mean, 
-        month_mean, elo,interaction)= input  
+        cate, conti, mask, interaction, _ = input
 
         batch_size = interaction.size(0)
 
         # Embedding
         embed_interaction = self.embedding_interaction(interaction)
-        embed_test = self.embedding_test(test)
-        embed_question = self.embedding_question(question)
-        embed_tag = self.embedding_tag(tag)
-        #embed_ass_aver = self.embedding_ass_aver(ass_aver)
-        #embed_user_aver = self.embedding_user_aver(user_aver)
-        embed_big = self.embedding_big(big)
-        embed_past_correct = self.embedding_past_correct(past_correct)
-        embed_same_item_cnt = self.embedding_same_item_cnt(same_item_cnt)
-        #embed_problem_id_mean = self.embedding_problem_id_mean(problem_id_mean)
-        #embed_month_mean = self.embedding_month_mean(month_mean)
-        #embed_elo = self.embedding_elo(elo)
-
-        # print(embed_interaction.shape)
-        # print(embed_test.shape)
-        # print(embed_question.shape)
-        # print(embed_tag.shape)
-        # print(embed_ass_aver.shape)
-        # print(embed_user_aver.shape)
-
-        embed_cate = torch.cat(
-            [
-                #["ass_aver", "user_aver", "problem_id_mean", "month_mean", "elo" ]
-                embed_interaction,
-                embed_test,
-                embed_question,
-                embed_tag,
-                #embed_ass_aver,
-                #embed_user_aver,
-                embed_big,
-                embed_past_correct,
-                embed_same_item_cnt,
-                #embed_problem_id_mean,
-                #embed_month_mean,
-                #embed_elo
-
-            ],
-            2,
-        )
+        embed_cate = [embedding(cate[col]) for col, embedding in self.embedding_cate.items()]
+        embed_cate = torch.cat([embed_interaction] + embed_cate, 2)
 
 
         embed_cate = self.comb_proj_cate(embed_cate)
@@ -212,15 +168,7 @@ class LSTMATTN(nn.Module):
 
         #embed_cont = self.embedding_cont(cont)  
 
-        contin = torch.stack([
-        ass_aver,
-        user_aver,
-        problem_id_mean,
-        month_mean,
-        elo,
-        ],
-        2,
-    )
+        contin = torch.stack(list(conti.values()), 2)
         contin_layer = self.comb_proj_cont(contin)
         norm_contin = self.norm(contin_layer)
 
@@ -286,7 +234,8 @@ class Bert(nn.Module):
         self.activation = nn.Sigmoid()
 
     def forward(self, input):
-        test, question, tag, _, mask, interaction = input
+        cate, _, mask, interaction, _ = input
+        test, question, tag = cate["testId"], cate["assessmentItemID"], cate["KnowledgeTag"]
         batch_size = interaction.size(0)
 
         # 신나는 embedding
@@ -352,27 +301,24 @@ class Saint(nn.Module):
         
         ### Embedding 
         # ENCODER embedding
-        self.embedding_test = nn.Embedding(self.args.n_test + 1, self.hidden_dim//3)
-        self.embedding_question = nn.Embedding(self.args.n_questions + 1, self.hidden_dim//3)
-        self.embedding_tag = nn.Embedding(self.args.n_tag + 1, self.hidden_dim//3)
-        self.embedding_ass_aver = nn.Embedding(self.args.n_ass_aver + 1, self.hidden_dim // 3)
-        self.embedding_user_aver = nn.Embedding(self.args.n_user_aver + 1, self.hidden_dim // 3)
-        self.embedding_big = nn.Embedding(self.args.n_big + 1, self.hidden_dim // 3)
-        self.embedding_past_correct = nn.Embedding(self.args.n_past_correct + 1, self.hidden_dim // 3)
-        self.embedding_same_item_cnt = nn.Embedding(self.args.n_same_item_cnt + 1, self.hidden_dim // 3)
-        self.embedding_problem_id_mean = nn.Embedding(self.args.n_problem_id_mean + 1, self.hidden_dim // 3)
-        self.embedding_month_mean = nn.Embedding(self.args.n_month_mean + 1, self.hidden_dim // 3)
-        self.embedding_elo = nn.Embedding(self.args.n_elo + 1, self.hidden_dim // 3)
+        # feature (args.cate_feats) 마다 embedding. ass_aver 등 비율 feature 도 0~100 code 로 cate_feats 에 포함 (args.py)
+        self.embedding_cate = nn.ModuleDict(
+            {
+                col: nn.Embedding(num + 1, self.hidden_dim // 3)
+                for col, num in args.n_embeddings.items()
+            }
+        )
+        n_embed = len(args.cate_loc)
         
         # encoder combination projection
-        self.enc_comb_proj = nn.Linear((self.hidden_dim//3)*11, self.hidden_dim)
+        self.enc_comb_proj = nn.Linear((self.hidden_dim//3)*n_embed, self.hidden_dim)
 
         # DECODER embedding
         # interaction은 현재 correct으로 구성되어있다. correct(1, 2) + padding(0)
         self.embedding_interaction = nn.Embedding(3, self.hidden_dim//3)
         
         # decoder combination projection
-        self.dec_comb_proj = nn.Linear((self.hidden_dim//3)*12, self.hidden_dim)
+        self.dec_comb_proj = nn.Linear((self.hidden_dim//3)*(n_embed + 1), self.hidden_dim)
 
         # Positional encoding
         self.pos_encoder = PositionalEncoding(self.hidden_dim, self.dropout, self.args.max_seq_len)
@@ -396,75 +342,26 @@ class Saint(nn.Module):
         self.enc_dec_mask = None
     
     def get_mask(self, seq_len):
-        mask = torch.from_numpy(np.triu(np.ones((seq_len, seq_len)), k=1))
+        mask = torch.from_numpy(np.triu(np.ones((seq_len, seq_len), dtype=np.float32), k=1))
 
         return mask.masked_fill(mask==1, float('-inf'))
 
     def forward(self, input):
-        #test, question, tag, _, mask, interaction, _ = input
-        (test, question, tag, _, mask, ass_aver, user_aver, big, 
-        past_correct, same_item_cnt, problem_id_mean, 
-        month_mean, elo, interaction)= input  
+        cate, conti, mask, interaction, _ = input
 
         batch_size = interaction.size(0)
         seq_len = interaction.size(1)
 
         # 신나는 embedding
         # ENCODER
-        embed_test = self.embedding_test(test)
-        embed_question = self.embedding_question(question)
-        embed_tag = self.embedding_tag(tag)
-        embed_ass_aver = self.embedding_ass_aver(ass_aver)
-        embed_user_aver = self.embedding_user_aver(user_aver)
-        embed_big = self.embedding_big(big)
-        embed_past_correct = self.embedding_past_correct(past_correct)
-        embed_same_item_cnt = self.embedding_same_item_cnt(same_item_cnt)
-        embed_problem_id_mean = self.embedding_problem_id_mean(problem_id_mean)
-        embed_month_mean = self.embedding_month_mean(month_mean)
-        embed_elo = self.embedding_elo(elo)
-
-        embed_enc = torch.cat([embed_test,
-                               embed_question,
-                               embed_tag,
-                               embed_ass_aver,
-                               embed_user_aver,
-                               embed_big,
-                               embed_past_correct,
-                               embed_same_item_cnt,
-                               embed_problem_id_mean,
-                               embed_month_mean,
-                               embed_elo
-                               ], 2)                             
+        embed_feats = [embedding(cate[col]) for col, embedding in self.embedding_cate.items()]
 
+        embed_enc = torch.cat(embed_feats, 2)
         embed_enc = self.enc_comb_proj(embed_enc)
         
         # DECODER     
-        embed_test = self.embedding_test(test)
-        embed_question = self.embedding_question(question)
-        embed_tag = self.embedding_tag(tag)
         embed_interaction = self.embedding_interaction(interaction)
-        embed_ass_aver = self.embedding_ass_aver(ass_aver)
-        embed_user_aver = self.embedding_user_aver(user_aver)
-        embed_big = self.embedding_big(big)
-        embed_past_correct = self.embedding_past_correct(past_correct)
-        embed_same_item_cnt = self.embedding_same_item_cnt(same_item_cnt)
-        embed_problem_id_mean = self.embedding_problem_id_mean(problem_id_mean)
-        embed_month_mean = self.embedding_month_mean(month_mean)
-        embed_elo = self.embedding_elo(elo)
-
-        embed_dec = torch.cat([embed_test,
-                               embed_question,
-                               embed_tag,
-                               embed_interaction,
-                               embed_ass_aver,
-                               embed_user_aver,
-                               embed_big,
-                               embed_past_correct,
-                               embed_same_item_cnt,
-                               embed_problem_id_mean,
-                               embed_month_mean,
-                               embed_elo
-                               ], 2)
+        embed_dec = torch.cat(embed_feats + [embed_interaction], 2)
 
         embed_dec = self.dec_comb_proj(embed_dec)
 
@@ -2,22 +2,13 @@ import math
 import os
 
 import torch
-<<<<<<< HEAD:code/LSTM_attention/src/trainer.py
 #import wandb
-=======
-import numpy as np
-import wandb
->>>>>>> 28ab840b4d3f51ec2247dbb31d544f5266139876:code/dkt/src/trainer.py
 import gc
 
 from .criterion import get_criterion
 from .dataloader import get_loaders, data_augmentation
 from .metric import get_metric
-<<<<<<< HEAD:code/LSTM_attention/src/trainer.py
 from .model import LSTM, LSTMATTN, Bert, Saint
-=======
-from .model import LSTM, LSTMATTN, Bert, LastQuery
->>>>>>> 28ab840b4d3f51ec2247dbb31d544f5266139876:code/dkt/src/trainer.py
 from .optimizer import get_optimizer
 from .scheduler import get_scheduler
 from .dataloader import get_loaders, data_augmentation
@@ -31,21 +22,7 @@ def run(args, train_data, valid_data, model, kf_auc, kf_n=0):
     augmented_train_data = data_augmentation(train_data, args)
     train_data = augmented_train_data
 
-<<<<<<< HEAD:code/LSTM_attention/src/trainer.py
     train_loader, valid_loader = get_loaders(args, train_data, valid_data)
-=======
-def run(args, train_data, valid_data, model, kf_auc, kf_n=0):
-    torch.cuda.empty_cache()
-    gc.collect()
-
-    # data augmentation
-    augmented_train_data = data_augmentation(train_data, args)
-    if len(augmented_train_data) != len(train_data):
-        print(f"Data Augmentation applied. Train data {len(train_data)} -> {len(augmented_train_data)}\n")
-
-    # train_loader, valid_loader = get_loaders(args, train_data, valid_data)
-    train_loader, valid_loader = get_loaders(args, augmented_train_data, valid_data)
->>>>>>> 28ab840b4d3f51ec2247dbb31d544f5266139876:code/dkt/src/trainer.py
 
     # only when using warmup scheduler
     args.total_steps = int(math.ceil(len(train_loader.dataset) / args.batch_size)) * (
@@ -171,25 +148,17 @@ def validate(valid_loader, model, args):
     total_preds = []
     total_targets = []
     for step, batch in enumerate(valid_loader):
-<<<<<<< HEAD:code/LSTM_attention/src/trainer.py
         # print('#####################################################')
         # print('batch.shape : ')
         # print(batch.shape)
-        input = list(map(lambda t: t.to(args.device), process_batch(batch)))
+        input = process_batch(batch, args)
         #print(input.columns)
         # print('input.shape : ')
         # print(input.shape)
         #input = process_batch(batch)
         
-        preds = model(input)
-        targets = input[3]  # correct
-        #targets = input[-1]
-=======
-        input = process_batch(batch, args)
-
         preds = model(input)
         targets = input[-1]  # correct
->>>>>>> 28ab840b4d3f51ec2247dbb31d544f5266139876:code/dkt/src/trainer.py
 
         # predictions
         preds = preds[:, -1]
@@ -210,38 +179,22 @@ def validate(valid_loader, model, args):
 
 
 def inference(args, test_data, model):
-    model = load_model(args)
     model.eval()
     _, test_loader = get_loaders(args, None, test_data)
 
     total_preds = []
 
     for step, batch in enumerate(test_loader):
-<<<<<<< HEAD:code/LSTM_attention/src/trainer.py
-        input = list(map(lambda t: t.to(args.device), process_batch(batch)))
-        #input = process_batch(batch)
-=======
         input = process_batch(batch, args)
-
->>>>>>> 28ab840b4d3f51ec2247dbb31d544f5266139876:code/dkt/src/trainer.py
         preds = model(input)
 
         # predictions
         preds = preds[:, -1]
-<<<<<<< HEAD:code/LSTM_attention/src/trainer.py
         preds = torch.nn.Sigmoid()(preds)
         preds = preds.cpu().detach().numpy()
         total_preds += list(preds)
 
     write_path = os.path.join(args.output_dir, "attention_last_2.csv")
-=======
-        # preds = torch.nn.Sigmoid()(preds)
-        preds = preds.cpu().detach().numpy()
-        total_preds += list(preds)
-
-    write_path = os.path.join(args.output_dir, f"submission_{args.model_name}.csv")
-
->>>>>>> 28ab840b4d3f51ec2247dbb31d544f5266139876:code/dkt/src/trainer.py
     if not os.path.exists(args.output_dir):
         os.makedirs(args.output_dir)
     with open(write_path, "w", encoding="utf8") as w:
@@ -260,58 +213,26 @@ def get_model(args):
         model = LSTMATTN(args)
     if args.model == "bert":
         model = Bert(args)
-<<<<<<< HEAD:code/LSTM_attention/src/trainer.py
     if args.model == "Saint":
         model = Saint(args)  
-=======
-    if args.model == "lastquery":
-        model = LastQuery(args)
-
->>>>>>> 28ab840b4d3f51ec2247dbb31d544f5266139876:code/dkt/src/trainer.py
 
     return model
 
 # 배치 전처리
-<<<<<<< HEAD:code/LSTM_attention/src/trainer.py
-def process_batch(batch):
-    
-    (test, question, tag, correct, ass_aver, user_aver, big, 
-    past_correct, same_item_cnt, problem_id_mean ,
-    month_mean, elo,mask) = batch
-    # print('#################################')
-    # print(test)
-    # print(question)
-    # print(tag)
-    # print(correct)
-    # print(ass_aver)
-    # print(user_aver)
-    # print(big)
-    # print(past_correct)
-    # print(same_item_cnt)
-    # print(problem_id_mean)
-    # print(month_mean)
-    # print(elo)
-    # print(mask)
-    # print('########################################################')
-    # print('print batch : ')
-    # print(batch)
-    #test, question, tag, correct, cls, mask = batch
-    
-=======
 def process_batch(batch, args):
+    """ collate 결과를 args.columns 위치 기준으로 꺼내서 model 입력으로 변환한다.
 
+    - category feature : padding 을 위해 1을 더하고 int 로 변환
+    - continuous feature : 1을 더하고 float 로 변환
+    feature 는 args.cate_loc / args.conti_loc 순서의 {column 이름 : tensor} dict 로 넘기므로
+    --cate_feats / --conti_feats 에 column 을 추가해도 이 함수와 model 을 고치지 않아도 된다.
+    (dkt 와 같은 (cate, conti, mask, interaction, correct) tuple)
+    """
     col = args.columns
 
-    cate_batch =  {col_name : batch[args.cate_loc[col_name]] for col_name in args.cate_loc}
-    conti_batch = {col_name : batch[args.conti_loc[col_name]] for col_name in args.conti_loc}
-
-    correct = batch[col['answerCode']]
-    mask = batch[-1]
-
->>>>>>> 28ab840b4d3f51ec2247dbb31d544f5266139876:code/dkt/src/trainer.py
     # change to float
-    mask = mask.float()
-    correct = correct.float()
+    mask = batch[-1].float()
+    correct = batch[col["answerCode"]].float()
 
     # interaction을 임시적으로 correct를 한칸 우측으로 이동한 것으로 사용
     interaction = correct + 1  # 패딩을 위해 correct값에 1을 더해준다.
@@ -320,40 +241,10 @@ def process_batch(batch, args):
     interaction_mask[:, 0] = 0
     interaction = (interaction * interaction_mask).to(torch.int64)
 
-<<<<<<< HEAD:code/LSTM_attention/src/trainer.py
-    #  test_id, question_id, tag
-    test = ((test + 1) * mask).int()
-    question = ((question + 1) * mask).int()
-    tag = ((tag + 1) * mask).int()
-    ass_aver = ((ass_aver + 1) * mask).float()#.int()
-    user_aver = ((user_aver + 1) * mask).float()#.int()
-    big = ((big + 1) * mask).int()
-    past_correct = ((past_correct + 1) * mask).int()
-    same_item_cnt = ((same_item_cnt + 1) * mask).int()
-    problem_id_mean = ((problem_id_mean + 1) * mask).float()#.int()
-    month_mean = ((month_mean + 1) * mask).float()#.int()
-    elo = ((elo + 1) * mask).float()#.int()
-    #return (test, question, tag, correct, mask, cls, interaction)
-    return (test, question, tag, correct, mask, ass_aver, user_aver,big, 
-            past_correct, same_item_cnt, problem_id_mean, month_mean, elo, interaction)
-=======
-
-    # category type apply + 1, and mask
-    for col_name in cate_batch:
-        cate_batch[col_name] = (cate_batch[col_name] + 1 * mask).to(torch.int64).to(args.device)
-
-    # contiuous type apply mask
-    for col_name in conti_batch:
-        conti_batch[col_name] = (conti_batch[col_name] * mask).to(torch.float32).to(args.device)
-
-    # device memory로 이동
-    correct = correct.to(args.device)
-    mask = mask.to(args.device)
-    interaction = interaction.to(args.device)
-
-    return cate_batch, conti_batch, mask, interaction, correct
-    
->>>>>>> 28ab840b4d3f51ec2247dbb31d544f5266139876:code/dkt/src/trainer.py
+    cate = {c: ((batch[i] + 1) * mask).int().to(args.device) for c, i in args.cate_loc.items()}
+    conti = {c: ((batch[i] + 1) * mask).float().to(args.device) for c, i in args.conti_loc.items()}
+
+    return cate, conti, mask.to(args.device), interaction.to(args.device), correct.to(args.device)
 
 
 # loss계산하고 parameter update!
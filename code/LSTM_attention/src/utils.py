@@ -13,14 +13,6 @@ def setSeeds(seed=42):
     np.random.seed(seed)
     torch.manual_seed(seed)
     torch.cuda.manual_seed(seed)
-<<<<<<< HEAD:code/LSTM_attention/src/utils.py
-=======
-
-    torch.cuda.manual_seed_all(seed)
-    torch.backends.cudnn.benchmark = False
-    
-    torch.backends.cudnn.deterministic = True
->>>>>>> 28ab840b4d3f51ec2247dbb31d544f5266139876:code/dkt/src/utils.py
     torch.cuda.manual_seed_all(seed)
     torch.backends.cudnn.benchmark = False
     torch.backends.cudnn.deterministic = True
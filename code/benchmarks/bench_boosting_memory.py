@@ -0,0 +1,132 @@
+""" boosting MLModelBase data 준비 memory benchmark
+
+기존 MLModelBase.__init__ 의 train / test 분리 방식(filter copy, 각각 label encoding)과
+src.dataloader.build_model_data (하나의 frame + row 위치 + float32 FEATS matrix) 의
+peak memory 와 시간을 tracemalloc 으로 비교한다.
+feature 생성(FeatureBuilder) 은 두 방식이 같으므로 미리 한번 만들어 두고, 측정은 그 이후 단계만 한다.
+실행 : python benchmarks/bench_boosting_memory.py --rows 2500000  (code/ 에서 실행)
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "boosting")))
+from src.afterprocessing import mapping_cat_to_label
+from src.dataloader import build_model_data
+from src.datasplit import user_split_index
+from src.features import FeatureBuilder
+
+FEATS = ['KnowledgeTag', 'same_item_cnt', 'user_avg', 'item_avg', 'test_avg', 'tag_avg', 'user_time_avg', 'item_time_avg',
+         'test_time_avg', 'tag_time_avg', 'user_current_avg', 'user_current_time_avg', 'hour', 'item_num', 'Bigcat', 'smallcat']
+
+
+def make_data(n_rows, n_users=7442, n_tests=1537, n_tags=912, test_ratio=0.1, seed=42):
+    """ common.ingest.read_interactions 와 같은 dtype 의 synthetic train / test """
+    rng = np.random.default_rng(seed)
+    test_ids = np.array([f"A{i // 100 % 9 + 1}{i:02d}0000{i % 1000:03d}"[:10] for i in range(n_tests)])
+    test_idx = rng.integers(0, n_tests, n_rows)
+    item_ids = pd.Series(test_ids[test_idx]).str[:7] + pd.Series(rng.integers(1, 8, n_rows)).map("{:03d}".format)
+
+    df = pd.DataFrame({
+        "userID": np.sort(rng.integers(0, n_users, n_rows)).astype(np.int32),
+        "assessmentItemID": item_ids.astype("category"),
+        "testId": pd.Series(test_ids[test_idx]).astype("category"),
+        "answerCode": rng.integers(0, 2, n_rows).astype(np.int8),
+        "Timestamp": pd.Timestamp("2020-01-01") + pd.to_timedelta(np.cumsum(rng.integers(1, 120, n_rows)), unit="s"),
+        "KnowledgeTag": rng.integers(0, n_tags, n_rows).astype(np.int32),
+    })
+
+    # 마지막 user 들을 test 로, 각 user 의 마지막 interaction 은 -1
+    is_test = df["userID"] >= int(n_users * (1 - test_ratio))
+    test = df[is_test].reset_index(drop=True)
+    last = test["userID"] != test["userID"].shift(-1)
+    test.loc[last, "answerCode"] = -1
+    return {"train": df[~is_test].reset_index(drop=True), "test": test}
+
+
+def reference_model_data(data, preprocessing_ft, feats):
+    """ 기존 MLModelBase.__init__ 의 data 준비 (test 선택은 is_train==0 으로 바로잡음) """
+    data["train"]["is_train"] = 1
+    data["test"]["is_train"] = 0
+    data["test"]["answerCode"] = data["test"]["answerCode"].replace(-1, np.nan)
+    total_df = pd.concat([data["train"], data["test"]])
+    total_df = preprocessing_ft(total_df)
+    total_df["answerCode"] = total_df["answerCode"].fillna(-1)
+
+    data["train"] = total_df[total_df["is_train"] == 1]
+    data["test"] = total_df[total_df["is_train"] == 0]
+
+    data["train"] = data["train"].drop("is_train", axis=1)
+    data["test"] = data["test"].drop("is_train", axis=1)
+
+    data["train"] = mapping_cat_to_label(data["train"])
+    data["test"] = mapping_cat_to_label(data["test"])
+
+    train_idx, valid_idx = user_split_index(data["train"]['userID'].to_numpy())
+    X, y = data["train"][feats], data["train"]["answerCode"]
+    train_X, y_train, valid_X, y_valid = X.iloc[train_idx], y.iloc[train_idx], X.iloc[valid_idx], y.iloc[valid_idx]
+    test_df = data["test"][data["test"]['userID'] != data["test"]['userID'].shift(-1)]
+    test_X = test_df.drop(['answerCode'], axis=1)[feats]
+    return train_X, y_train, valid_X, y_valid, test_X
+
+
+def make_featured_data(rows, preprocessing_ft):
+    """ feature 를 미리 만든 train / test (측정 시 preprocessing 은 identity) """
+    data = make_data(rows)
+    data["train"]["is_train"] = True
+    data["test"]["is_train"] = False
+    total = preprocessing_ft(pd.concat([data["train"], data["test"]], ignore_index=True))
+    is_train = total.pop("is_train").to_numpy()
+    return {"train": total[is_train].reset_index(drop=True), "test": total[~is_train].reset_index(drop=True)}
+
+
+def result_nbytes(result):
+    """ 학습 / 추론에 넘겨지는 X 들이 유지하는 메모리 """
+    return sum(x.nbytes if isinstance(x, np.ndarray) else x.memory_usage(deep=True).sum() for x in result)
+
+
+def measure(name, func, featured):
+    data = {key: df.copy() for key, df in featured.items()}
+    base = sum(df.memory_usage(deep=True).sum() for df in data.values())
+
+    np.random.seed(42)
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func(data)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"{name:16s} peak {peak / 2**20:8.1f} MiB ({peak / base:.1f}x input), {elapsed:.2f}s")
+    return result
+
+
+def main(args):
+    print(f"rows : {args.rows}")
+    featured = make_featured_data(args.rows, FeatureBuilder(FEATS, cache_dir=None))
+    identity = lambda df: df
+
+    ref = measure("reference", lambda data: reference_model_data(data, identity, FEATS), featured)
+    new = measure("build_model_data", lambda data: build_model_data(data, identity, FEATS), featured)
+
+    ref_X, new_X = (ref[0], ref[2], ref[4]), (new["train_X"], new["valid_X"], new["test_X"])
+    print(f"train / valid / test X : {result_nbytes(ref_X) / 2**20:.1f} MiB -> {result_nbytes(new_X) / 2**20:.1f} MiB")
+
+    # 같은 seed 면 같은 user split
+    assert [len(x) for x in ref_X] == [len(x) for x in new_X]
+    np.testing.assert_array_equal(ref[1].to_numpy(), new["y_train"])
+    np.testing.assert_array_equal(ref[3].to_numpy(), new["y_valid"])
+    assert new["train_X"].dtype == np.float32 and new["train_X"].flags["C_CONTIGUOUS"]
+    print(f"train_X {new['train_X'].shape}, valid_X {new['valid_X'].shape}, test_X {new['test_X'].shape}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", default=2_500_000, type=int, help="number of interactions")
+    main(parser.parse_args())
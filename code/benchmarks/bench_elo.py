@@ -0,0 +1,85 @@
+""" EloEstimator benchmark
+
+기존 dict 기반 elo() loop 와 common.elo.EloEstimator 의 속도 / 결과를 비교한다.
+실행 : python benchmarks/bench_elo.py --rows 2500000  (code/ 에서 실행)
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from common.elo import EloEstimator, njit
+
+
+def make_data(n_rows, n_users=7442, n_items=9454, seed=42):
+    rng = np.random.default_rng(seed)
+    users = np.sort(rng.integers(0, n_users, n_rows))
+    items = np.array([f"A{i:09d}" for i in range(n_items)])[rng.integers(0, n_items, n_rows)]
+    answers = rng.integers(0, 2, n_rows)
+    return users, items, answers
+
+
+def reference_elo(users, items, answers):
+    """ 기존 LSTM_attention / lightgcn_custom 의 elo() 와 같은 dict 기반 구현 """
+
+    def probability_of_good_answer(theta, beta, left_asymptote):
+        return left_asymptote + (1 - left_asymptote) * (1 / (1 + np.exp(-(theta - beta))))
+
+    item_parameters = {i: {"beta": 0, "nb_answers": 0} for i in np.unique(items)}
+    student_parameters = {s: {"theta": 0, "nb_answers": 0} for s in np.unique(users)}
+
+    for student_id, item_id, answered_correctly in zip(users, items, answers):
+        theta = student_parameters[student_id]["theta"]
+        beta = item_parameters[item_id]["beta"]
+        error = answered_correctly - probability_of_good_answer(theta, beta, 0)
+
+        item_parameters[item_id]["beta"] = beta - (
+            1 / (1 + 0.05 * item_parameters[item_id]["nb_answers"])
+        ) * error
+        student_parameters[student_id]["theta"] = theta + max(
+            0.3 / (1 + 0.01 * student_parameters[student_id]["nb_answers"]), 0.04
+        ) * error
+
+        item_parameters[item_id]["nb_answers"] += 1
+        student_parameters[student_id]["nb_answers"] += 1
+
+    return np.array([
+        1 / (1 + np.exp(-(student_parameters[s]["theta"] - item_parameters[i]["beta"])))
+        for s, i in zip(users, items)
+    ])
+
+
+def main(args):
+    users, items, answers = make_data(args.rows)
+    print(f"rows : {args.rows}, numba : {njit is not None}")
+
+    if njit is not None:
+        # jit compile 시간은 측정에서 제외
+        EloEstimator().fit(users[:10], items[:10], answers[:10])
+
+    start = time.perf_counter()
+    prob = EloEstimator().fit_predict(users, items, answers)
+    new_time = time.perf_counter() - start
+    print(f"EloEstimator : {new_time:.2f}s")
+
+    if args.skip_reference:
+        return
+
+    start = time.perf_counter()
+    ref_prob = reference_elo(users, items, answers)
+    ref_time = time.perf_counter() - start
+    print(f"reference    : {ref_time:.2f}s ({ref_time / new_time:.1f}x)")
+
+    max_diff = np.abs(prob - ref_prob).max()
+    print(f"max abs diff : {max_diff:.3e}")
+    assert np.allclose(prob, ref_prob, rtol=1e-9, atol=1e-12)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", default=2_500_000, type=int, help="number of interactions")
+    parser.add_argument("--skip_reference", action="store_true", help="skip the dict based loop")
+    main(parser.parse_args())
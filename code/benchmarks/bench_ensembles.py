@@ -0,0 +1,104 @@
+""" ensembles.Ensemble 앙상블 방법 benchmark
+
+row 마다 np.where / np.average 를 부르는 voting_hard, np.append 로 행렬을 늘려가는 simple_weighted,
+model 쌍마다 pandas boolean 대입을 하는 mixed (기존 구현) 와
+[n_models, n_rows] 예측 행렬 하나에서 masked 평균 / index 선택으로 계산하는 ensembles/ensembles.py 를
+시간과 결과로 비교한다. 합하는 순서가 달라 마지막 자리가 다를 수 있으므로 결과는 atol 1e-12 로 비교한다.
+실행 : python benchmarks/bench_ensembles.py --models 10 --rows 1000000  (code/ 에서 실행)
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "ensembles")))
+from common.submission import write_submission
+from ensembles import Ensemble
+
+
+class OldEnsemble(Ensemble):
+    """ 기존 구현 """
+
+    def simple_weighted(self, weight: list):
+        pred_arr = np.append([self.output_list[0]], [self.output_list[1]], axis=0)
+        for i in range(2, len(self.output_list)):
+            pred_arr = np.append(pred_arr, [self.output_list[i]], axis=0)
+        result = np.dot(pred_arr.T, np.array(weight))
+        return result.tolist()
+
+    def average_weighted(self):
+        weight = [1/len(self.output_list) for _ in range(len(self.output_list))]
+        pred_weight_list = [pred*np.array(w) for pred, w in zip(self.output_list, weight)]
+        result = np.sum(pred_weight_list, axis=0)
+        return result.tolist()
+
+    def mixed(self):
+        result = self.output_df[self.filenames[0]].copy()
+        for idx in range(len(self.filenames)-1):
+            pre_idx = self.filenames[idx]
+            post_idx = self.filenames[idx+1]
+            result[self.output_df[pre_idx] < 1] = self.output_df.loc[self.output_df[pre_idx] < 1, post_idx]
+        return result.tolist()
+
+    def voting_hard(self):
+        result = []
+        output_np = np.array(self.output_list).T
+        row_len = len(output_np[0])
+        for row in output_np[:]:
+            ans = np.where(row > 0.5, 1, 0)
+            if ans.sum() > row_len//2:
+                value = np.average(row[np.where(ans == 1)])
+            elif ans.sum() < row_len//2:
+                value = np.average(row[np.where(ans == 0)])
+            else:
+                value = np.average(row)
+            result.append(value)
+        return result
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main(args):
+    rng = np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        filenames = [f"model_{k}" for k in range(args.models)]
+        for filename in filenames:
+            pred = rng.random(args.rows)
+            # mixed 가 다음 model 로 넘어가는 경우 (1 보다 작은 값) 와 아닌 경우가 섞이도록 일부는 1
+            pred[rng.random(args.rows) < args.one_ratio] = 1.0
+            write_submission(os.path.join(tmp, f"{filename}.csv"), pred)
+
+        old = OldEnsemble(filenames, tmp + "/")
+        new = Ensemble(filenames, tmp + "/")
+    print(f"models : {args.models}, rows : {args.rows}")
+
+    # 2^-20 단위로 맞춰서 np.sum(weight) 가 정확히 1
+    weight = [round(2**20 / args.models) / 2**20] * (args.models - 1)
+    weight.append(1 - sum(weight))
+    for name, call in (("simple_weighted", lambda e: e.simple_weighted(weight)),
+                       ("average_weighted", lambda e: e.average_weighted()),
+                       ("mixed", lambda e: e.mixed()),
+                       ("voting_hard", lambda e: e.voting_hard())):
+        ref, old_time = timed(call, old)
+        res, new_time = timed(call, new)
+        ref, res = np.asarray(ref, dtype=np.float64), np.asarray(res, dtype=np.float64)
+        same = (ref == res).mean()
+        print(f"{name:16s} : {old_time:7.3f}s -> {new_time:6.3f}s ({old_time / new_time:6.1f}x), "
+              f"same rows {same:.6%}, max diff {np.abs(ref - res).max():.1e}")
+        assert np.allclose(ref, res, rtol=0, atol=1e-12), name
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--models", default=10, type=int)
+    parser.add_argument("--rows", default=1_000_000, type=int)
+    parser.add_argument("--one_ratio", default=0.3, type=float, help="ratio of predictions set to 1 (mixed)")
+    main(parser.parse_args())
@@ -0,0 +1,115 @@
+""" group feature kernel benchmark
+
+boosting preprocessing_hyunho 의 groupby().transform() 반복 계산과
+common.group_stats.group_features 의 key 별 단일 factorize 계산을 비교한다.
+preprocessing_hyunho 는 same_item_cnt / solved_time_shift 를 만들 때 key 를 factorize 해서 key_cache 로 넘기므로
+그 cache 를 재사용한 시간 (warm) 과 cache 없이 key 를 새로 factorize 하는 시간 (cold) 을 같이 출력한다.
+실행 : python benchmarks/bench_group_features.py --rows 2500000  (code/ 에서 실행)
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "boosting")))
+from common.group_stats import factorize_keys
+from src.preprocessing import HYUNHO_GROUP_FEATS, add_group_features
+
+
+def make_frame(n_rows, n_users=7442, n_tests=1537, n_tags=912, seed=42):
+    """ train_data.csv 와 같은 column 구성의 synthetic interaction
+
+    string column 은 pandas 1.x read_csv 결과와 같이 object dtype 으로 만든다.
+    """
+    rng = np.random.default_rng(seed)
+    test_idx = rng.integers(0, n_tests, n_rows)
+    item_no = rng.integers(1, 8, n_rows)
+    test_ids = np.array([f"A{i // 100 % 9 + 1}{i:06d}" for i in range(n_tests)])
+
+    df = pd.DataFrame({
+        "userID": np.sort(rng.integers(0, n_users, n_rows)),
+        "assessmentItemID": (pd.Series(test_ids[test_idx]).str[:7]
+                             + pd.Series(item_no).map("{:03d}".format)).astype(object),
+        "testId": pd.Series(test_ids[test_idx], dtype=object),
+        "answerCode": rng.integers(0, 2, n_rows),
+        "KnowledgeTag": rng.integers(0, n_tags, n_rows),
+        "same_item_cnt": rng.integers(1, 3, n_rows),
+    })
+    solved = rng.exponential(60, n_rows)
+    solved[rng.random(n_rows) < 0.2] = np.nan
+    df["solved_time_shift"] = solved
+    return df
+
+
+def reference_group_features(total):
+    """ 기존 preprocessing_hyunho 의 1. agg 값 구하기 부분 """
+    total['user_avg'] = total.groupby('userID')['answerCode'].transform('mean')
+    total['item_avg'] = total.groupby('assessmentItemID')['answerCode'].transform('mean')
+    total['test_avg'] = total.groupby('testId')['answerCode'].transform('mean')
+    total['tag_avg'] = total.groupby('KnowledgeTag')['answerCode'].transform('mean')
+
+    total['user_time_avg'] = total.groupby('userID')['solved_time_shift'].transform('mean')
+    total['item_time_avg'] = total.groupby('assessmentItemID')['solved_time_shift'].transform('mean')
+    total['test_time_avg'] = total.groupby('testId')['solved_time_shift'].transform('mean')
+    total['tag_time_avg'] = total.groupby('KnowledgeTag')['solved_time_shift'].transform('mean')
+
+    total = total.set_index('assessmentItemID')
+    total['Item_mean_solved_time'] = total[total['answerCode'] == 1].groupby('assessmentItemID')['solved_time_shift'].mean()
+    total = total.reset_index(drop = False)
+
+    total['user_std'] = total.groupby('userID')['answerCode'].transform('std')
+    total['item_std'] = total.groupby('assessmentItemID')['answerCode'].transform('std')
+    total['test_std'] = total.groupby('testId')['answerCode'].transform('std')
+    total['tag_std'] = total.groupby('KnowledgeTag')['answerCode'].transform('std')
+
+    total['user_current_avg'] = total.groupby(['userID', 'testId', 'same_item_cnt'])['answerCode'].transform('mean')
+    total['user_current_time_avg'] = total.groupby(['userID', 'testId', 'same_item_cnt'])['solved_time_shift'].transform('mean')
+    return total
+
+
+def timed(func, df, repeat):
+    """ df.copy() 는 시간에서 빼고 repeat 번 중 가장 빠른 시간을 쓴다 """
+    best = float("inf")
+    for _ in range(repeat):
+        frame = df.copy()
+        start = time.perf_counter()
+        result = func(frame)
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+def main(args):
+    df = make_frame(args.rows)
+    print(f"rows : {args.rows}, repeat : {args.repeat}")
+
+    # preprocessing_hyunho 에서 group feature 전에 factorize 되는 key
+    key_cache = {}
+    factorize_keys(df, ['userID', 'assessmentItemID'], key_cache)
+    factorize_keys(df, ['userID', 'testId', 'same_item_cnt'], key_cache)
+
+    new, new_time = timed(lambda frame: add_group_features(frame, HYUNHO_GROUP_FEATS, key_cache), df, args.repeat)
+    print(f"group_features (warm) : {new_time:.2f}s")
+    cold, cold_time = timed(lambda frame: add_group_features(frame, HYUNHO_GROUP_FEATS), df, args.repeat)
+    print(f"group_features (cold) : {cold_time:.2f}s")
+
+    ref, ref_time = timed(reference_group_features, df, args.repeat)
+    print(f"transform             : {ref_time:.2f}s ({ref_time / new_time:.1f}x warm, {ref_time / cold_time:.1f}x cold)")
+
+    pd.testing.assert_frame_equal(new, cold)
+    assert list(new.columns) == list(ref.columns)
+    feat_cols = [spec[0] for spec in HYUNHO_GROUP_FEATS]
+    assert (new[feat_cols].dtypes == ref[feat_cols].dtypes).all()
+    # pandas 버전에 따라 set_index / reset_index 후 string column dtype 이 달라질 수 있어 dtype 은 따로 비교
+    pd.testing.assert_frame_equal(new, ref, check_dtype=False, check_exact=False, rtol=1e-9, atol=1e-9)
+    print("columns / values : same")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", default=2_500_000, type=int, help="number of interactions")
+    parser.add_argument("--repeat", default=3, type=int, help="best of N runs")
+    main(parser.parse_args())
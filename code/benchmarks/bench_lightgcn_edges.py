@@ -0,0 +1,96 @@
+""" lightgcn process_data edge 생성 benchmark
+
+row 마다 id_2_index dict 를 찾아 list 에 [uid, iid] 를 쌓는 기존 process_data 와
+common.graph.NodeIndex / edge_index 로 column 전체를 한번에 바꾸는 방식을 비교한다.
+실행 : python benchmarks/bench_lightgcn_edges.py --rows 2500000  (code/ 에서 실행)
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import torch
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from common.graph import NodeIndex, edge_index
+
+
+def make_frame(n_rows, n_users=7442, n_items=9454, seed=42):
+    """ common.ingest.read_interactions 와 같은 dtype 의 synthetic interaction (+ elo, solved_time) """
+    rng = np.random.default_rng(seed)
+    item_ids = np.array([f"A{i % 9 + 1}{i:09d}" for i in range(n_items)])
+    return pd.DataFrame({
+        "userID": np.sort(rng.integers(0, n_users, n_rows)).astype(np.int32),
+        "assessmentItemID": pd.Series(item_ids[rng.integers(0, n_items, n_rows)]).astype("category"),
+        "answerCode": rng.integers(0, 2, n_rows).astype(np.int8),
+        "elo": rng.random(n_rows),
+        "solved_time": rng.exponential(60, n_rows),
+    })
+
+
+def reference_indexing_data(data):
+    """ 기존 indexing_data 의 id_2_index dict """
+    userid, itemid = (
+        sorted(list(set(data.userID))),
+        sorted(list(set(data.assessmentItemID))),
+    )
+    n_user = len(userid)
+    userid_2_index = {v: i for i, v in enumerate(userid)}
+    itemid_2_index = {v: i + n_user for i, v in enumerate(itemid)}
+    return dict(userid_2_index, **itemid_2_index)
+
+
+def reference_process_data(data, id_2_index):
+    """ 기존 lightgcn_custom process_data """
+    edge, label, weight = [], [], []
+    for user, item, acode, elo, solved_time in zip(data.userID, data.assessmentItemID, data.answerCode, data["elo"], data.solved_time):
+        uid, iid = id_2_index[user], id_2_index[item]
+        edge.append([uid, iid])
+        label.append(acode)
+        weight.append(elo + solved_time)
+
+    edge = torch.LongTensor(edge).T
+    label = torch.LongTensor(label)
+    weight = torch.FloatTensor(weight)
+    return dict(edge=edge, label=label, weight=weight)
+
+
+def process_data(data, id_2_index):
+    """ 바뀐 process_data 와 같은 계산 """
+    edge = torch.from_numpy(edge_index(data, id_2_index))
+    label = torch.from_numpy(data.answerCode.to_numpy(dtype=np.int64))
+    weight = torch.from_numpy((data["elo"] + data.solved_time).to_numpy(dtype=np.float32))
+    return dict(edge=edge, label=label, weight=weight)
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main(args):
+    data = make_frame(args.rows)
+    print(f"edges : {args.rows}")
+
+    ref_index, ref_index_time = timed(reference_indexing_data, data)
+    ref, ref_time = timed(reference_process_data, data, ref_index)
+    print(f"dict + loop            : indexing {ref_index_time:.2f}s, process_data {ref_time:.2f}s")
+
+    node_index, index_time = timed(NodeIndex, data.userID, data.assessmentItemID)
+    new, new_time = timed(process_data, data, node_index)
+    print(f"NodeIndex + vectorized : indexing {index_time:.2f}s, process_data {new_time:.2f}s ({ref_time / new_time:.0f}x)")
+
+    assert len(node_index) == len(ref_index)
+    for key in ref:
+        assert ref[key].dtype == new[key].dtype, key
+        assert torch.equal(ref[key], new[key]), key
+    print("edge / label / weight : same")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", default=2_500_000, type=int, help="number of edges")
+    main(parser.parse_args())
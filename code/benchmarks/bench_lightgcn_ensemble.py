@@ -0,0 +1,94 @@
+""" lightgcn_custom fold ensemble 추론 benchmark
+
+fold model 마다 inference 를 차례로 돌려 cpu 로 옮긴 뒤 np.mean / DataFrame.to_csv 로 쓰는 기존 inference.py 와
+정규화 행렬 하나를 공유해서 fold embedding 을 [k, n_nodes, d] 로 쌓고 einsum 한번으로 점수화하는 ensemble_inference + write_submission 을
+단일 model 추론 시간과 함께 비교한다.
+실행 : python benchmarks/bench_lightgcn_ensemble.py --edges 2500000 --folds 5  (code/ 에서 실행)
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+import torch
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "lightgcn_custom")))
+from common.submission import write_submission
+from lightgcn.models import MyLightGCN, ensemble_inference, inference
+from bench_lightgcn_minibatch import make_data
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def sequential(models, test_data, additional_info, graph, path):
+    """ 기존 inference.py : fold 별 inference -> cpu -> np.mean -> to_csv """
+    pred_list = []
+    for model in models:
+        pred = inference(model, test_data, additional_info, graph=graph)
+        pred_list.append(pred.detach().cpu().numpy())
+    pred = np.mean(pred_list, axis=0)
+    pd.DataFrame({"prediction": pred}).to_csv(path, index_label="id")
+    return pred
+
+
+def batched(models, test_data, additional_info, graph, path):
+    pred = ensemble_inference(models, test_data, additional_info, graph=graph).cpu().numpy()
+    write_submission(path, pred)
+    return pred
+
+
+def main(args):
+    graph, num_info, additional_info = make_data(args.edges)
+    generator = torch.Generator().manual_seed(1)
+    n_user, n_item = num_info["n_user"], num_info["n_item"]
+    # 유저마다 마지막 문항 하나 (대회 test 와 같은 크기)
+    test_data = dict(edge=torch.stack([torch.arange(n_user), torch.randint(0, n_item, (n_user,), generator=generator) + n_user]))
+    print(f"graph edges : {args.edges}, test edges : {n_user}, folds : {args.folds}, dim : {args.embedding_dim}")
+
+    models = []
+    for k in range(args.folds):
+        torch.manual_seed(k)
+        models.append(MyLightGCN(num_info, args.embedding_dim, args.num_layers))
+
+    def run(func, models, path):
+        # 추론 script 처럼 정규화 인접 행렬 cache 가 빈 상태에서 시작
+        for model in models:
+            model.propagation.clear()
+        return timed(func, models, test_data, additional_info, graph, path)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        ref, ref_time = run(sequential, models, os.path.join(tmp, "seq.csv"))
+        _, single_time = run(sequential, models[:1], os.path.join(tmp, "one.csv"))
+        new, new_time = run(batched, models, os.path.join(tmp, "new.csv"))
+        print(f"single model          : {single_time:.2f}s")
+        print(f"{args.folds} folds sequential    : {ref_time:.2f}s")
+        print(f"{args.folds} folds batched einsum : {new_time:.2f}s ({ref_time / new_time:.1f}x, {new_time / single_time:.2f} x single)")
+
+        assert np.allclose(ref, new, atol=1e-6)
+        written = pd.read_csv(os.path.join(tmp, "new.csv"))
+        assert list(written.columns) == ["id", "prediction"] and np.allclose(written.prediction, ref, atol=1e-6)
+        print("prediction / csv : same")
+
+        # writer 만 : 큰 예측 배열
+        pred = np.random.default_rng(0).random(args.csv_rows).astype(np.float32)
+        _, pandas_time = timed(lambda: pd.DataFrame({"prediction": pred}).to_csv(os.path.join(tmp, "a.csv"), index_label="id"))
+        _, writer_time = timed(write_submission, os.path.join(tmp, "b.csv"), pred)
+        print(f"csv writer ({args.csv_rows} rows) : to_csv {pandas_time:.2f}s, write_submission {writer_time:.2f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--edges", default=2_500_000, type=int, help="number of user -> item edges in the graph")
+    parser.add_argument("--folds", default=5, type=int)
+    parser.add_argument("--embedding_dim", default=64, type=int)
+    parser.add_argument("--num_layers", default=2, type=int)
+    parser.add_argument("--csv_rows", default=1_000_000, type=int)
+    main(parser.parse_args())
@@ -0,0 +1,78 @@
+""" LightGCN 추론 embedding cache benchmark
+
+요청마다 model forward (전체 graph 전달) 를 다시 하는 기존 predict_link 방식과
+model 마다 cache_embedding 으로 최종 embedding table 을 한번 만들고 score_pairs / score_link 로 dot product 만 하는 방식을
+K-fold model 여러 개에서 (user, item) 한 쌍 요청의 latency 로 비교한다.
+실행 : python benchmarks/bench_lightgcn_inference.py --edges 2500000 --models 5  (code/ 에서 실행)
+"""
+import argparse
+import os
+import sys
+import time
+
+import torch
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "lightgcn_custom")))
+from lightgcn.models import MyLightGCN
+from bench_lightgcn_minibatch import make_data
+
+
+def main(args):
+    graph, num_info, additional_info = make_data(args.edges)
+    n_user, n_item = num_info["n_user"], num_info["n_item"]
+    generator = torch.Generator().manual_seed(1)
+    users = torch.randint(0, n_user, (args.requests,), generator=generator)
+    items = torch.randint(0, n_item, (args.requests,), generator=generator) + n_user
+    print(f"edges : {args.edges}, models : {args.models}, layers : {args.num_layers}, dim : {args.embedding_dim}")
+
+    models = []
+    for k in range(args.models):
+        torch.manual_seed(k)
+        models.append(MyLightGCN(num_info, args.embedding_dim, args.num_layers).eval())
+        # 정규화 인접 행렬 생성은 두 방식 모두 model 마다 한번이므로 미리 만들어 둔다
+        models[-1].propagation.adjacency(graph["edge"], graph["weight"])
+
+    # 기존 : 요청 (user, item) 한 쌍마다 model 별 forward
+    n_old = min(args.old_requests, args.requests)
+    start = time.perf_counter()
+    old = []
+    with torch.no_grad():
+        for u, i in zip(users[:n_old], items[:n_old]):
+            pair = torch.stack([u, i]).view(2, 1)
+            old.append(torch.stack([model(graph["edge"], additional_info, pair, edge_weight=graph["weight"]).sigmoid()
+                                    for model in models]).mean(0))
+    old_latency = (time.perf_counter() - start) / n_old
+    print(f"forward per request   : {old_latency * 1e3:9.2f} ms / request ({n_old} requests)")
+
+    # 바뀐 방식 : model 마다 table 한번, 요청은 table 에서 dot product
+    start = time.perf_counter()
+    for model in models:
+        model.cache_embedding(graph["edge"], additional_info, graph["weight"])
+    cache_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    new = [torch.stack([model.score_pairs(u.view(1), i.view(1)) for model in models]).mean(0)
+           for u, i in zip(users, items)]
+    new_latency = (time.perf_counter() - start) / args.requests
+    print(f"cached table          : {new_latency * 1e3:9.3f} ms / request ({args.requests} requests), "
+          f"table build {cache_time:.2f}s for {args.models} models")
+
+    start = time.perf_counter()
+    batched = torch.stack([model.score_pairs(users, items) for model in models]).mean(0)
+    print(f"cached table, batched : {(time.perf_counter() - start) * 1e3:9.2f} ms for {args.requests} pairs")
+    print(f"per request speedup   : {old_latency / new_latency:.0f}x")
+
+    assert torch.allclose(torch.cat(old), torch.cat(new)[:n_old], atol=1e-6)
+    assert torch.allclose(torch.cat(new), batched, atol=1e-6)
+    print("prediction : same")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--edges", default=2_500_000, type=int, help="number of user -> item edges in the graph")
+    parser.add_argument("--models", default=5, type=int, help="number of K-fold models")
+    parser.add_argument("--embedding_dim", default=64, type=int)
+    parser.add_argument("--num_layers", default=2, type=int)
+    parser.add_argument("--requests", default=10_000, type=int, help="number of (user, item) requests")
+    parser.add_argument("--old_requests", default=10, type=int, help="requests timed with a forward per request")
+    main(parser.parse_args())
@@ -0,0 +1,80 @@
+""" MyLightGCN.get_embedding layer 전달 benchmark
+
+layer loop 가 문자열로 막혀서 x * alpha[0] 만 돌려주던 기존 get_embedding (dropout_edge + masked_select 는 매번 실행) 과
+정규화 인접 행렬을 cache 해서 num_layers 번 전달하는 get_embedding 을
+epoch 하나 (forward + backward) / 추론 한번의 시간과, 같은 epoch 수만큼 full-batch 학습한 뒤의 valid AUC 로 비교한다.
+실행 : python benchmarks/bench_lightgcn_layers.py --edges 2500000 --epochs 30  (code/ 에서 실행)
+"""
+import argparse
+import os
+import sys
+import time
+
+import torch
+from sklearn.metrics import roc_auc_score
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "lightgcn_custom")))
+from lightgcn.models import MyLightGCN
+from bench_lightgcn_minibatch import make_data, split
+
+
+class EmbeddingOnlyLightGCN(MyLightGCN):
+    """ 기존 get_embedding : edge dropout 만 계산하고 layer 전달 없이 layer 0 항을 돌려준다. """
+
+    def get_embedding(self, edge_index, additional_info=None, edge_weight=None, training=True, dropout=0.2):
+        x = self.input_embedding(additional_info)
+        out = self.layer0_embedding(x)
+        edge_index, edge_mask = self.dropout_edge(edge_index, p=dropout, training=training)
+        edge_weight = torch.masked_select(edge_weight, edge_mask)
+        self.edge_mask = edge_mask
+        return out
+
+
+def train_and_eval(model_cls, num_info, additional_info, train_data, valid_data, args):
+    torch.manual_seed(0)
+    model = model_cls(num_info, args.embedding_dim, args.num_layers)
+    optimizer = torch.optim.Adam(model.parameters(), lr=args.learning_rate)
+
+    epoch_times = []
+    for _ in range(args.epochs):
+        start = time.perf_counter()
+        pred = model(train_data["edge"], additional_info, edge_weight=train_data["weight"],
+                     training=True, dropout=args.dropout)
+        loss = model.link_pred_loss(pred, train_data["label"])
+        optimizer.zero_grad()
+        loss.backward()
+        optimizer.step()
+        epoch_times.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with torch.no_grad():
+        prob = model.predict_link(train_data["edge"], additional_info, valid_data["edge"],
+                                  edge_weight=train_data["weight"], prob=True)
+    predict_time = time.perf_counter() - start
+    auc = roc_auc_score(valid_data["label"].numpy(), prob.numpy())
+    # 첫 epoch 은 정규화 행렬 생성 포함
+    return sum(epoch_times[1:]) / max(len(epoch_times) - 1, 1), epoch_times[0], predict_time, auc
+
+
+def main(args):
+    data, num_info, additional_info = make_data(args.edges)
+    train_data, valid_data = split(data, args.valid)
+    print(f"edges : {args.edges}, layers : {args.num_layers}, dim : {args.embedding_dim}, epochs : {args.epochs}")
+
+    for name, model_cls in (("embedding only", EmbeddingOnlyLightGCN), ("layer propagation", MyLightGCN)):
+        epoch_time, first_time, predict_time, auc = train_and_eval(
+            model_cls, num_info, additional_info, train_data, valid_data, args)
+        print(f"{name:18s} : epoch {epoch_time:.2f}s (first {first_time:.2f}s), "
+              f"predict_link {predict_time:.2f}s, valid AUC {auc:.4f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--edges", default=2_500_000, type=int, help="number of user -> item edges")
+    parser.add_argument("--valid", default=50_000, type=int, help="number of held-out edges")
+    parser.add_argument("--embedding_dim", default=64, type=int)
+    parser.add_argument("--num_layers", default=2, type=int)
+    parser.add_argument("--dropout", default=0.2, type=float)
+    parser.add_argument("--learning_rate", default=0.0015, type=float)
+    parser.add_argument("--epochs", default=30, type=int)
+    main(parser.parse_args())
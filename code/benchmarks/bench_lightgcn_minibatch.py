@@ -0,0 +1,124 @@
+""" LightGCN mini-batch 학습 benchmark
+
+epoch 마다 전체 graph 로 한번 update 하는 full-batch 학습과
+lightgcn_custom/lightgcn/models.py 의 train_minibatch_epoch (batch node 의 1-hop 전달 + 주기적으로 다시 계산하는 layer embedding) 를
+synthetic graph 에서 update 한번의 시간과, 같은 시간 동안 학습한 뒤의 valid AUC 로 비교한다.
+실행 : python benchmarks/bench_lightgcn_minibatch.py --edges 2500000 --batch_size 8192  (code/ 에서 실행)
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+
+import torch
+from sklearn.metrics import roc_auc_score
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "lightgcn_custom")))
+from lightgcn.models import MyLightGCN, train_minibatch_epoch
+
+
+def make_data(n_edges, n_users=7442, n_items=9454, seed=42):
+    """ 유저 실력 - 문항 난이도 로 정답 여부를 만든 synthetic graph 와 additional_info """
+    generator = torch.Generator().manual_seed(seed)
+    users = torch.randint(0, n_users, (n_edges,), generator=generator)
+    items = torch.randint(0, n_items, (n_edges,), generator=generator)
+    ability, difficulty = torch.randn(n_users, generator=generator), torch.randn(n_items, generator=generator)
+    label = torch.bernoulli(torch.sigmoid(2 * (ability[users] - difficulty[items])), generator=generator).long()
+    data = dict(edge=torch.stack([users, items + n_users]), label=label,
+                weight=torch.rand(n_edges, generator=generator) + 1)
+
+    num_info = dict(n_user=n_users, n_item=n_items, n_tags=900, n_testids=1500, n_bigcat=9)
+    additional_info = dict(
+        user=dict(day_diff=torch.randint(0, 5, (n_users,), generator=generator)),
+        item=dict(KnowledgeTag=torch.randint(0, 900, (n_items,), generator=generator),
+                  testId=torch.randint(0, 1500, (n_items,), generator=generator),
+                  big_category=torch.randint(0, 9, (n_items,), generator=generator)),
+    )
+    return data, num_info, additional_info
+
+
+def split(data, n_valid, seed=0):
+    perm = torch.randperm(data["label"].size(0), generator=torch.Generator().manual_seed(seed))
+    train_idx, valid_idx = perm[n_valid:], perm[:n_valid]
+    return ({k: v[..., train_idx] for k, v in data.items()},
+            {k: v[..., valid_idx] for k, v in data.items()})
+
+
+def full_predict(model, graph, additional_info, edge_label_index, training=False, dropout=0.2):
+    """ 전체 graph 전달 (model.propagate) 로 edge_label_index 의 logit """
+    x = model.input_embedding(additional_info)
+    out = model.propagate(x, graph["edge"], graph["weight"], training=training, dropout=dropout,
+                          out=model.layer0_embedding(x))
+    return (out[edge_label_index[0]] * out[edge_label_index[1]]).sum(dim=-1)
+
+
+def full_step(model, optimizer, train_data, additional_info, dropout):
+    pred = full_predict(model, train_data, additional_info, train_data["edge"], training=True, dropout=dropout)
+    loss = model.link_pred_loss(pred, train_data["label"])
+    optimizer.zero_grad()
+    loss.backward()
+    optimizer.step()
+
+
+def valid_auc(model, train_data, valid_data, additional_info):
+    with torch.no_grad():
+        prob = full_predict(model, train_data, additional_info, valid_data["edge"]).sigmoid()
+    return roc_auc_score(valid_data["label"].numpy(), prob.numpy())
+
+
+def train_for(seconds, step):
+    start, n_update = time.perf_counter(), 0
+    while time.perf_counter() - start < seconds:
+        n_update += step()
+    return n_update, time.perf_counter() - start
+
+
+def main(args):
+    data, num_info, additional_info = make_data(args.edges)
+    train_data, valid_data = split(data, args.valid)
+    print(f"edges : {args.edges}, batch_size : {args.batch_size}, layers : {args.num_layers}, dim : {args.embedding_dim}")
+
+    # history 를 다시 계산한 직후에는 전체 전달과 같은 logit
+    torch.manual_seed(0)
+    model = MyLightGCN(num_info, args.embedding_dim, args.num_layers)
+    with torch.no_grad():
+        eids = torch.randperm(train_data["label"].size(0))[:args.batch_size]
+        model.refresh_history(train_data["edge"], additional_info, train_data["weight"])
+        batch = model.forward_batch(train_data["edge"], additional_info, train_data["edge"][:, eids], train_data["weight"])
+        full = full_predict(model, train_data, additional_info, train_data["edge"][:, eids])
+    assert torch.allclose(batch, full, atol=1e-5), (batch - full).abs().max()
+    print("batch logit == full graph logit (right after refresh)")
+
+    results = {}
+    for name in ("full-batch", "mini-batch"):
+        torch.manual_seed(0)
+        model = MyLightGCN(num_info, args.embedding_dim, args.num_layers)
+        optimizer = torch.optim.Adam(model.parameters(), lr=args.learning_rate)
+        if name == "full-batch":
+            step = lambda: full_step(model, optimizer, train_data, additional_info, args.dropout) or 1
+        else:
+            n_batch = (train_data["label"].size(0) + args.batch_size - 1) // args.batch_size
+            step = lambda: train_minibatch_epoch(model, optimizer, train_data, additional_info,
+                                                 batch_size=args.batch_size, refresh_every=args.refresh_every,
+                                                 dropout=args.dropout) and n_batch
+        n_update, elapsed = train_for(args.seconds, step)
+        results[name] = n_update / elapsed
+        print(f"{name:10s} : {n_update:5d} updates in {elapsed:.0f}s ({n_update / elapsed:.2f} updates/s), "
+              f"valid AUC {valid_auc(model, train_data, valid_data, additional_info):.4f}")
+    print(f"updates/s : {results['mini-batch'] / results['full-batch']:.0f}x")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--edges", default=2_500_000, type=int, help="number of user -> item edges")
+    parser.add_argument("--valid", default=50_000, type=int, help="number of held-out edges")
+    parser.add_argument("--embedding_dim", default=64, type=int)
+    parser.add_argument("--num_layers", default=2, type=int)
+    parser.add_argument("--batch_size", default=8192, type=int)
+    parser.add_argument("--refresh_every", default=None, type=int)
+    parser.add_argument("--dropout", default=0.2, type=float)
+    parser.add_argument("--learning_rate", default=0.0015, type=float)
+    parser.add_argument("--seconds", default=120, type=float, help="training time budget for each mode")
+    main(parser.parse_args())
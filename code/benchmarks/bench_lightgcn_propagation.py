@@ -0,0 +1,90 @@
+""" LightGCN propagation benchmark
+
+layer 마다 LGConv 에 edge_index 를 넘기는 방식 (매번 degree 정규화 + scatter) 과
+lightgcn_custom/lightgcn/propagation.py 의 cache 된 정규화 CSR 행렬 SpMM 을
+CPU 에서 epoch 하나 (forward + backward, edge dropout 포함) 시간으로 비교한다.
+실행 : python benchmarks/bench_lightgcn_propagation.py --edges 2500000  (code/ 에서 실행)
+"""
+import argparse
+import os
+import sys
+import time
+
+import torch
+from torch_geometric.nn.conv import LGConv
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "lightgcn_custom")))
+from lightgcn.propagation import Propagation
+
+
+def make_graph(n_edges, n_users=7442, n_items=9454, seed=42):
+    """ user -> item edge 와 edge weight (elo + solved_time 과 비슷한 범위) """
+    generator = torch.Generator().manual_seed(seed)
+    users = torch.randint(0, n_users, (n_edges,), generator=generator)
+    items = torch.randint(0, n_items, (n_edges,), generator=generator) + n_users
+    weight = torch.rand(n_edges, generator=generator) + torch.rand(n_edges, generator=generator) * 300
+    return torch.stack([users, items]), weight, n_users + n_items
+
+
+def reference_epoch(convs, x, edge_index, edge_weight, alpha, edge_mask):
+    """ 기존 방식 : 양방향 edge_index 를 dropout 으로 잘라서 layer 마다 LGConv """
+    edge_mask = torch.cat([edge_mask, edge_mask])
+    edge_index = torch.cat([edge_index, edge_index.flip(0)], dim=1)[:, edge_mask]
+    edge_weight = torch.masked_select(torch.cat([edge_weight, edge_weight]), edge_mask)
+
+    out = x * alpha[0]
+    for i, conv in enumerate(convs):
+        x = conv(x, edge_index, edge_weight=edge_weight)
+        out = out + x * alpha[i + 1]
+    return out
+
+
+def engine_epoch(propagation, x, edge_index, edge_weight, alpha, edge_mask):
+    adj = propagation.adjacency(edge_index, edge_weight)
+    return propagation.propagate(x, adj.masked(edge_mask), alpha)
+
+
+def run(name, func, n_epochs, x, *args):
+    times = []
+    for _ in range(n_epochs):
+        start = time.perf_counter()
+        out = func(x, *args)
+        out.pow(2).sum().backward()
+        times.append(time.perf_counter() - start)
+    # 첫 epoch 은 cache 생성 포함
+    print(f"{name:20s} first epoch {times[0]:.2f}s, mean of rest {sum(times[1:]) / max(len(times) - 1, 1):.2f}s")
+    return sum(times[1:]) / max(len(times) - 1, 1)
+
+
+def main(args):
+    torch.manual_seed(0)
+    edge_index, edge_weight, num_nodes = make_graph(args.edges)
+    alpha = torch.full((args.num_layers + 1,), 1. / (args.num_layers + 1))
+    x = torch.randn(num_nodes, args.embedding_dim, requires_grad=True)
+    edge_mask = torch.rand(args.edges) >= args.dropout
+    print(f"edges : {args.edges}, nodes : {num_nodes}, dim : {args.embedding_dim}, layers : {args.num_layers}")
+
+    # 같은 dropout mask 에서 같은 embedding
+    convs = [LGConv() for _ in range(args.num_layers)]
+    propagation = Propagation(num_nodes)
+    with torch.no_grad():
+        ref = reference_epoch(convs, x, edge_index, edge_weight, alpha, edge_mask)
+        new = engine_epoch(propagation, x, edge_index, edge_weight, alpha, edge_mask)
+    assert torch.allclose(ref, new, atol=1e-5), (ref - new).abs().max()
+    print("embedding : same")
+
+    ref_time = run("LGConv", lambda x: reference_epoch(convs, x, edge_index, edge_weight, alpha,
+                                                        torch.rand(args.edges) >= args.dropout), args.epochs, x)
+    new_time = run("cached CSR SpMM", lambda x: engine_epoch(propagation, x, edge_index, edge_weight, alpha,
+                                                             torch.rand(args.edges) >= args.dropout), args.epochs, x)
+    print(f"epoch speedup : {ref_time / new_time:.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--edges", default=2_500_000, type=int, help="number of user -> item edges")
+    parser.add_argument("--embedding_dim", default=64, type=int)
+    parser.add_argument("--num_layers", default=2, type=int)
+    parser.add_argument("--dropout", default=0.2, type=float)
+    parser.add_argument("--epochs", default=4, type=int)
+    main(parser.parse_args())
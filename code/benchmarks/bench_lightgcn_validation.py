@@ -0,0 +1,96 @@
+""" LightGCN epoch 별 validation 비용 benchmark
+
+기존 loop 의 매 epoch 평가 (predict_link -> .cpu().numpy() -> sklearn accuracy_score / roc_auc_score -> torch.save) 와
+lightgcn_custom/lightgcn/utils.py 의 device AUC + background CheckpointSaver 를 eval_every 주기로 하는 평가를
+train epoch 시간 대비 비율로 비교한다.
+실행 : python benchmarks/bench_lightgcn_validation.py --edges 2500000 --valid 250000 --eval_every 5  (code/ 에서 실행)
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import torch
+from sklearn.metrics import accuracy_score, roc_auc_score
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "lightgcn_custom")))
+from lightgcn.models import MyLightGCN
+from lightgcn.utils import CheckpointSaver, accuracy, roc_auc
+from bench_lightgcn_minibatch import make_data, split
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main(args):
+    data, num_info, additional_info = make_data(args.edges)
+    train_data, valid_data = split(data, args.valid)
+    print(f"train edges : {args.edges - args.valid}, valid edges : {args.valid}, eval_every : {args.eval_every}")
+
+    torch.manual_seed(0)
+    model = MyLightGCN(num_info, args.embedding_dim, args.num_layers)
+    optimizer = torch.optim.Adam(model.parameters(), lr=0.0015)
+
+    def train_epoch():
+        pred = model(train_data["edge"], additional_info, edge_weight=train_data["weight"], training=True)
+        loss = model.link_pred_loss(pred, train_data["label"])
+        optimizer.zero_grad()
+        loss.backward()
+        optimizer.step()
+
+    def predict():
+        with torch.no_grad():
+            return model.predict_link(valid_data["edge"], additional_info, edge_weight=valid_data["weight"], prob=True)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "best_model.pt")
+
+        def old_eval():
+            prob = predict().detach().cpu().numpy()
+            label = valid_data["label"].cpu().numpy()
+            acc, auc = accuracy_score(label, prob > 0.5), roc_auc_score(label, prob)
+            torch.save({"model": model.state_dict()}, path)
+            return acc, auc
+
+        saver = CheckpointSaver()
+
+        def new_eval():
+            prob = predict()
+            acc, auc = accuracy(valid_data["label"], prob), roc_auc(valid_data["label"], prob)
+            saver.save({"model": model.state_dict()}, path)
+            return acc, auc
+
+        train_epoch()  # 정규화 행렬 생성
+        _, epoch_time = timed(train_epoch)
+        (old_acc, old_auc), old_time = timed(old_eval)
+        train_epoch()
+        (new_acc, new_auc), new_time = timed(new_eval)
+        saver.close()
+
+        # 같은 model 에서 AUC / acc 비교
+        prob = predict()
+        label = valid_data["label"]
+        assert abs(roc_auc(label, prob) - roc_auc_score(label.numpy(), prob.numpy())) < 1e-9
+        assert abs(accuracy(label, prob) - accuracy_score(label.numpy(), prob.numpy() > 0.5)) < 1e-9
+        print("AUC / acc : same as sklearn")
+
+        _, auc_sklearn = timed(lambda: roc_auc_score(label.numpy(), prob.numpy()))
+        _, auc_torch = timed(roc_auc, label, prob)
+        print(f"train epoch : {epoch_time:.2f}s, AUC only : sklearn {auc_sklearn * 1e3:.0f} ms, device {auc_torch * 1e3:.0f} ms")
+        print(f"every epoch, sklearn + torch.save          : {old_time:.2f}s / epoch ({old_time / epoch_time:.0%} of train)")
+        amortized = new_time / args.eval_every
+        print(f"every {args.eval_every} epochs, device AUC + background save : {amortized:.2f}s / epoch ({amortized / epoch_time:.0%} of train)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--edges", default=2_500_000, type=int)
+    parser.add_argument("--valid", default=250_000, type=int, help="number of held-out edges")
+    parser.add_argument("--embedding_dim", default=64, type=int)
+    parser.add_argument("--num_layers", default=2, type=int)
+    parser.add_argument("--eval_every", default=5, type=int)
+    main(parser.parse_args())
@@ -0,0 +1,98 @@
+""" time feature benchmark / 동등성 확인
+
+기존 Timedelta .apply / groupby().apply(lambda) 기반 시간 feature 와
+common.time_features 의 epoch seconds 기반 계산이 같은 값을 내는지 확인하고 속도를 비교한다.
+    - solved_time_shift : boosting preprocessing_hyunho, lgbm feature_engineering
+    - solved_time : boosting preprocessing_yujin, lightgcn_custom preprocessing_data
+    - day_diff : lightgcn_custom preprocessing_data
+실행 : python benchmarks/bench_time_features.py --rows 2500000  (code/ 에서 실행)
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from common.time_features import (day_diff, group_codes, next_group_diff, solved_time,
+                                  to_epoch_seconds)
+
+
+def make_frame(n_rows, n_users=7442, n_tests=1537, seed=42):
+    """ userID / Timestamp 순으로 정렬된 synthetic interaction (train_data.csv 와 같은 형태) """
+    rng = np.random.default_rng(seed)
+    users = np.sort(rng.integers(0, n_users, n_rows))
+
+    # 대부분은 수십초 간격, 일부는 몇 시간 ~ 며칠 간격
+    gap = rng.exponential(40, n_rows).astype(np.int64)
+    jump = rng.random(n_rows) < 0.03
+    gap[jump] = rng.integers(3600, 6 * 86400, jump.sum())
+    start = np.datetime64("2020-01-01T00:00:00").astype(np.int64)
+    seconds = start + np.cumsum(gap)
+
+    df = pd.DataFrame({
+        "userID": users,
+        "testId": pd.Series(rng.integers(0, n_tests, n_rows)).map("A{:09d}".format).astype(object),
+        "Timestamp": pd.Series(seconds.astype("datetime64[s]")).dt.strftime("%Y-%m-%d %H:%M:%S").astype(object),
+    })
+    df["same_item_cnt"] = rng.integers(1, 3, n_rows)
+    return df
+
+
+def reference_solved_time_shift(df):
+    """ 기존 preprocessing_hyunho / lgbm feature_engineering """
+    diff_shift = df.loc[:, ['userID', 'testId', 'Timestamp', 'same_item_cnt']].groupby(['userID', 'testId', 'same_item_cnt']).diff().shift(-1)
+    return diff_shift['Timestamp'].apply(lambda x: x.total_seconds())
+
+
+def reference_solved_time(df):
+    """ 기존 preprocessing_yujin / lightgcn_custom preprocessing_data """
+    df["solved_time"] = df.groupby('userID')["Timestamp"].diff().shift(-1).dt.seconds
+    df.loc[df["solved_time"] > 14400, "solved_time"] = np.nan
+    fill_mean_func = lambda g: g["solved_time"].fillna(g["solved_time"].median())
+    return df.groupby('userID').apply(fill_mean_func).reset_index()["solved_time"]
+
+
+def reference_day_diff(df):
+    """ 기존 lightgcn_custom preprocessing_data """
+    diff = df.loc[:, ['userID', 'Timestamp']].groupby('userID').diff().fillna(pd.Timedelta(seconds=0))
+    diff = diff['Timestamp'].apply(lambda x: x.days)
+    return diff.apply(lambda x: x if x <= 3 and x >= 0 else 4)
+
+
+def run(name, new_func, ref_func):
+    start = time.perf_counter()
+    new = new_func()
+    new_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    ref = ref_func()
+    ref_time = time.perf_counter() - start
+
+    ref = np.asarray(ref, dtype=np.float64)
+    assert np.allclose(new, ref, equal_nan=True, rtol=0, atol=1e-9), name
+    print(f"{name:18s} new {new_time:.2f}s / old {ref_time:.2f}s ({ref_time / new_time:.1f}x) : same")
+
+
+def main(args):
+    df = make_frame(args.rows)
+    df["Timestamp"] = pd.to_datetime(df["Timestamp"])
+    print(f"rows : {args.rows}")
+
+    run("solved_time_shift",
+        lambda: next_group_diff(group_codes(df, ['userID', 'testId', 'same_item_cnt']), to_epoch_seconds(df['Timestamp'])),
+        lambda: reference_solved_time_shift(df))
+    run("solved_time",
+        lambda: solved_time(df, 'userID', clip=14400),
+        lambda: reference_solved_time(df.copy()))
+    run("day_diff",
+        lambda: day_diff(df, 'userID', max_day=3),
+        lambda: reference_day_diff(df))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", default=2_500_000, type=int, help="number of interactions")
+    main(parser.parse_args())
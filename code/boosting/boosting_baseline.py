@@ -1,6 +1,5 @@
 import pandas as pd
 import os
-import random
 
 import torch
 import wandb
@@ -10,10 +9,15 @@ from sklearn.metrics import roc_auc_score
 from sklearn.metrics import accuracy_score
 from wandb.xgboost import wandb_callback
 from xgboost import XGBClassifier
-from sklearn.model_selection import StratifiedKFold
 import numpy as np
 
 import argparse
+import sys
+
+# code/common 의 공용 모듈 사용 : csv 를 parquet 로 한번 변환해서 dtype 을 지정해 읽음
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from common.ingest import read_interactions
+from common.split import user_kfold_index
 
 def feature_engineering(df:pd.DataFrame) -> pd.DataFrame :
     
@@ -40,44 +44,17 @@ def feature_engineering(df:pd.DataFrame) -> pd.DataFrame :
     return df
 
 
-# train과 test 데이터셋은 사용자 별로 묶어서 분리를 해주어야함
-def custom_train_test_split(df, ratio=0.7, split=True):
-    
-    users = list(zip(df['userID'].value_counts().index, df['userID'].value_counts()))
-    random.shuffle(users)
-    
-    max_train_data_len = ratio*len(df)
-    sum_of_train_data = 0
-    user_ids =[]
-
-    for user_id, count in users:
-        sum_of_train_data += count
-        if max_train_data_len < sum_of_train_data:
-            break
-        user_ids.append(user_id)
-
-
-    train = df[df['userID'].isin(user_ids)]
-    test = df[df['userID'].isin(user_ids) == False]
-
-    #test데이터셋은 각 유저의 마지막 interaction만 추출
-    test = test[test['userID'] != test['userID'].shift(-1)]
-    return train, test
-
-
 def main(args):
     wandb.login()
 
     data_dir = '../../data' # 경로는 상황에 맞춰서 수정해주세요!
     csv_file_path = os.path.join(data_dir, 'train_data.csv') # 데이터는 대회홈페이지에서 받아주세요 :)
-    df = pd.read_csv(csv_file_path) 
+    df = read_interactions(csv_file_path) 
 
     df = feature_engineering(df)
-    random.seed(args.seed)
 
-    # 유저별 분리
-    fold = StratifiedKFold(n_splits = 5, shuffle =True)
-    # train, test = custom_train_test_split(df, ratio=args.train_ratio)
+    # 유저별 분리 : 같은 유저의 interaction 이 train / valid fold 에 나뉘어 들어가지 않도록 user 단위 k-fold
+    folds = user_kfold_index(df['userID'].to_numpy(), n_splits=5, seed=args.seed)
 
     # 사용할 Feature 설정
     FEATS = ['KnowledgeTag', 'user_correct_answer', 'user_total_answer', 
@@ -122,7 +99,7 @@ def main(args):
     score_train = []
     score_test = []
 
-    for train_index , test_index in fold.split(X, y):
+    for train_index , test_index in folds:
         X_train,X_test = X.iloc[train_index], X.iloc[test_index]
         y_train,y_test = y.iloc[train_index], y.iloc[test_index]
         
@@ -149,7 +126,7 @@ def main(args):
 
     # LOAD TESTDATA
     test_csv_file_path = os.path.join(data_dir, 'test_data.csv')
-    test_df = pd.read_csv(test_csv_file_path)
+    test_df = read_interactions(test_csv_file_path)
 
     # FEATURE ENGINEERING``
     test_df = feature_engineering(test_df)
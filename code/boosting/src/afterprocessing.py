@@ -1,13 +1,67 @@
+import json
+import os
+
+import numpy as np
 import pandas as pd
-from sklearn.preprocessing import LabelEncoder
+from pandas.api.types import is_bool_dtype, is_numeric_dtype
+
+
+def is_categorical_column(series:pd.Series):
+    """ int, float, bool 형이 아닌 (object, string, category) column 인지 """
+    return not (is_numeric_dtype(series.dtype) or is_bool_dtype(series.dtype))
+
+
+class CategoryEncoder:
+    """ boosting 용 categorical encoder
+
+    train / test 를 합친 frame 에서 한번 fit 해서 column 별 category 목록을 저장하고,
+    transform 은 그 목록 기준의 code 로 한번에 바꾼다. (LabelEncoder 와 같이 정렬된 순서의 code)
+    같은 category 는 train / test 에서 항상 같은 code 를 갖고, fit 때 없던 값은 -1 (missing) 이 된다.
+    모델과 같이 save / load 해서 추론 시에도 같은 code 를 사용한다.
+    """
+
+    def __init__(self, categories:dict=None):
+        self.categories = {} if categories is None else categories
+
+    @property
+    def columns(self):
+        return list(self.categories)
+
+    def fit(self, df:pd.DataFrame, columns:list=None):
+        for col in (df.columns if columns is None else columns):
+            if is_categorical_column(df[col]):
+                self.categories[col] = pd.Index(df[col].dropna().unique()).sort_values()
+        return self
+
+    def transform(self, df:pd.DataFrame):
+        for col, categories in self.categories.items():
+            if col not in df.columns:
+                continue
+            df[col] = pd.Categorical(df[col], categories=categories).codes
+        return df
+
+    def fit_transform(self, df:pd.DataFrame, columns:list=None):
+        return self.fit(df, columns).transform(df)
+
+    def save(self, path:str):
+        dir_name = os.path.dirname(path)
+        if dir_name:
+            os.makedirs(dir_name, exist_ok=True)
+        # numpy scalar 는 json 으로 저장되지 않으므로 tolist 로 python 값으로 바꾼다
+        categories = {col: np.asarray(cats).tolist() for col, cats in self.categories.items()}
+        with open(path, "w", encoding="utf8") as f:
+            json.dump(categories, f, ensure_ascii=False)
 
+    @classmethod
+    def load(cls, path:str):
+        with open(path, encoding="utf8") as f:
+            categories = json.load(f)
+        return cls({col: pd.Index(cats) for col, cats in categories.items()})
 
-def mapping_cat_to_label(df:pd.DataFrame):
 
-    for col in df.columns : 
-        if df[col].dtype not in ['int', 'float', 'bool']:
-            encoder = LabelEncoder()
-            encoder.fit(df[col])
-            df[col] = encoder.transform(df[col])
+def mapping_cat_to_label(df:pd.DataFrame, columns:list=None):
+    """ int, float, bool 형이 아닌 column 을 label encoding 한다. columns 가 주어지면 해당 column 만
 
-    return df
+    df 하나만 보고 encoding 하므로 train / test 에 같은 code 가 필요하면 CategoryEncoder 를 사용
+    """
+    return CategoryEncoder().fit_transform(df, columns)
@@ -22,12 +22,23 @@ def parse_args():
         "--file_name", default="train_data.csv", type=str, help="train file name"
     )
 
+    parser.add_argument(
+        "--feature_cache_dir", default="feature_cache/", type=str, help="feature column cache directory (empty string : no cache)"
+    )
+
+    parser.add_argument(
+        "--dataset_cache_dir", default="dataset_cache/", type=str, help="LightGBM Dataset / XGBoost DMatrix binary cache directory (empty string : no cache)"
+    )
+
     parser.add_argument(
         "--model_dir", default="models/", type=str, help="model directory"
     )
     parser.add_argument(
         "--model_name", default="model.pt", type=str, help="model file name"
     )
+    parser.add_argument(
+        "--encoder_path", default="", type=str, help="saved category encoder json to reuse (empty string : fit on train+test)"
+    )
 
     parser.add_argument(
         "--output_dir", default="output/", type=str, help="output directory"
@@ -62,6 +73,15 @@ def parse_args():
 
     ### 중요 ###
     parser.add_argument("--model", default="XGBClassifier", type=str, help="model type : XGBClassifier, LGBM, LGBMClassifier")
+    # user 단위 K-fold (1 이하 : 기존 holdout 학습)
+    parser.add_argument("--n_folds", default=1, type=int, help="number of user k-fold (out-of-fold training when > 1)")
+
+    # CatBoost optuna 탐색
+    parser.add_argument("--n_trials", default=1, type=int, help="number of optuna trials (CatBoostClassifier)")
+    parser.add_argument("--n_jobs", default=1, type=int, help="number of worker processes (optuna trials / k-fold folds)")
+    parser.add_argument(
+        "--study_dir", default="optuna/", type=str, help="optuna SQLite study / trial model directory"
+    )
     parser.add_argument("--optimizer", default="adam", type=str, help="optimizer type")
     parser.add_argument(
         "--scheduler", default="plateau", type=str, help="scheduler type"
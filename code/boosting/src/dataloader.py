@@ -1,6 +1,17 @@
+import os
+import sys
+
+import numpy as np
 import pandas as pd 
 import random
 
+# code/common 의 공용 모듈 사용 : csv 를 parquet 로 한번 변환해서 dtype 을 지정해 읽음
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+from common.ingest import read_interactions
+
+from .afterprocessing import CategoryEncoder
+from .datasplit import user_split_index
+
 class MyDataLoader:
 
     def __init__( self,
@@ -13,8 +24,8 @@ class MyDataLoader:
 
         try:
             self.data = {}
-            self.data["train"]        =  pd.read_csv(self.data_path["train_file"])
-            self.data["test"]         =  pd.read_csv(self.data_path["test_file"])
+            self.data["train"]        =  read_interactions(self.data_path["train_file"])
+            self.data["test"]         =  read_interactions(self.data_path["test_file"])
         except Exception as e:
             print("Error ",e)
 
@@ -30,3 +41,107 @@ class MyDataLoader:
     #     self.data["test"]  = self.preprocessing_ft( self.data["test"] )
         
     #     return self.data
+
+
+def concat_train_test(train_df, test_df):
+    """ train / test 를 하나의 frame 으로 합치고 is_train(bool) column 으로 구분한다. """
+    train_df["is_train"] = True
+    test_df["is_train"] = False
+    # answerCode 는 int8 로 읽으므로 replace 로 float 변환과 NaN 처리를 같이 한다
+    test_df["answerCode"] = test_df["answerCode"].replace(-1, np.nan)
+    return pd.concat([train_df, test_df], ignore_index=True)
+
+
+def to_float32_matrix(df, feats, rows):
+    """ feats column 의 rows 위치만 C-contiguous float32 2차원 array 로 만든다.
+
+    column 별로 필요한 row 만 바로 채워 넣으므로 중간 DataFrame 을 만들지 않는다.
+    """
+    matrix = np.empty((len(rows), len(feats)), dtype=np.float32)
+    for i, col in enumerate(feats):
+        matrix[:, i] = df[col].to_numpy()[rows]
+    return matrix
+
+
+def prepare_total(data_collection, preprocessing_ft, feats, do_transform_label=True, encoder=None):
+    """ train / test 를 합친 frame 하나에 feature 를 만들고 (필요하면) FEATS 를 encoding 한다.
+
+    data_collection 의 원본 frame 은 합친 뒤 참조를 끊어서 메모리를 돌려준다.
+    encoder 를 주면 (저장해 둔 CategoryEncoder) 다시 fit 하지 않고 그 code 를 그대로 사용한다.
+    encoder 에 없는 FEATS column 만 새로 fit 한다.
+
+    Returns:
+        total, encoder, train_rows (train row 위치), test_idx (test 각 유저의 마지막 row 위치)
+    """
+    total = concat_train_test(data_collection.pop("train"), data_collection.pop("test"))
+    total = preprocessing_ft(total)
+    total["answerCode"] = total["answerCode"].fillna(-1)
+
+    # train / test 를 합친 상태에서 FEATS 의 category 목록을 한번 fit 해서 같은 값은 같은 label 을 갖는다
+    if not do_transform_label:
+        encoder = None
+    else:
+        if encoder is None:
+            encoder = CategoryEncoder()
+        encoder.fit(total, [f for f in feats if f not in encoder.categories])
+        total = encoder.transform(total)
+
+    is_train = total["is_train"].to_numpy(dtype=bool)
+    train_rows = np.flatnonzero(is_train)
+
+    # test 는 각 유저의 마지막 interaction 만 추론
+    test_rows = np.flatnonzero(~is_train)
+    test_users = total["userID"].to_numpy()[test_rows]
+    test_idx = test_rows[np.append(test_users[1:] != test_users[:-1], True)]
+
+    return total, encoder, train_rows, test_idx
+
+
+def feature_rows(total, feats, rows, do_transform_label=True):
+    """ do_transform_label 이면 float32 matrix, 아니면 (CatBoost 의 category feature) FEATS DataFrame """
+    if do_transform_label:
+        return to_float32_matrix(total, feats, rows)
+    return total[feats].iloc[rows].reset_index(drop=True)
+
+
+def build_model_data(data_collection, preprocessing_ft, feats, do_transform_label=True, encoder=None):
+    """ MLModelBase 에서 사용하는 학습 / 검증 / 추론 data 를 만든다.
+
+    train 과 test 를 한번 합친 frame 하나만 유지하고, 구분은 row 위치 array 로 한다.
+    do_transform_label 이면 FEATS 를 label encoding 한 뒤 float32 matrix 로,
+    아니면 (CatBoost 의 category feature) FEATS column 만 가진 DataFrame 으로 반환한다.
+
+    Returns:
+        dict : total, train_X, y_train, valid_X, y_valid, test_X, encoder
+    """
+    total, encoder, train_rows, test_idx = prepare_total(data_collection, preprocessing_ft, feats, do_transform_label, encoder)
+    answer = total["answerCode"].to_numpy()
+
+    train_idx, valid_idx = user_split_index(total["userID"].to_numpy()[train_rows])
+    train_idx, valid_idx = train_rows[train_idx], train_rows[valid_idx]
+
+    return {
+        "total": total,
+        "train_X": feature_rows(total, feats, train_idx, do_transform_label), "y_train": answer[train_idx],
+        "valid_X": feature_rows(total, feats, valid_idx, do_transform_label), "y_valid": answer[valid_idx],
+        "test_X": feature_rows(total, feats, test_idx, do_transform_label),
+        "encoder": encoder,
+    }
+
+
+def build_kfold_data(data_collection, preprocessing_ft, feats, do_transform_label=True, encoder=None):
+    """ user 단위 K-fold 학습용 data. train row 전체의 FEATS 를 하나의 X 로 만들고 fold 는 X 의 row 위치로 나눈다.
+
+    Returns:
+        dict : total, X, y, user_ids (X 의 row 별 userID), test_X, encoder
+    """
+    total, encoder, train_rows, test_idx = prepare_total(data_collection, preprocessing_ft, feats, do_transform_label, encoder)
+
+    return {
+        "total": total,
+        "X": feature_rows(total, feats, train_rows, do_transform_label),
+        "y": total["answerCode"].to_numpy()[train_rows],
+        "user_ids": total["userID"].to_numpy()[train_rows],
+        "test_X": feature_rows(total, feats, test_idx, do_transform_label),
+        "encoder": encoder,
+    }
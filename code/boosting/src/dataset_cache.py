@@ -0,0 +1,71 @@
+import hashlib
+import os
+
+import lightgbm as lgb
+import numpy as np
+import xgboost as xgb
+
+# Dataset 을 만들 때 (binning) 결과에 영향을 주는 LightGBM parameter
+LGB_DATASET_PARAMS = ["max_bin", "max_bin_by_feature", "min_data_in_bin", "bin_construct_sample_cnt",
+                      "min_data_in_leaf", "min_data", "feature_pre_filter", "max_cat_to_onehot",
+                      "use_missing", "zero_as_missing", "categorical_feature", "seed", "data_random_seed"]
+
+
+def data_key(feats, X, y=None, params=None, reference=None):
+    """ feature set + data (X, y) hash + binning parameter 로 cache key 를 만든다.
+
+    X 가 같아도 FEATS 순서나 binning parameter 가 바뀌면 다른 key 가 된다.
+    """
+    h = hashlib.sha1()
+    h.update(",".join(feats).encode())
+    h.update(np.ascontiguousarray(X).tobytes())
+    if y is not None:
+        h.update(np.ascontiguousarray(y).tobytes())
+    if params:
+        h.update(repr(sorted(params.items())).encode())
+    if reference is not None:
+        h.update(reference.encode())
+    return h.hexdigest()[:16]
+
+
+def lgb_dataset(X, y, feats, cat_feats=(), params=None, cache_dir=None, reference=None):
+    """ LightGBM Dataset 을 만들고 binning 이 끝난 binary 를 cache_dir 에 저장해 둔다.
+
+    같은 key 의 binary 가 있으면 binning 없이 그 파일에서 바로 불러온다.
+    valid set 은 train set 의 bin 을 따라야 하므로 reference 로 train 의 (Dataset, key) 를 넘긴다.
+
+    Returns:
+        (lgb.Dataset, key)
+    """
+    params = {k: v for k, v in (params or {}).items() if k in LGB_DATASET_PARAMS}
+    ref_dataset, ref_key = reference if reference is not None else (None, None)
+    key = data_key(feats, X, y, dict(params, cat=list(cat_feats)), ref_key)
+
+    if cache_dir is None:
+        return lgb.Dataset(X, y, feature_name=feats, categorical_feature=list(cat_feats),
+                           reference=ref_dataset, params=params), key
+
+    path = os.path.join(cache_dir, f"lgb-{key}.bin")
+    if os.path.exists(path):
+        return lgb.Dataset(path, reference=ref_dataset, params=params), key
+
+    os.makedirs(cache_dir, exist_ok=True)
+    dataset = lgb.Dataset(X, y, feature_name=feats, categorical_feature=list(cat_feats),
+                          reference=ref_dataset, params=params, free_raw_data=False)
+    dataset.construct().save_binary(path)
+    return dataset, key
+
+
+def xgb_dmatrix(X, y, feats, cache_dir=None):
+    """ XGBoost DMatrix 를 만들고 cache_dir 에 binary 로 저장해 둔다. 같은 key 가 있으면 파일에서 불러온다. """
+    if cache_dir is None:
+        return xgb.DMatrix(X, y, feature_names=feats)
+
+    path = os.path.join(cache_dir, f"xgb-{data_key(feats, X, y)}.buffer")
+    if os.path.exists(path):
+        return xgb.DMatrix(path)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    dmatrix = xgb.DMatrix(X, y, feature_names=feats)
+    dmatrix.save_binary(path)
+    return dmatrix
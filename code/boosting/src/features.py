@@ -0,0 +1,264 @@
+import hashlib
+import os
+import sys
+
+import pandas as pd
+
+# code/common 의 공용 모듈 사용 : key 별 통계 feature, 시간 feature
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+from common.group_stats import HYUNHO_GROUP_FEATS, group_features
+from common.time_features import group_codes, next_group_diff, solved_time, to_epoch_seconds
+
+# column 이름 -> 그 column 을 만드는 Feature
+FEATURE_REGISTRY = {}
+
+
+class Feature:
+    """ registry 에 등록되는 feature 생성 함수
+
+    Args:
+        func : func(df, columns) -> {column: values}. columns 는 outputs 중 필요한 column
+        outputs (list): 함께 계산되는 column 이름
+        inputs (list): 사용하는 원본 column
+        depends (list): 먼저 계산되어 있어야 하는 feature column
+        version (int): 계산 방식을 바꾸면 올려서 cache 를 무효화
+    """
+
+    def __init__(self, func, outputs, inputs, depends, version):
+        self.func = func
+        self.outputs = list(outputs)
+        self.inputs = list(inputs)
+        self.depends = list(depends)
+        self.version = version
+
+
+def register(outputs, inputs=(), depends=(), version=1):
+    outputs = [outputs] if isinstance(outputs, str) else list(outputs)
+
+    def decorator(func):
+        feature = Feature(func, outputs, inputs, depends, version)
+        for col in outputs:
+            FEATURE_REGISTRY[col] = feature
+        return func
+    return decorator
+
+
+class FeatureBuilder:
+    """ FEATS 에 필요한 feature 만 dependency 순서대로 계산하는 preprocessing 함수
+
+    MLModelBase 의 preprocessing_ft 자리에 그대로 넘겨서 사용한다.
+    계산한 column 은 cache_dir 에 column 하나씩 parquet 로 저장하고,
+    파일 이름은 (feature version, 입력 column 의 hash, 의존 feature 의 key) 로 정한다.
+    입력 data 나 feature 하나를 바꾸면 그 column 과 그것에 의존하는 column 만 다시 계산된다.
+
+    Args:
+        feats (list): 사용할 feature column
+        cache_dir (str): column cache 위치. None / "" 이면 cache 를 사용하지 않는다
+    """
+
+    def __init__(self, feats, cache_dir=None):
+        self.feats = list(feats)
+        self.cache_dir = cache_dir or None
+        if self.cache_dir is not None and not _parquet_available():
+            print("parquet engine(pyarrow / fastparquet) 이 없어 feature cache 를 사용하지 않습니다.")
+            self.cache_dir = None
+
+    def __call__(self, df):
+        ## 유저별 시퀀스를 고려하기 위해 아래와 같이 정렬
+        df = df.sort_values(by=['userID', 'Timestamp'], kind='mergesort').reset_index(drop=True)
+        df['Timestamp'] = pd.to_datetime(df['Timestamp'])
+
+        self._input_hash, self._keys = {}, {}
+        self.build(df, self.feats)
+        return df
+
+    def build(self, df, columns):
+        for col in columns:
+            if col in df.columns:
+                continue
+            if col not in FEATURE_REGISTRY:
+                raise KeyError(f"등록되지 않은 feature : {col}")
+
+            feature = FEATURE_REGISTRY[col]
+            wanted = [c for c in feature.outputs if c in columns and c not in df.columns]
+            key = self.feature_key(df, feature)
+
+            missing = []
+            for c in wanted:
+                cached = self.load(c, key)
+                if cached is None:
+                    missing.append(c)
+                else:
+                    df[c] = cached
+
+            if missing:
+                self.build(df, feature.depends)
+                values = feature.func(df, missing)
+                for c in missing:
+                    df[c] = values[c]
+                    self.save(df, c, key)
+
+    def feature_key(self, df, feature):
+        """ feature version + 입력 column hash + 의존 feature key 로 cache key 를 만든다. """
+        if id(feature) in self._keys:
+            return self._keys[id(feature)]
+
+        parts = [",".join(feature.outputs), str(feature.version)]
+        parts += [f"{col}={self.input_hash(df, col)}" for col in feature.inputs]
+        parts += [self.feature_key(df, FEATURE_REGISTRY[dep]) for dep in feature.depends]
+        key = hashlib.sha1("|".join(parts).encode()).hexdigest()[:16]
+
+        self._keys[id(feature)] = key
+        return key
+
+    def input_hash(self, df, col):
+        if col not in self._input_hash:
+            row_hash = pd.util.hash_pandas_object(df[col], index=False).to_numpy()
+            self._input_hash[col] = hashlib.sha1(row_hash.tobytes()).hexdigest()[:16]
+        return self._input_hash[col]
+
+    def cache_path(self, col, key):
+        return os.path.join(self.cache_dir, f"{col}-{key}.parquet")
+
+    def load(self, col, key):
+        if self.cache_dir is None or not os.path.exists(self.cache_path(col, key)):
+            return None
+        # category column 은 Categorical 로, 나머지는 numpy array 로 돌려준다
+        return pd.read_parquet(self.cache_path(col, key))[col].values
+
+    def save(self, df, col, key):
+        if self.cache_dir is None:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        df[[col]].to_parquet(self.cache_path(col, key), index=False)
+
+
+def _parquet_available():
+    try:
+        pd.io.parquet.get_engine("auto")
+    except ImportError:
+        return False
+    return True
+
+
+# ====================================================
+# 유저별 누적 정답 (preprocessing)
+# ====================================================
+
+@register(['user_correct_answer', 'user_total_answer', 'user_acc'], inputs=['userID', 'answerCode'])
+def user_cumulative_answer(df, columns):
+    #유저들의 문제 풀이수, 정답 수, 정답률을 시간순으로 누적해서 계산
+    user_correct = df.groupby('userID')['answerCode'].cumsum()
+    user_correct = user_correct.groupby(df['userID']).shift(1).fillna(0)
+    user_total = df.groupby('userID')['answerCode'].cumcount()
+    user_acc = (user_correct / user_total).fillna(0)
+    return {'user_correct_answer': user_correct, 'user_total_answer': user_total, 'user_acc': user_acc}
+
+
+# testId와 KnowledgeTag의 전체 정답률 / 정답 수
+TEST_TAG_FEATS = [
+    ('test_mean', 'testId', 'answerCode', 'mean'),
+    ('test_sum', 'testId', 'answerCode', 'sum'),
+    ('tag_mean', 'KnowledgeTag', 'answerCode', 'mean'),
+    ('tag_sum', 'KnowledgeTag', 'answerCode', 'sum'),
+]
+
+
+@register([spec[0] for spec in TEST_TAG_FEATS], inputs=['testId', 'KnowledgeTag', 'answerCode'])
+def test_tag_answer(df, columns):
+    return group_features(df, [spec for spec in TEST_TAG_FEATS if spec[0] in columns])
+
+
+# ====================================================
+# 시간 feature (preprocessing_yujin)
+# ====================================================
+
+@register('solved_time', inputs=['userID', 'Timestamp'])
+def user_solved_time(df, columns):
+    # 이상치 제거 : 4 시간(14400 초) 이상은 유저별 중앙값으로 설정
+    return {'solved_time': solved_time(df, 'userID', clip=14400)}
+
+
+@register(['year', 'day', 'weekday'], inputs=['Timestamp'])
+def date_parts(df, columns):
+    return {
+        'year': df['Timestamp'].dt.year,
+        'day': df['Timestamp'].dt.day,
+        'weekday': df['Timestamp'].dt.weekday,
+    }
+
+
+# 연도 / 달 / 날짜 / 시간 / 요일 별 정답률 (정답 수 / 전체 풀이 수)
+TIME_RATIO_PARTS = {
+    'correct_ratio_by_year': 'year',
+    'correct_ratio_by_month': 'month',
+    'correct_ratio_by_day': 'day',
+    'correct_ratio_by_hour': 'hour',
+    'correct_ratio_by_weekday': 'weekday',
+}
+
+
+@register(list(TIME_RATIO_PARTS), inputs=['Timestamp', 'answerCode'])
+def correct_ratio_by_time(df, columns):
+    parts = {col: getattr(df['Timestamp'].dt, TIME_RATIO_PARTS[col]) for col in columns}
+    specs = []
+    for col in columns:
+        specs += [(col + '_sum', col, 'answerCode', 'sum'), (col + '_size', col, 'answerCode', 'size')]
+    stats = group_features(pd.DataFrame(parts).assign(answerCode=df['answerCode']), specs)
+    return {col: stats[col + '_sum'] / stats[col + '_size'] for col in columns}
+
+
+# ====================================================
+# 풀이 시간 / 통계 feature (preprocessing_hyunho)
+# ====================================================
+
+@register('same_item_cnt', inputs=['userID', 'assessmentItemID'])
+def same_item_count(df, columns):
+    # 같은 문제 몇번째 푸는지
+    return {'same_item_cnt': df.groupby(['userID', 'assessmentItemID']).cumcount() + 1}
+
+
+@register('solved_time_shift', inputs=['userID', 'testId', 'Timestamp'], depends=['same_item_cnt'])
+def solved_time_shift(df, columns):
+    # 유저, test, same_item_cnt 구분했을 때 문제 푸는데 걸린 시간 > shift, fillna x
+    codes = group_codes(df, ['userID', 'testId', 'same_item_cnt'])
+    return {'solved_time_shift': next_group_diff(codes, to_epoch_seconds(df['Timestamp']))}
+
+
+@register([spec[0] for spec in HYUNHO_GROUP_FEATS],
+          inputs=['userID', 'assessmentItemID', 'testId', 'KnowledgeTag', 'answerCode'],
+          depends=['same_item_cnt', 'solved_time_shift'])
+def hyunho_group_stats(df, columns):
+    source = {col: df[col] for col in ['userID', 'assessmentItemID', 'testId', 'KnowledgeTag',
+                                         'answerCode', 'same_item_cnt', 'solved_time_shift']}
+    source['correct_solved_time'] = df['solved_time_shift'].where(df['answerCode'] == 1)
+    return group_features(source, [spec for spec in HYUNHO_GROUP_FEATS if spec[0] in columns])
+
+
+@register(['hour', 'month'], inputs=['Timestamp'])
+def hour_month(df, columns):
+    return {
+        'hour': df['Timestamp'].dt.hour.astype('category'),
+        'month': df['Timestamp'].dt.month.astype('category'),
+    }
+
+
+@register('item_num', inputs=['assessmentItemID'])
+def item_num(df, columns):
+    ## 문제 번호 추가
+    return {'item_num': df['assessmentItemID'].str[7:].astype('category')}
+
+
+@register('item_seq', inputs=['userID', 'testId'], depends=['same_item_cnt'])
+def item_seq(df, columns):
+    ## 문제 푼 순서 추가
+    item_seq = df.groupby(['userID', 'testId', 'same_item_cnt']).cumcount() + 1
+    return {'item_seq': item_seq.astype('category')}
+
+
+@register(['Bigcat', 'smallcat', 'high_test_category', 'test_category'], inputs=['testId'])
+def test_category(df, columns):
+    # 시험지 카테고리 : 대분류 / 소분류 (yujin 의 high_test_category / test_category 와 같은 값)
+    big = df['testId'].str[2].astype('category')
+    small = df['testId'].str[7:10].astype('category')
+    return {'Bigcat': big, 'smallcat': small, 'high_test_category': big, 'test_category': small}
@@ -0,0 +1,110 @@
+import multiprocessing
+import os
+
+import lightgbm as lgb
+import numpy as np
+import xgboost as xgb
+from catboost import CatBoostClassifier, Pool
+from sklearn.metrics import roc_auc_score
+
+from .datasplit import user_kfold_index
+
+# fork 한 fold process 가 물려받는 data. (fold 마다 pickle 로 보내지 않고 부모의 array 를 그대로 사용)
+# library dataset 은 OpenMP 를 쓰므로 fork 이후 process 마다 처음 fold 에서 한번 만든다
+_FOLD_STATE = {}
+
+
+def train_kfold(model_name, params, kfold_data, feats, n_splits=5, n_jobs=1, seed=42, cat_features=()):
+    """ user 단위 K-fold 로 fold 별 모델을 학습하고 out-of-fold / test 예측을 만든다.
+
+    전체 train X 로 library dataset (LightGBM Dataset / XGBoost DMatrix / CatBoost Pool) 을 process 마다 한번 만들고
+    fold 는 그 dataset 의 subset / slice (row 위치) 로 사용한다.
+    n_jobs 개의 process 가 fold 를 나누어 학습하고, process 별 thread 수는 cpu 수 / n_jobs 로 제한한다.
+
+    Args:
+        kfold_data (dict): build_kfold_data 의 결과 (X, y, user_ids, test_X)
+
+    Returns:
+        oof (X 의 row 별 예측), test_preds (fold 평균), fold_aucs
+    """
+    _FOLD_STATE.update(
+        model_name=model_name,
+        params=dict(params),
+        feats=list(feats),
+        cat_features=list(cat_features),
+        data=kfold_data,
+        threads=max(1, (os.cpu_count() or 1) // n_jobs),
+    )
+    folds = list(user_kfold_index(kfold_data["user_ids"], n_splits=n_splits, seed=seed))
+
+    try:
+        if n_jobs == 1:
+            results = [_run_fold(fold) for fold in folds]
+        else:
+            with multiprocessing.get_context("fork").Pool(n_jobs) as pool:
+                results = pool.map(_run_fold, folds)
+    finally:
+        _FOLD_STATE.clear()
+
+    y = kfold_data["y"]
+    oof = np.full(len(y), np.nan)
+    test_preds = np.zeros(len(kfold_data["test_X"]))
+    fold_aucs = []
+    for (_, valid_idx), (valid_pred, test_pred) in zip(folds, results):
+        oof[valid_idx] = valid_pred
+        test_preds += test_pred / n_splits
+        fold_aucs.append(roc_auc_score(y[valid_idx], valid_pred))
+
+    return oof, test_preds, fold_aucs
+
+
+def build_full_dataset(model_name, kfold_data, feats, cat_features=()):
+    X, y = kfold_data["X"], kfold_data["y"]
+    if model_name in ("LGBM", "LGBMClassifier"):
+        # binning 은 전체 X 에서 한번만 하고, fold 는 subset 으로 bin 을 공유한다
+        return lgb.Dataset(X, y, feature_name=feats, categorical_feature=list(cat_features), free_raw_data=False).construct()
+    if model_name == "XGBClassifier":
+        return xgb.DMatrix(X, y, feature_names=feats)
+    if model_name == "CatBoostClassifier":
+        return Pool(X, y, cat_features=list(cat_features))
+    raise ValueError(f"K-fold 를 지원하지 않는 model : {model_name}")
+
+
+def _run_fold(fold):
+    """ fold 하나를 학습하고 (valid 예측, test 예측) 을 돌려준다. """
+    train_idx, valid_idx = fold
+    state = _FOLD_STATE
+    model_name, params, threads = state["model_name"], dict(state["params"]), state["threads"]
+    if "dataset" not in state:
+        state["dataset"] = build_full_dataset(model_name, state["data"], state["feats"], state["cat_features"])
+    dataset = state["dataset"]
+    X, test_X = state["data"]["X"], state["data"]["test_X"]
+
+    if model_name in ("LGBM", "LGBMClassifier"):
+        params.update(num_threads=threads)
+        num_boost_round = params.pop("n_estimators", 2000)
+        train_set, valid_set = dataset.subset(train_idx), dataset.subset(valid_idx)
+        model = lgb.train(params, train_set,
+                          num_boost_round=num_boost_round,
+                          valid_sets=[valid_set],
+                          callbacks=[lgb.early_stopping(100), lgb.log_evaluation(100)])
+        return model.predict(X[valid_idx]), model.predict(test_X)
+
+    if model_name == "XGBClassifier":
+        params.update(objective="binary:logistic", eval_metric="auc", nthread=threads)
+        num_boost_round = params.pop("n_estimators", 100)
+        dvalid = dataset.slice(valid_idx)
+        model = xgb.train(params, dataset.slice(train_idx), num_boost_round,
+                          evals=[(dvalid, "valid")],
+                          verbose_eval=50,
+                          early_stopping_rounds=50)
+        iteration_range = (0, model.best_iteration + 1)
+        test_pred = model.predict(xgb.DMatrix(test_X, feature_names=state["feats"]), iteration_range=iteration_range)
+        return model.predict(dvalid, iteration_range=iteration_range), test_pred
+
+    params.update(eval_metric="AUC", thread_count=threads)
+    valid_pool = dataset.slice(valid_idx)
+    model = CatBoostClassifier(**params)
+    model.fit(dataset.slice(train_idx), eval_set=valid_pool, early_stopping_rounds=35, verbose=100)
+    test_pool = Pool(test_X, cat_features=dataset.get_cat_feature_indices())
+    return model.predict_proba(valid_pool)[:, 1], model.predict_proba(test_pool)[:, 1]
@@ -1,20 +1,28 @@
 import wandb 
 from xgboost import XGBClassifier
 import lightgbm as lgb
+import xgboost as xgb
 from lightgbm import LGBMClassifier
 from catboost import CatBoostClassifier
 
 from .dataloader import * 
 from .datasplit import * 
 from .afterprocessing import *
+from .dataset_cache import data_key, lgb_dataset, xgb_dmatrix
 
 from sklearn.metrics import roc_auc_score
 from sklearn.metrics import accuracy_score
 import os 
+import multiprocessing
 import numpy as np
+import pandas as pd
 
 import optuna
 from optuna.samplers import TPESampler
+try:
+    from optuna_integration import CatBoostPruningCallback
+except ImportError:
+    from optuna.integration import CatBoostPruningCallback
 
 class MLModelBase:
 
@@ -23,37 +31,33 @@ class MLModelBase:
                  best_params : dict, 
                  preprocessing_ft,
                  use_feat_list : list,
-                 do_transform_label: bool=True ):
+                 do_transform_label: bool=True,
+                 dataset_cache_dir: str=None,
+                 encoder: CategoryEncoder=None ):
         
         self.best_params = best_params 
+        # LightGBM Dataset / XGBoost DMatrix binary 를 저장해 두는 위치 (None 이면 저장하지 않음)
+        self.dataset_cache_dir = dataset_cache_dir or None
         self.data = data_collection
         self.model = XGBClassifier( **self.best_params)
         # 사용할 Feature 설정
         self.FEATS = use_feat_list
         
-        # 전체 데이터 처리를 위한 total data 
-        self.data["train"]["is_train"] = 1 
-        self.data["test"]["is_test"]   = 0
-        self.data["test"].loc[self.data["test"]["answerCode"]== -1 , "answerCode"] = np.NaN 
-        total_df = pd.concat([self.data["train"], self.data["test"] ])
-        total_df =  preprocessing_ft( total_df )
-        total_df["answerCode"] = total_df["answerCode"].fillna(-1)
-
-        self.data["train"] = total_df[total_df["is_train"]==1]
-        self.data["test"]  = total_df[total_df["is_train"]!=0]
-
-        self.data["train"].drop("is_train",axis=1,inplace=True)
-        self.data["test"].drop("is_train",axis=1,inplace=True)
-
-        # mapping 변경이 필요하면 아래 코드를 각 클래스별로 포함 시키고 함수를 바꾸어 줘야 함
-        # 현재는 int, float, bool 형이면 label encoding 하는 방식 
-        if( True == do_transform_label):
-            self.data["train"] = mapping_cat_to_label( self.data["train"])
-            self.data["test"] = mapping_cat_to_label( self.data["test"])
-
-        # split 변경이 필요하면 각 클래스에 포함 시켜줘야 함 
-        self.train_X, self.y_train, self.valid_X, self.y_valid \
-            = custom_train_test_split( self.data["train"],self.FEATS )
+        # 전체 데이터 처리를 위한 total data : train / test 를 합친 frame 하나와 row 위치로 구분
+        # 학습 / 검증 / 추론 feature 는 FEATS column 만 float32 matrix 로 한번 만든다
+        # (do_transform_label=False 이면 category 를 그대로 둔 FEATS DataFrame)
+        # encoder 를 주면 (저장해 둔 CategoryEncoder) 다시 fit 하지 않고 그 code 를 그대로 사용
+        model_data = build_model_data( self.data, preprocessing_ft, self.FEATS, do_transform_label, encoder)
+
+        self.total = model_data["total"]
+        self.train_X, self.y_train = model_data["train_X"], model_data["y_train"]
+        self.valid_X, self.y_valid = model_data["valid_X"], model_data["y_valid"]
+        self.test_X = model_data["test_X"]
+
+        # train+test 에서 fit 한 category encoder. 모델과 같이 저장해서 추론 때도 같은 code 를 사용
+        # encoding 된 FEATS 는 LightGBM 에 native categorical feature 로 넘긴다
+        self.encoder = model_data["encoder"]
+        self.cat_feats = [] if self.encoder is None else [f for f in self.FEATS if f in self.encoder.categories]
 
     
     # def preprocessing(self):
@@ -88,17 +92,15 @@ class MLModelBase:
 
     def inference(self):
 
-        # LEAVE LAST INTERACTION ONLY
-        test_df = self.data["test"][self.data["test"]['userID'] != self.data["test"]['userID'].shift(-1)]
-
-        # DROP ANSWERCODE
-        y_test = test_df['answerCode']
-        test_X = test_df.drop(['answerCode'], axis=1)
-
-        self.total_preds = self.model.predict(test_X[self.FEATS])
+        # test_X 는 각 유저의 마지막 interaction 의 FEATS 만 가지고 있음
+        self.total_preds = self.model.predict(self.test_X)
 
         return self.total_preds
 
+    def save_encoder(self, path):
+        if self.encoder is not None:
+            self.encoder.save(path)
+
 
 class MyXGBoostClassifier(MLModelBase) :
 
@@ -106,14 +108,18 @@ class MyXGBoostClassifier(MLModelBase) :
                        best_params : dict, 
                        preprocessing_ft, 
                        use_feat_list : list,
-                       do_transform_label: bool=True ):
+                       do_transform_label: bool=True,
+                       dataset_cache_dir: str=None,
+                       encoder: CategoryEncoder=None ):
         
         # default data split 방법은 custom data split 이다. 
         super().__init__( data_collection, 
                           best_params, 
                           preprocessing_ft,
                           use_feat_list,
-                          do_transform_label)
+                          do_transform_label,
+                          dataset_cache_dir,
+                          encoder)
 
         self.model = XGBClassifier( **self.best_params)
 
@@ -122,15 +128,19 @@ class MyXGBoostClassifier(MLModelBase) :
         wandb.login()
         wandb.init(project = "XGBC", config = self.best_params)
 
-        print(self.train_X)
-        self.model.fit( self.train_X[self.FEATS], self.y_train,
-                        eval_set=[(self.valid_X[self.FEATS], self.y_valid)],
-                        eval_metric='auc',
-                        verbose=50,
-                        early_stopping_rounds= 50)
+        # XGBClassifier.fit 은 실행할 때마다 numpy -> DMatrix 변환을 다시 하므로
+        # dataset_cache_dir 에 저장해 둔 DMatrix 로 xgb.train 을 사용한다
+        dtrain = xgb_dmatrix( self.train_X, self.y_train, self.FEATS, self.dataset_cache_dir)
+        dvalid = xgb_dmatrix( self.valid_X, self.y_valid, self.FEATS, self.dataset_cache_dir)
 
-        y_pred_train = self.model.predict_proba( self.train_X[self.FEATS] )[:,1]
-        y_pred_valid = self.model.predict_proba(self.valid_X[self.FEATS])[:,1]
+        params = dict(self.best_params, objective="binary:logistic", eval_metric="auc")
+        num_boost_round = params.pop("n_estimators", 100)
+        self.model = xgb.train( params, dtrain, num_boost_round,
+                                evals=[(dvalid, "valid")],
+                                verbose_eval=50,
+                                early_stopping_rounds= 50)
+
+        y_pred_valid = self.predict_proba(self.valid_X)
 
         # make predictions on test
         acc = accuracy_score(self.y_valid, np.where(y_pred_valid >= 0.5, 1, 0))
@@ -141,6 +151,17 @@ class MyXGBoostClassifier(MLModelBase) :
 
         return auc
 
+    def predict_proba(self, X):
+        # early stopping 된 best iteration 까지만 사용
+        return self.model.predict( xgb.DMatrix(X, feature_names=self.FEATS),
+                                   iteration_range=(0, self.model.best_iteration + 1))
+
+    def inference(self):
+
+        self.total_preds = self.predict_proba(self.test_X)
+
+        return self.total_preds
+
 
 class MyLGBM(MLModelBase):
 
@@ -148,17 +169,24 @@ class MyLGBM(MLModelBase):
                     best_params : dict, 
                     preprocessing_ft, 
                     use_feat_list : list,
-                    do_transform_label: bool=True ):
+                    do_transform_label: bool=True,
+                    dataset_cache_dir: str=None,
+                    encoder: CategoryEncoder=None ):
     
         # default data split 방법은 custom data split 이다. 
         super().__init__( data_collection, 
                           best_params, 
                           preprocessing_ft,
                           use_feat_list,
-                          do_transform_label)
+                          do_transform_label,
+                          dataset_cache_dir,
+                          encoder)
         
-        self.lgb_train = lgb.Dataset( self.train_X[self.FEATS], self.y_train)
-        self.lgb_valid = lgb.Dataset( self.valid_X[self.FEATS], self.y_valid)
+        # binning 이 끝난 Dataset 을 dataset_cache_dir 에 binary 로 저장해 두고, 같은 data / FEATS / binning parameter 면 재사용
+        self.lgb_train, train_key = lgb_dataset( self.train_X, self.y_train, self.FEATS, self.cat_feats,
+                                                 self.best_params, self.dataset_cache_dir)
+        self.lgb_valid, _ = lgb_dataset( self.valid_X, self.y_valid, self.FEATS, self.cat_feats,
+                                         self.best_params, self.dataset_cache_dir, reference=(self.lgb_train, train_key))
         self.model = lgb
 
     def train(self):
@@ -169,15 +197,14 @@ class MyLGBM(MLModelBase):
             self.best_params, 
             self.lgb_train,
             valid_sets=[self.lgb_train, self.lgb_valid],
-            verbose_eval=100,
             num_boost_round=2000,
-            early_stopping_rounds=100,
             # valid_names=('validation'),
-            callbacks=[wandb.lightgbm.wandb_callback()] )
+            # lightgbm 4 부터 verbose_eval / early_stopping_rounds 인자가 없어서 callback 으로 (kfold.py 와 같이)
+            callbacks=[lgb.early_stopping(100), lgb.log_evaluation(100), wandb.lightgbm.wandb_callback()] )
 
         wandb.lightgbm.log_summary(self.model, save_model_checkpoint=True)
 
-        preds = self.model.predict(self.valid_X[self.FEATS])
+        preds = self.model.predict(self.valid_X)
 
         acc = accuracy_score(self.y_valid, np.where(preds >= 0.5, 1, 0))
         auc = roc_auc_score(self.y_valid, preds)
@@ -192,17 +219,21 @@ class MyLGBMClassifier(MLModelBase):
                     best_params : dict, 
                     preprocessing_ft, 
                     use_feat_list : list,
-                    do_transform_label: bool=True ):
+                    do_transform_label: bool=True,
+                    dataset_cache_dir: str=None,
+                    encoder: CategoryEncoder=None ):
     
         # default data split 방법은 custom data split 이다. 
         super().__init__( data_collection, 
                           best_params, 
                           preprocessing_ft,
                           use_feat_list,
-                          do_transform_label)
+                          do_transform_label,
+                          dataset_cache_dir,
+                          encoder)
         
-        self.lgb_train = lgb.Dataset( self.train_X[self.FEATS], self.y_train)
-        self.lgb_valid = lgb.Dataset( self.valid_X[self.FEATS], self.y_valid)
+        # LGBMClassifier.fit 은 내부에서 Dataset 을 새로 만들기 때문에 미리 만든 Dataset 을 넘길 수 없다
+        # (binary cache 가 필요하면 MyLGBM 을 사용)
         self.model = LGBMClassifier( **self.best_params)
 
     def train(self):
@@ -210,15 +241,17 @@ class MyLGBMClassifier(MLModelBase):
         wandb.init(project="LGBMClassifier", config= self.best_params)
         
         self.model.fit(
-                    X=self.train_X[self.FEATS],
+                    X=self.train_X,
                     y=self.y_train,
-                    eval_set=[(self.valid_X[self.FEATS], self.y_valid)],
-                    early_stopping_rounds=100,
-                    verbose=20,
+                    eval_set=[(self.valid_X, self.y_valid)],
+                    feature_name=self.FEATS,
+                    categorical_feature=self.cat_feats,
+                    # lightgbm 4 부터 fit 에 early_stopping_rounds / verbose 인자가 없어서 callback 으로
+                    callbacks=[lgb.early_stopping(100), lgb.log_evaluation(20)],
                 )
 
         # wandb.lightgbm.log_summary(self.model, save_model_checkpoint=True)
-        preds = self.model.predict(self.valid_X[self.FEATS])
+        preds = self.model.predict(self.valid_X)
 
         acc = accuracy_score(self.y_valid, np.where(preds >= 0.5, 1, 0))
         auc = roc_auc_score(self.y_valid, preds)
@@ -234,26 +267,39 @@ class MyCatClassifier(MLModelBase):
                     best_params : dict, 
                     preprocessing_ft, 
                     use_feat_list : list,
-                    do_transform_label: bool=True ):
+                    do_transform_label: bool=True,
+                    dataset_cache_dir: str=None,
+                    n_trials: int=1,
+                    n_jobs: int=1,
+                    study_dir: str="optuna/" ):
     
         # default data split 방법은 custom data split 이다. 
         super().__init__( data_collection, 
                           best_params, 
                           preprocessing_ft,
                           use_feat_list,
-                          do_transform_label)
+                          do_transform_label,
+                          dataset_cache_dir)
         
         self.model = CatBoostClassifier( **self.best_params )
                     # loss_function='CrossEntropy' 
         self.cat_features = [f for f in self.train_X.columns if self.train_X[f].dtype == 'object' or self.train_X[f].dtype == 'category']
+
+        # optuna 설정 : n_jobs 개의 process 가 study_dir 의 SQLite study 를 같이 사용해서 n_trials 를 나누어 실행
+        self.n_trials = n_trials
+        self.n_jobs = max(1, min(n_jobs, n_trials))
+        self.study_dir = study_dir
         
     def train(self):
+
+        # process 하나가 쓰는 CPU thread 수. process 끼리 core 를 나누어 쓰도록 제한
+        thread_count = max(1, (os.cpu_count() or 1) // self.n_jobs)
         
         def objective(trial):
             param = {
                 "random_state":42,
-                'learning_rate' : trial.suggest_loguniform('learning_rate', 0.01, 0.3),
-                'bagging_temperature' :trial.suggest_loguniform('bagging_temperature', 0.01, 100.00),
+                'learning_rate' : trial.suggest_float('learning_rate', 0.01, 0.3, log=True),
+                'bagging_temperature' :trial.suggest_float('bagging_temperature', 0.01, 100.00, log=True),
                 "n_estimators":trial.suggest_int("n_estimators", 1000, 10000),
                 "max_depth":trial.suggest_int("max_depth", 4, 16),
                 'random_strength' :trial.suggest_int('random_strength', 0, 100),
@@ -262,53 +308,74 @@ class MyCatClassifier(MLModelBase):
                 "min_child_samples": trial.suggest_int("min_child_samples", 5, 100),
                 "max_bin": trial.suggest_int("max_bin", 200, 500),
                 'od_type': trial.suggest_categorical('od_type', ['IncToDec', 'Iter']),
-                'eval_metric': "AUC"
+                'eval_metric': "AUC",
+                'thread_count': thread_count,
                 # 'metric': 'auc'
             }
 
             # X_train, X_valid, y_train, y_valid = train_test_split(X,y,test_size=0.2)
             
             # cat_features =[0,1,2,5,6,7,8,15,18]
+            # iteration 마다 valid AUC 를 optuna 에 보고하고, 다른 trial 보다 나쁘면 중간에 멈춘다
+            pruning_callback = CatBoostPruningCallback(trial, "AUC")
             cat = CatBoostClassifier(**param)
             cat.fit(self.train_X, self.y_train,
                     eval_set=(self.valid_X, self.y_valid),
                     early_stopping_rounds=35,cat_features=self.cat_features,
-                    verbose=100)
-            cat_pred = cat.predict(self.valid_X)
+                    verbose=100,
+                    callbacks=[pruning_callback])
+            pruning_callback.check_pruned()
+
+            cat_pred = cat.predict_proba(self.valid_X)[:,1]
             auc_score = roc_auc_score(self.y_valid, cat_pred)
             print('AUC score of CatBoost =', auc_score)
 
+            # best trial 의 모델을 다시 학습하지 않도록 학습한 모델을 저장해 둔다
+            model_path = os.path.join(self.study_dir, f"cat_trial_{trial.number}.cbm")
+            cat.save_model(model_path)
+            trial.set_user_attr("model_path", model_path)
+
             return auc_score
         
-        sampler = TPESampler(seed=42)
+        os.makedirs(self.study_dir, exist_ok=True)
+        storage = "sqlite:///" + os.path.join(self.study_dir, "cat_parameter_opt.db")
+        # FEATS / train, valid data / parameter 가 같을 때만 같은 study 를 이어서 쓴다
+        # (다른 feature set 이나 split 으로 학습한 이전 trial 모델을 best 로 불러오지 않도록)
+        study_name = self.study_name()
         study = optuna.create_study(
-            study_name = 'cat_parameter_opt',
+            study_name = study_name,
+            storage = storage,
+            load_if_exists = True,
             direction = 'maximize',
-            sampler = sampler,
+            sampler = TPESampler(seed=42),
+            pruner = optuna.pruners.MedianPruner(n_warmup_steps=100),
         )
-        study.optimize(objective, n_trials=1)
+
+        if self.n_jobs == 1:
+            study.optimize(objective, n_trials=self.n_trials)
+        else:
+            # fork 한 process 는 train / valid data 와 objective 를 그대로 물려받는다
+            ctx = multiprocessing.get_context("fork")
+            workers = [ctx.Process(target=_optimize_worker,
+                                   args=(objective, study_name, storage, self.n_trials // self.n_jobs + (i < self.n_trials % self.n_jobs), 42 + i))
+                       for i in range(self.n_jobs)]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+            study = optuna.load_study(study_name = study_name, storage = storage)
+
         print("Best Score:",study.best_value)
         print("Best trial",study.best_trial.params)
 
         wandb.login()    
         wandb.init(project = "CatBC", config = self.best_params)
 
-        best_params_cat = study.best_trial.params
-        best_params_cat.update({'eval_metric':'AUC'})
-
-        self.model = CatBoostClassifier(**best_params_cat)
-        self.model.fit(self.train_X, self.y_train,
-                eval_set=(self.valid_X, self.y_valid),
-                early_stopping_rounds=35,cat_features=self.cat_features,
-                verbose=100)
-        # self.model.fit(
-        #     self.train_X, self.y_train,
-        #     cat_features=self.cat_features,
-        #     eval_set=(self.valid_X, self.y_valid),
-        #     verbose=False
-        # )
+        self.model = CatBoostClassifier()
+        self.model.load_model(study.best_trial.user_attrs["model_path"])
+        _remove_trial_models(study)
 
-        preds = self.model.predict(self.valid_X[self.FEATS])
+        preds = self.model.predict_proba(self.valid_X)[:,1]
 
         acc = accuracy_score(self.y_valid, np.where(preds >= 0.5, 1, 0))
         auc = roc_auc_score(self.y_valid, preds)
@@ -317,3 +384,31 @@ class MyCatClassifier(MLModelBase):
 
         return auc
 
+    def study_name(self):
+        """ FEATS, train / valid data, cat_features, best_params 의 hash 를 붙인 study 이름 """
+        X = np.concatenate([_frame_hash(self.train_X), _frame_hash(self.valid_X)])
+        y = np.concatenate([np.asarray(self.y_train), np.asarray(self.y_valid)])
+        key = data_key(self.FEATS, X, y, params=dict(self.best_params, cat_features=self.cat_features))
+        return f"cat_parameter_opt-{key}"
+
+
+def _frame_hash(X):
+    # object / category column 도 값 기준으로 hash 하도록 row 별 hash (uint64) 로 바꾼다
+    return pd.util.hash_pandas_object(pd.DataFrame(X), index=False).to_numpy()
+
+
+def _optimize_worker(objective, study_name, storage, n_trials, seed):
+    # 같은 SQLite study 에 접속해서 trial 을 나누어 실행한다. sampler seed 는 worker 마다 다르게
+    study = optuna.load_study(study_name = study_name,
+                              storage = storage,
+                              sampler = TPESampler(seed=seed),
+                              pruner = optuna.pruners.MedianPruner(n_warmup_steps=100))
+    study.optimize(objective, n_trials=n_trials)
+
+
+def _remove_trial_models(study):
+    # best trial 외의 trial 모델 파일은 지운다
+    for trial in study.get_trials(deepcopy=False, states=(optuna.trial.TrialState.COMPLETE,)):
+        path = trial.user_attrs.get("model_path")
+        if trial.number != study.best_trial.number and path is not None and os.path.exists(path):
+            os.remove(path)
@@ -1,8 +1,33 @@
 
+import os
+import sys
+
 import pandas as pd 
 import numpy as np
 from sklearn.preprocessing import LabelEncoder
 
+# code/common 의 공용 모듈 사용 : key 별 평균 / 표준편차 feature, 시간 feature 를 한번에 계산
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+from common.group_stats import HYUNHO_GROUP_FEATS, factorize_keys, group_features
+from common.time_features import group_codes, next_group_diff, solved_time, to_epoch_seconds
+
+
+def add_group_features(df, specs, key_cache=None):
+    """ spec 의 group 통계 feature 를 key 별 한번의 factorize 로 계산해서 추가한다.
+
+    key_cache 는 group_features 에 그대로 넘긴다. 앞에서 같은 row 순서로 factorize 한 key 가 있으면 재사용한다.
+    기존 코드는 set_index('assessmentItemID') / reset_index 를 거치면서
+    assessmentItemID 가 첫번째 column 이 되고 index 가 초기화되었으므로 그 형태를 그대로 맞춘다.
+    """
+    source = {col: df[col] for col in df.columns}
+    source['correct_solved_time'] = df['solved_time_shift'].where(df['answerCode'] == 1)
+    feats = group_features(source, specs, key_cache)
+
+    # column 을 하나씩 추가하지 않고 feature 전체를 한번에 붙인다
+    columns = ['assessmentItemID'] + [col for col in df.columns if col != 'assessmentItemID' and col not in feats]
+    feats = pd.DataFrame(feats, index=df.index, copy=False)
+    return pd.concat([df[columns], feats], axis=1).reset_index(drop=True)
+
 def percentile(s):
     return np.sum(s) / len(s)
 
@@ -37,13 +62,8 @@ def preprocessing_yujin(df):
 
     # 문제 푼 시간 : 해당 문제를 푼 시간을 반영하기 위해 shift 를 하면 성능에 영향을 준다는 견해가 있음 
     df['Timestamp'] = pd.to_datetime(df['Timestamp'])
-    df["solved_time"] = df.groupby('userID')["Timestamp"].diff().shift(-1)
-    df["solved_time"] = df["solved_time"].dt.seconds
-
-    # 이상치 제거 : 2 시간 이상은 평균값으로 설정 
-    df.loc[ df["solved_time"] > 14400,"solved_time"] = np.NaN
-    fill_mean_func = lambda g: g["solved_time"].fillna(g["solved_time"].median())
-    df["solved_time"] = df.groupby('userID').apply(fill_mean_func).reset_index()["solved_time"]
+    # 이상치 제거 : 4 시간(14400 초) 이상은 유저별 중앙값으로 설정 
+    df["solved_time"] = solved_time(df, 'userID', clip=14400)
 
     df["year"]    = df['Timestamp'].dt.year
     df["month"]   = df['Timestamp'].dt.month
@@ -96,7 +116,10 @@ def preprocessing_hyunho( total:pd.DataFrame ):
     total.sort_values(by=['userID','Timestamp'], inplace=True)
     total['Timestamp'] = pd.to_datetime(total['Timestamp'])
    
-    total['same_item_cnt'] = total.groupby(['userID', 'assessmentItemID']).cumcount() + 1
+    # string key (assessmentItemID, testId) 는 여기서 한번만 factorize 하고 아래 feature 들에서 code 를 재사용
+    # (정렬 이후 row 순서가 바뀌지 않는 동안만 유효)
+    key_cache = {}
+    total['same_item_cnt'] = total.groupby(factorize_keys(total, ['userID', 'assessmentItemID'], key_cache)[0]).cumcount() + 1
     
     # elapsed
     # total['Timestamp'] = pd.to_datetime(total['Timestamp'])
@@ -108,44 +131,12 @@ def preprocessing_hyunho( total:pd.DataFrame ):
     # total['elapsed'] = diff
     
     # 유저, test, same_item_cnt 구분했을 때 문제 푸는데 걸린 시간 > shift, fillna x
-    diff_shift = total.loc[:, ['userID', 'testId', 'Timestamp', 'same_item_cnt']].groupby(['userID', 'testId', 'same_item_cnt']).diff().shift(-1)
-    diff_shift = diff_shift['Timestamp'].apply(lambda x: x.total_seconds())
-    total['solved_time_shift'] = diff_shift
+    timestamp = to_epoch_seconds(total['Timestamp'])
+    total['solved_time_shift'] = next_group_diff(group_codes(total, ['userID', 'testId', 'same_item_cnt'], key_cache), timestamp)
     # total['solved_time_shift'] = total.groupby(['userID', 'testId', 'same_item_cnt'])['solved_time_shift'].apply(lambda x:x.fillna(x.mean()))
     
-    # 1. agg 값 구하기
-    ## 1-1. 유저/문제/시험지/태그별 평균 정답률
-    total['user_avg'] = total.groupby('userID')['answerCode'].transform('mean')
-    total['item_avg'] = total.groupby('assessmentItemID')['answerCode'].transform('mean')
-    total['test_avg'] = total.groupby('testId')['answerCode'].transform('mean')
-    total['tag_avg'] = total.groupby('KnowledgeTag')['answerCode'].transform('mean')
-
-    ## 1-2. 유저/문제/시험지별 평균 풀이시간
-    total['user_time_avg'] = total.groupby('userID')['solved_time_shift'].transform('mean')
-    total['item_time_avg'] = total.groupby('assessmentItemID')['solved_time_shift'].transform('mean')
-    total['test_time_avg'] = total.groupby('testId')['solved_time_shift'].transform('mean')
-    total['tag_time_avg'] = total.groupby('KnowledgeTag')['solved_time_shift'].transform('mean')
-
-    # ## 1-3. 유저/문제/시험지/태그별 평균 표준편차
-    # total['user_std'] = total.groupby('userID')['answerCode'].transform('std')
-    # total['item_std'] = total.groupby('assessmentItemID')['answerCode'].transform('std')
-    # total['test_std'] = total.groupby('testId')['answerCode'].transform('std')
-    # total['tag_std'] = total.groupby('KnowledgeTag')['answerCode'].transform('std')
-    
-    # 맞은 사람의 문제별 평균 풀이시간
-    total = total.set_index('assessmentItemID')
-    total['Item_mean_solved_time'] = total[total['answerCode'] == 1].groupby('assessmentItemID')['solved_time_shift'].mean()
-    total = total.reset_index(drop = False)
-     
-    # 유저/문제/시험지/태그별 표준편차
-    total['user_std'] = total.groupby('userID')['answerCode'].transform('std')
-    total['item_std'] = total.groupby('assessmentItemID')['answerCode'].transform('std')
-    total['test_std'] = total.groupby('testId')['answerCode'].transform('std')
-    total['tag_std'] = total.groupby('KnowledgeTag')['answerCode'].transform('std')
-    
-    ## 1-3. 현재 유저의 해당 문제지 평균 정답률/풀이시간
-    total['user_current_avg'] = total.groupby(['userID', 'testId', 'same_item_cnt'])['answerCode'].transform('mean')
-    total['user_current_time_avg'] = total.groupby(['userID', 'testId', 'same_item_cnt'])['solved_time_shift'].transform('mean')
+    # 1. agg 값 구하기 : 유저/문제/시험지/태그별 평균 정답률, 풀이시간, 표준편차
+    total = add_group_features(total, HYUNHO_GROUP_FEATS, key_cache)
     
     # 2. 컬럼 추가
     total['hour'] = total['Timestamp'].dt.hour
@@ -161,7 +152,7 @@ def preprocessing_hyunho( total:pd.DataFrame ):
     # df['item_num'] = df['item_num'].map(in2idx)
     
     ## 문제 푼 순서 추가 > 상대적 순서?
-    total['item_seq'] = total.groupby(['userID', 'testId', 'same_item_cnt']).cumcount() +1
+    total['item_seq'] = total.groupby(group_codes(total, ['userID', 'testId', 'same_item_cnt'], key_cache)).cumcount() +1
     total['item_seq'] = total['item_seq'].astype('category')
     # df['item_seq'] = df['item_seq'] - df['item_num'].astype(int)
     # df['item_num'] = df['item_num'].astype('category')
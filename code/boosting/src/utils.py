@@ -30,3 +30,15 @@ def save(args,preds, auc):
         w.write("id,prediction\n")
         for id, p in enumerate(preds):
             w.write('{},{}\n'.format(id,p))
+
+
+def save_oof(args, total, train_rows_oof, auc):
+
+    # SAVE OUT-OF-FOLD PREDICTION : train row 별 (userID, answerCode, oof 예측), stacking / ensemble 용
+    file_name = "_".join( [ args.model[:4], str(round(auc,2)) ,str(int(time.time())),"oof.csv" ])
+    write_path = os.path.join(args.output_dir,file_name)
+    if not os.path.exists(args.output_dir):
+        os.makedirs(args.output_dir)
+    train = total[total["is_train"]]
+    print("writing oof prediction : {}".format(write_path))
+    train[["userID", "answerCode"]].assign(prediction=train_rows_oof).to_csv(write_path, index=False)
@@ -4,8 +4,10 @@ import wandb
 from src.args import parse_args
 from src.dataloader import *
 from src.preprocessing import *
+from src.features import FeatureBuilder
 from src.models import *
-from src.utils import setSeeds,save
+from src.kfold import train_kfold
+from src.utils import setSeeds,save,save_oof
 from src.config import boosting_params
 
 
@@ -23,26 +25,72 @@ def main(args):
     FEATS = ['KnowledgeTag', 'same_item_cnt', 'user_avg', 'item_avg', 'test_avg', 'tag_avg', 'user_time_avg', 'item_time_avg',
        'test_time_avg', 'tag_time_avg', 'user_current_avg', 'user_current_time_avg', 'hour', 'item_num', 'Bigcat','smallcat']
     cur_model = None
+
+    # FEATS 에 필요한 feature 만 계산하고, column 별로 feature_cache_dir 에 저장해서 재사용
+    preprocessing_ft = FeatureBuilder(FEATS, args.feature_cache_dir)
+
+    # 저장해 둔 category encoder 가 있으면 다시 fit 하지 않고 같은 code 로 encoding (학습 후 model_dir 에 다시 저장)
+    encoder = CategoryEncoder.load(args.encoder_path) if args.encoder_path else None
+
+    if args.n_folds > 1:
+        main_kfold(args, data_collect, preprocessing_ft, FEATS, encoder)
+        return
     
     if  "XGBClassifier" == args.model :
-        cur_model = MyXGBoostClassifier( data_collect, boosting_params[args.model], preprocessing, FEATS)
+        cur_model = MyXGBoostClassifier( data_collect, boosting_params[args.model], preprocessing_ft, FEATS, dataset_cache_dir=args.dataset_cache_dir, encoder=encoder)
     
     elif "LGBM" == args.model : 
         
-        cur_model = MyLGBM( data_collect, boosting_params[args.model], preprocessing_hyunho, FEATS)
+        cur_model = MyLGBM( data_collect, boosting_params[args.model], preprocessing_ft, FEATS, dataset_cache_dir=args.dataset_cache_dir, encoder=encoder)
     
     elif "LGBMClassifier" == args.model : 
         
-        cur_model = MyLGBMClassifier( data_collect, boosting_params[args.model], preprocessing, FEATS)
+        cur_model = MyLGBMClassifier( data_collect, boosting_params[args.model], preprocessing_ft, FEATS, encoder=encoder)
     
     elif "CatBoostClassifier" == args.model :
-        cur_model = MyCatClassifier( data_collect, boosting_params[args.model], preprocessing_hyunho, FEATS,False)
+        cur_model = MyCatClassifier( data_collect, boosting_params[args.model], preprocessing_ft, FEATS,False,
+                                     n_trials=args.n_trials, n_jobs=args.n_jobs, study_dir=args.study_dir)
         
 
     best_auc = cur_model.train()
+    cur_model.save_encoder(encoder_file(args))
     preds    = cur_model.inference()
     save(args,preds,best_auc)
 
+def encoder_file(args):
+    return os.path.join(args.model_dir, f"{args.model}_category_encoder.json")
+
+def main_kfold(args, data_collect, preprocessing_ft, FEATS, encoder=None):
+
+    # user 단위 K-fold : fold 별 모델의 out-of-fold 예측과 test 예측 평균
+    do_transform_label = args.model != "CatBoostClassifier"
+    kfold_data = build_kfold_data(data_collect, preprocessing_ft, FEATS, do_transform_label, encoder)
+
+    if do_transform_label:
+        # LightGBM 은 encoding 된 category 를 native categorical 로 사용
+        encoder = kfold_data["encoder"]
+        encoder.save(encoder_file(args))
+        cat_features = [f for f in FEATS if f in encoder.categories] if "LGBM" in args.model else []
+    else:
+        X = kfold_data["X"]
+        cat_features = [f for f in FEATS if X[f].dtype == 'object' or X[f].dtype == 'category']
+
+    wandb.init(project=f"{args.model}_kfold", config=boosting_params[args.model])
+    oof, preds, fold_aucs = train_kfold(args.model, boosting_params[args.model], kfold_data, FEATS,
+                                        args.n_folds, args.n_jobs, args.seed, cat_features)
+
+    # fold 별 valid 는 유저의 전체 interaction, 대회 평가와 같은 마지막 interaction AUC 도 같이 기록
+    user_ids = kfold_data["user_ids"]
+    is_last = np.append(user_ids[1:] != user_ids[:-1], True)
+    auc = roc_auc_score(kfold_data["y"], oof)
+    last_auc = roc_auc_score(kfold_data["y"][is_last], oof[is_last])
+    print(f"fold AUC : {np.round(fold_aucs, 4)}, OOF AUC : {auc:.4f}, OOF last interaction AUC : {last_auc:.4f}")
+    wandb.log({"oof_roc_auc": auc, "oof_last_roc_auc": last_auc})
+
+    save_oof(args, kfold_data["total"], oof, last_auc)
+    save(args, preds, last_auc)
+
+
 if __name__ == "__main__":
     args = parse_args()
     main(args)
@@ -0,0 +1,236 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+
+def _estimate_parameters(student_idx, item_idx, answers, left_asymptote,
+                         theta, beta, student_cnt, item_cnt):
+    """ interaction 순서대로 theta(학생 실력) / beta(문항 난이도) 를 갱신한다.
+
+    기존 dict 기반 elo() 와 동일한 수식 / 갱신 순서를 그대로 따른다.
+        - beta 는 갱신 전 theta 로, theta 는 갱신 전 beta 로 계산
+        - learning rate 는 각 student / item 의 이전 풀이 수로 결정
+    """
+    for i in range(len(student_idx)):
+        s = student_idx[i]
+        it = item_idx[i]
+        theta_ = theta[s]
+        beta_ = beta[it]
+
+        prob = left_asymptote + (1 - left_asymptote) * (1 / (1 + np.exp(-(theta_ - beta_))))
+        error = answers[i] - prob
+
+        lr_theta = 0.3 / (1 + 0.01 * student_cnt[s])
+        if lr_theta < 0.04:
+            lr_theta = 0.04
+        lr_beta = 1 / (1 + 0.05 * item_cnt[it])
+
+        beta[it] = beta_ - lr_beta * error
+        theta[s] = theta_ + lr_theta * error
+
+        item_cnt[it] += 1
+        student_cnt[s] += 1
+
+
+if njit is not None:
+    _estimate_parameters = njit(cache=True, nogil=True)(_estimate_parameters)
+
+
+class EloEstimator:
+    """ Elo rating 기반 student / item parameter 추정기
+
+    theta / beta / 풀이 수를 encoding 된 id 로 indexing 되는 numpy array 로 저장한다.
+    numba 가 설치되어 있으면 갱신 loop 를 compile 해서 사용하고,
+    없으면 같은 loop 를 python list 위에서 실행한다.
+
+    save / load 로 상태를 저장해 두면 update 로 새 interaction 만 이어서 반영할 수 있다.
+    applied 에는 반영한 interaction (userID, key, Timestamp) 의 hash 를 정렬해서 기록하고,
+    key 에는 item 으로 사용한 column 이름을 기록한다.
+
+    Args:
+        left_asymptote (float): 찍어서 맞출 확률 (default: 0)
+    """
+
+    def __init__(self, left_asymptote: float = 0.0):
+        self.left_asymptote = float(left_asymptote)
+        self.student_ids = pd.Index([])
+        self.item_ids = pd.Index([])
+        self.theta = np.zeros(0, dtype=np.float64)
+        self.beta = np.zeros(0, dtype=np.float64)
+        self.student_cnt = np.zeros(0, dtype=np.int64)
+        self.item_cnt = np.zeros(0, dtype=np.int64)
+        self.key = None
+        self.applied = np.zeros(0, dtype=np.uint64)
+
+    def fit(self, students, items, answers):
+        """ 전달된 interaction 전체로 parameter 를 처음부터 추정한다. """
+        student_idx, student_ids = pd.factorize(np.asarray(students))
+        item_idx, item_ids = pd.factorize(np.asarray(items))
+        self.student_ids, self.item_ids = pd.Index(student_ids), pd.Index(item_ids)
+
+        self.theta = np.zeros(len(self.student_ids), dtype=np.float64)
+        self.beta = np.zeros(len(self.item_ids), dtype=np.float64)
+        self.student_cnt = np.zeros(len(self.student_ids), dtype=np.int64)
+        self.item_cnt = np.zeros(len(self.item_ids), dtype=np.int64)
+
+        self._run(student_idx, item_idx, answers)
+        self._fit_idx = (student_idx, item_idx)
+        return self
+
+    def update(self, students, items, answers):
+        """ 현재 parameter 에 이어서 새 interaction 만 반영한다.
+
+        처음 보는 student / item 은 vocabulary 와 parameter array 끝에 추가한다.
+        """
+        student_idx, self.student_ids = self._extend(self.student_ids, students)
+        item_idx, self.item_ids = self._extend(self.item_ids, items)
+
+        n_new_student = len(self.student_ids) - len(self.theta)
+        n_new_item = len(self.item_ids) - len(self.beta)
+        self.theta = np.concatenate([self.theta, np.zeros(n_new_student)])
+        self.student_cnt = np.concatenate([self.student_cnt, np.zeros(n_new_student, dtype=np.int64)])
+        self.beta = np.concatenate([self.beta, np.zeros(n_new_item)])
+        self.item_cnt = np.concatenate([self.item_cnt, np.zeros(n_new_item, dtype=np.int64)])
+
+        self._run(student_idx, item_idx, answers)
+        return self
+
+    def save(self, path):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        np.savez(
+            path,
+            left_asymptote=self.left_asymptote,
+            student_ids=self._to_savable(self.student_ids),
+            item_ids=self._to_savable(self.item_ids),
+            theta=self.theta,
+            beta=self.beta,
+            student_cnt=self.student_cnt,
+            item_cnt=self.item_cnt,
+            key="" if self.key is None else self.key,
+            applied=self.applied,
+        )
+
+    @classmethod
+    def load(cls, path):
+        state = np.load(path)
+        if "applied" not in state:
+            raise ValueError(f"반영한 interaction 기록이 없는 이전 형식의 Elo snapshot 입니다. 지우고 다시 만들어 주세요 : {path}")
+        estimator = cls(float(state["left_asymptote"]))
+        estimator.student_ids = pd.Index(state["student_ids"])
+        estimator.item_ids = pd.Index(state["item_ids"])
+        estimator.theta = state["theta"]
+        estimator.beta = state["beta"]
+        estimator.student_cnt = state["student_cnt"]
+        estimator.item_cnt = state["item_cnt"]
+        estimator.key = str(state["key"]) or None
+        estimator.applied = state["applied"]
+        return estimator
+
+    def predict(self, students, items):
+        """ 각 (student, item) 쌍의 정답 확률 sigmoid(theta - beta) 를 반환한다.
+
+        처음 보는 student / item 은 parameter 0 으로 계산한다.
+        """
+        student_idx = self.student_ids.get_indexer(np.asarray(students))
+        item_idx = self.item_ids.get_indexer(np.asarray(items))
+        return self._predict_idx(student_idx, item_idx)
+
+    def fit_predict(self, students, items, answers):
+        # fit 에서 만든 encoding 을 그대로 사용해 id 조회를 한번 더 하지 않는다
+        self.fit(students, items, answers)
+        return self._predict_idx(*self._fit_idx)
+
+    def _predict_idx(self, student_idx, item_idx):
+        # 끝에 0 을 붙여서 get_indexer 의 -1 (처음 보는 id) 이 parameter 0 을 가리키게 한다
+        theta = np.append(self.theta, 0.0)[student_idx]
+        beta = np.append(self.beta, 0.0)[item_idx]
+        return 1 / (1 + np.exp(-(theta - beta)))
+
+    @staticmethod
+    def _extend(vocab, values):
+        values = np.asarray(values)
+        idx = vocab.get_indexer(values)
+        unseen = idx < 0
+        if unseen.any():
+            new_ids = pd.unique(values[unseen])
+            vocab = vocab.append(pd.Index(new_ids))
+            idx[unseen] = vocab.get_indexer(values[unseen])
+        return idx, vocab
+
+    @staticmethod
+    def _to_savable(vocab):
+        # object(str) array 는 allow_pickle 없이 저장되도록 unicode array 로 변환
+        values = vocab.to_numpy()
+        return values.astype(str) if values.dtype == object else values
+
+    def _run(self, student_idx, item_idx, answers):
+        student_idx = np.ascontiguousarray(student_idx, dtype=np.int64)
+        item_idx = np.ascontiguousarray(item_idx, dtype=np.int64)
+        answers = np.ascontiguousarray(answers, dtype=np.float64)
+
+        if njit is not None:
+            _estimate_parameters(student_idx, item_idx, answers, self.left_asymptote,
+                                 self.theta, self.beta, self.student_cnt, self.item_cnt)
+            return
+
+        # numba 가 없으면 numpy scalar indexing 비용을 피하기 위해 list 로 변환해서 실행
+        theta, beta = self.theta.tolist(), self.beta.tolist()
+        student_cnt, item_cnt = self.student_cnt.tolist(), self.item_cnt.tolist()
+        _estimate_parameters(student_idx.tolist(), item_idx.tolist(), answers.tolist(),
+                             self.left_asymptote, theta, beta, student_cnt, item_cnt)
+        self.theta = np.asarray(theta, dtype=np.float64)
+        self.beta = np.asarray(beta, dtype=np.float64)
+        self.student_cnt = np.asarray(student_cnt, dtype=np.int64)
+        self.item_cnt = np.asarray(item_cnt, dtype=np.int64)
+
+
+def estimate_elo(df, key="assessmentItemID", state_path=None, time_col="Timestamp", save=True, save_path=None):
+    """ userID 와 key 기준 Elo 정답 확률을 df 의 각 row 에 대해 계산한다.
+
+    state_path 가 없거나 파일이 없으면 df 전체로 추정하고,
+    snapshot 이 있으면 아직 반영하지 않은 interaction 만 (df 순서대로) update 로 반영한다.
+    snapshot 을 쓸 때 answerCode < 0 인 row 는 parameter 에 반영하지 않고 예측만 한다.
+    반영 여부는 (userID, key, Timestamp) 로 row 마다 확인하므로 user 마다 시간 범위가 겹쳐도 빠지는 row 가 없고,
+    같은 row 를 다시 넘겨도 두번 반영하지 않는다. state_path 가 주어지면 계산 후 상태를 save_path (기본 : state_path) 에 저장한다.
+    추론처럼 snapshot 을 바꾸면 안 되는 경우에는 save=False 로 계산만 한다.
+    """
+    students, items, answers = df["userID"].values, df[key].values, df["answerCode"].values
+
+    if state_path is None:
+        return EloEstimator().fit_predict(students, items, answers)
+
+    row_hash = _interaction_hash(df, key, time_col)
+    # 정답을 모르는 row (test 의 answerCode == -1) 는 반영하지 않고, 정답이 들어왔을 때 반영되도록 applied 에도 넣지 않는다
+    known = answers >= 0
+    if not os.path.exists(state_path):
+        estimator = EloEstimator().fit(students[known], items[known], answers[known])
+        new = known
+    else:
+        estimator = EloEstimator.load(state_path)
+        if estimator.key is not None and estimator.key != key:
+            raise ValueError(f"Elo snapshot 은 {estimator.key} 기준인데 {key} 로 사용했습니다 : {state_path}")
+        new = known & ~np.isin(row_hash, estimator.applied)
+        print(f"Elo snapshot loaded : {state_path}, new interactions : {new.sum()}")
+        estimator.update(students[new], items[new], answers[new])
+    prob = estimator.predict(students, items)
+
+    if save:
+        estimator.key = key
+        estimator.applied = np.union1d(estimator.applied, row_hash[new])
+        estimator.save(save_path or state_path)
+
+    return prob
+
+
+def _interaction_hash(df, key, time_col):
+    """ interaction 마다 (userID, key, Timestamp) 의 uint64 hash """
+    rows = pd.DataFrame({"userID": df["userID"].values, key: df[key].values,
+                         time_col: pd.to_datetime(df[time_col]).values})
+    return pd.util.hash_pandas_object(rows, index=False).to_numpy()
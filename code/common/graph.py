@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+
+
+class NodeIndex:
+    """ userID / assessmentItemID 를 graph node 번호로 바꾸는 index
+
+    기존 id_2_index dict 와 같은 번호를 쓴다 : user 는 정렬 순서로 0 ~ n_user-1,
+    item 은 정렬 순서로 n_user 부터. row 마다 dict 를 찾는 대신 get_indexer 로 한번에 바꾼다.
+    """
+
+    def __init__(self, user_ids, item_ids):
+        self.users = pd.Index(sorted(set(user_ids)))
+        self.items = pd.Index(sorted(set(item_ids)))
+
+    @classmethod
+    def from_ordered(cls, users, items):
+        """ 정렬하지 않고 주어진 순서를 그대로 node 번호로 쓰는 index (저장해 둔 index 를 다시 만들 때) """
+        node_index = cls.__new__(cls)
+        node_index.users = pd.Index(users)
+        node_index.items = pd.Index(items)
+        return node_index
+
+    def extend(self, user_ids, item_ids):
+        """ 처음 보는 user / item 을 (정렬해서) 기존 순서 뒤에 붙인 NodeIndex
+
+        기존 user / item 의 위치는 그대로라서 embedding table 은 뒤에 행만 추가하면 된다.
+        item 의 node 번호는 새 user 수만큼 뒤로 밀린다.
+        """
+        users = self.users.append(pd.Index(sorted(set(user_ids))).difference(self.users, sort=False))
+        items = self.items.append(pd.Index(sorted(set(item_ids))).difference(self.items, sort=False))
+        return NodeIndex.from_ordered(users, items)
+
+    @property
+    def n_user(self):
+        return len(self.users)
+
+    @property
+    def n_item(self):
+        return len(self.items)
+
+    def __len__(self):
+        return self.n_user + self.n_item
+
+    def __getitem__(self, key):
+        """ 기존 dict 처럼 id 하나의 node 번호 """
+        if key in self.users:
+            return self.users.get_loc(key)
+        return self.n_user + self.items.get_loc(key)
+
+    def user_index(self, user_ids):
+        return _lookup(self.users, user_ids, "userID")
+
+    def item_index(self, item_ids):
+        return self.n_user + _lookup(self.items, item_ids, "assessmentItemID")
+
+
+def _lookup(index, values, name):
+    codes = index.get_indexer(values)
+    if (codes < 0).any():
+        unknown = pd.unique(np.asarray(values)[codes < 0])[:5]
+        raise KeyError(f"index 에 없는 {name} : {list(unknown)}")
+    return codes.astype(np.int64)
+
+
+def edge_index(data, node_index):
+    """ interaction 의 (user node, item node) 를 [2, n_edge] int64 array 로 만든다. """
+    edge = np.empty((2, len(data)), dtype=np.int64)
+    edge[0] = node_index.user_index(data["userID"])
+    edge[1] = node_index.item_index(data["assessmentItemID"])
+    return edge
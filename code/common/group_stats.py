@@ -0,0 +1,199 @@
+import numpy as np
+import pandas as pd
+
+# 복합 key 의 code 조합 수가 이 값 이하이면 hash 대신 bincount 로 group code 를 압축한다
+DENSE_KEY_LIMIT = 1 << 26
+
+# preprocessing_hyunho / feature registry / lgbm 이 함께 쓰는 group 통계 feature
+# (column, group key, 값 column, 통계량). correct_solved_time 은 맞은 row 의 solved_time_shift (틀린 row 는 NaN)
+HYUNHO_GROUP_FEATS = [
+    ## 1-1. 유저/문제/시험지/태그별 평균 정답률
+    ('user_avg', 'userID', 'answerCode', 'mean'),
+    ('item_avg', 'assessmentItemID', 'answerCode', 'mean'),
+    ('test_avg', 'testId', 'answerCode', 'mean'),
+    ('tag_avg', 'KnowledgeTag', 'answerCode', 'mean'),
+    ## 1-2. 유저/문제/시험지별 평균 풀이시간
+    ('user_time_avg', 'userID', 'solved_time_shift', 'mean'),
+    ('item_time_avg', 'assessmentItemID', 'solved_time_shift', 'mean'),
+    ('test_time_avg', 'testId', 'solved_time_shift', 'mean'),
+    ('tag_time_avg', 'KnowledgeTag', 'solved_time_shift', 'mean'),
+    # 맞은 사람의 문제별 평균 풀이시간 (틀린 row 는 NaN 으로 두고 평균에서 제외)
+    ('Item_mean_solved_time', 'assessmentItemID', 'correct_solved_time', 'mean'),
+    # 유저/문제/시험지/태그별 표준편차
+    ('user_std', 'userID', 'answerCode', 'std'),
+    ('item_std', 'assessmentItemID', 'answerCode', 'std'),
+    ('test_std', 'testId', 'answerCode', 'std'),
+    ('tag_std', 'KnowledgeTag', 'answerCode', 'std'),
+    ## 1-3. 현재 유저의 해당 문제지 평균 정답률/풀이시간
+    ('user_current_avg', ['userID', 'testId', 'same_item_cnt'], 'answerCode', 'mean'),
+    ('user_current_time_avg', ['userID', 'testId', 'same_item_cnt'], 'solved_time_shift', 'mean'),
+]
+
+
+def factorize_keys(df, key, cache=None):
+    """ 단일 / 복합 key 를 0 ~ n_group-1 의 group code 로 encoding 한다.
+
+    복합 key 는 column 별 code 를 mixed radix 로 합쳐서 string tuple 을 hashing 하지 않는다.
+    cache(dict) 를 넘기면 column 별 / 복합 key 별 factorize 결과를 재사용한다.
+    key 값에 NaN 이 있는 row 는 pandas groupby (dropna=True) 와 같이 어느 group 에도 속하지 않고 code 가 -1 이다.
+    """
+    keys = [key] if isinstance(key, str) else list(key)
+    cache = {} if cache is None else cache
+    if len(keys) > 1 and tuple(keys) in cache:
+        return cache[tuple(keys)]
+
+    for col in keys:
+        if col not in cache:
+            cache[col] = _factorize_column(df[col])
+
+    codes, n_group = cache[keys[0]]
+    if len(keys) == 1:
+        return codes, n_group
+
+    missing = codes < 0
+    codes = np.where(missing, 0, codes) if missing.any() else codes
+    for col in keys[1:]:
+        col_codes, col_n = cache[col]
+        col_missing = col_codes < 0
+        if col_missing.any():
+            missing |= col_missing
+            col_codes = np.where(col_missing, 0, col_codes)
+        if n_group * col_n > DENSE_KEY_LIMIT:
+            # 조합 수가 크면 중간에 실제 존재하는 조합만 남기도록 다시 번호를 매긴다
+            codes, n_group = _compact(codes, n_group)
+        codes = codes.astype(np.int64) * col_n + col_codes
+        n_group *= col_n
+
+    codes, n_group = _compact(codes, n_group)
+    if missing.any():
+        codes[missing] = -1
+    cache[tuple(keys)] = codes, n_group
+    return codes, n_group
+
+
+def _factorize_column(series):
+    """ column 하나를 (code, group 수) 로 바꾼다.
+
+    범위가 좁은 정수 column (userID, KnowledgeTag 등) 은 hashing 없이 값 자체를 code 로 쓴다.
+    """
+    values = series.to_numpy() if isinstance(series, pd.Series) else np.asarray(series)
+    if values.dtype.kind in "iu" and len(values):
+        low, high = int(values.min()), int(values.max())
+        if high - low < min(DENSE_KEY_LIMIT, 32 * len(values)):
+            return _compact(values.astype(np.int64) - low, high - low + 1)
+    codes, uniques = pd.factorize(series, sort=False)
+    return codes, len(uniques)
+
+
+def _compact(codes, n_group):
+    """ 0 ~ n_group-1 의 code 중 실제로 존재하는 값만 0 ~ n-1 로 다시 번호를 매긴다. """
+    if n_group > DENSE_KEY_LIMIT or n_group > 32 * len(codes):
+        # 조합 수에 비해 row 가 적으면 n_group 크기의 배열을 만들지 않는다
+        uniques, codes = np.unique(codes, return_inverse=True)
+        return codes.astype(np.intp, copy=False), len(uniques)
+    present = np.zeros(n_group, dtype=bool)
+    present[codes] = True
+    present = np.flatnonzero(present)
+    # n_group 크기의 remap 배열은 int32 로 만들어서 메모리 쓰기를 줄이고, bincount 용 code 만 intp 로 바꾼다
+    remap = np.empty(n_group, dtype=np.int32 if n_group < 2**31 else np.intp)
+    remap[present] = np.arange(len(present), dtype=remap.dtype)
+    return remap[codes].astype(np.intp), len(present)
+
+
+class GroupStats:
+    """ 하나의 key / 값 column 에 대한 group 별 size / count / sum / mean / std
+
+    bincount 로 계산하고, 같은 값으로 여러 통계량을 구할 때 중간 결과를 재사용한다.
+    pandas transform 과 같이 NaN 은 제외하고 (size 는 NaN 포함 row 수), std 는 ddof=1 로 계산한다.
+    std 는 group 평균을 뺀 제곱합(two-pass)으로 구해서 큰 값에서도 오차가 작다.
+    key 가 NaN 인 row (code -1) 는 마지막 group 으로 모아서 계산하고 통계량은 NaN 으로 돌려준다.
+    """
+
+    def __init__(self, codes, n_group, values, size=None):
+        self.missing_key = bool((codes < 0).any())
+        if self.missing_key:
+            codes = np.where(codes < 0, n_group, codes)
+            n_group += 1
+        self.codes = codes
+        self.n_group = n_group
+        # values : (값, NaN 을 0 으로 채운 값, NaN 이 아닌 row mask 또는 None)
+        self.values, filled, valid = values
+
+        # size 는 값 column 과 상관없어서 같은 key 의 다른 GroupStats 에서 받아서 쓸 수 있다
+        self.size = np.bincount(codes, minlength=n_group).astype(np.float64) if size is None else size
+        if valid is None:
+            self.count = self.size
+        else:
+            self.count = np.bincount(codes, weights=valid, minlength=n_group)
+        self.sum = np.bincount(codes, weights=filled, minlength=n_group)
+        self.has_nan = valid is not None
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            self.mean = self.sum / self.count
+
+    def std(self):
+        sq = (self.values - self.mean[self.codes]) ** 2
+        if self.has_nan:
+            sq = np.where(np.isnan(sq), 0.0, sq)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            var = np.bincount(self.codes, weights=sq, minlength=self.n_group) / (self.count - 1)
+        var[self.count < 2] = np.nan
+        return np.sqrt(var)
+
+    def transform(self, stat):
+        """ group 통계량을 row 단위로 펼쳐서 반환한다. """
+        if stat == "size":
+            group_value = self.size
+        elif stat == "count":
+            group_value = self.count
+        elif stat == "sum":
+            group_value = self.sum
+        elif stat == "mean":
+            group_value = self.mean
+        elif stat == "std":
+            group_value = self.std()
+        else:
+            raise ValueError(f"unknown stat : {stat}")
+        if self.missing_key:
+            group_value = group_value.copy()
+            group_value[-1] = np.nan
+        return group_value[self.codes]
+
+
+def _prepare_values(series):
+    values = np.asarray(series, dtype=np.float64)
+    nan = np.isnan(values)
+    if not nan.any():
+        return values, values, None
+    return values, np.where(nan, 0.0, values), (~nan).astype(np.float64)
+
+
+def group_features(df, specs, key_cache=None):
+    """ (out_col, key, value_col, stat) spec 목록을 key 별로 묶어서 계산한다.
+
+    key column 은 한번만 factorize 하고 (복합 key 도 column code 를 재사용),
+    같은 key / 값 column 의 통계량은 GroupStats 하나에서 같이 계산한다.
+    df 는 column 이름으로 Series 를 꺼낼 수 있으면 DataFrame 이 아니어도 된다.
+
+    Args:
+        key_cache (dict): factorize_keys 의 cache. 같은 row 순서의 data 로 여러번 호출할 때 넘기면
+            string key column 을 호출마다 다시 factorize 하지 않는다. (row 를 정렬 / 필터하면 새로 만들어야 한다)
+
+    Returns:
+        dict : spec 순서대로 {out_col: np.ndarray}
+    """
+    key_cache = {} if key_cache is None else key_cache
+    codes_cache, values_cache, stats_cache, size_cache = {}, {}, {}, {}
+    result = {}
+    for out_col, key, value, stat in specs:
+        key = key if isinstance(key, str) else tuple(key)
+        if key not in codes_cache:
+            codes_cache[key] = factorize_keys(df, key, key_cache)
+        if value not in values_cache:
+            values_cache[value] = _prepare_values(df[value])
+        if (key, value) not in stats_cache:
+            stats = GroupStats(*codes_cache[key], values_cache[value], size=size_cache.get(key))
+            stats_cache[(key, value)] = stats
+            size_cache[key] = stats.size
+        result[out_col] = stats_cache[(key, value)].transform(stat)
+    return result
@@ -0,0 +1,75 @@
+import os
+
+import pandas as pd
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:
+    pq = None
+
+# 대회 interaction csv 의 column 별 dtype
+DTYPES = {
+    "userID": "int32",
+    "assessmentItemID": "category",
+    "testId": "category",
+    "answerCode": "int8",
+    "KnowledgeTag": "int32",
+}
+TIME_COLUMN = "Timestamp"
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def cache_path(csv_path):
+    """ csv 와 같은 위치에 저장되는 parquet 파일 경로 """
+    return os.path.splitext(csv_path)[0] + ".parquet"
+
+
+def read_csv_typed(csv_path, columns=None):
+    """ 알려진 column 은 명시한 dtype 으로, Timestamp 는 datetime 으로 읽는다.
+
+    그 외 column (dkt 의 train 등) 은 pandas 가 추론한 dtype 을 그대로 사용한다.
+    """
+    df = pd.read_csv(csv_path, usecols=columns, dtype=DTYPES)
+    if TIME_COLUMN in df.columns:
+        df[TIME_COLUMN] = pd.to_datetime(df[TIME_COLUMN], format=TIME_FORMAT)
+    return df
+
+
+def convert_to_parquet(csv_path):
+    """ csv 전체를 한번 읽어서 parquet 로 저장한다. 저장 위치에 쓸 수 없으면 None """
+    df = read_csv_typed(csv_path)
+    path = cache_path(csv_path)
+    try:
+        df.to_parquet(path, index=False)
+    except OSError as e:
+        print(f"parquet 저장 실패, csv 를 직접 읽습니다 : {e}")
+        return None
+    return path
+
+
+def read_interactions(csv_path, columns=None, use_arrow=False):
+    """ interaction csv 를 읽는 공용 함수
+
+    pyarrow 가 있으면 처음 한번 csv 를 dtype 을 지정한 parquet 로 변환해 두고,
+    이후에는 parquet 에서 필요한 column 만 (column projection) 읽는다.
+    csv 가 parquet 보다 새로 수정되었으면 다시 변환한다.
+    pyarrow 가 없으면 매번 csv 를 같은 dtype 으로 읽는다.
+
+    Args:
+        csv_path (str): 원본 csv 경로
+        columns (list): 읽을 column. None 이면 전체
+        use_arrow (bool): True 면 pyarrow 기반 dtype (pd.ArrowDtype) 으로 반환
+    """
+    if pq is None:
+        return read_csv_typed(csv_path, columns)
+
+    path = cache_path(csv_path)
+    if not os.path.exists(path) or os.path.getmtime(path) < os.path.getmtime(csv_path):
+        path = convert_to_parquet(csv_path)
+        if path is None:
+            return read_csv_typed(csv_path, columns)
+
+    table = pq.read_table(path, columns=columns)
+    if use_arrow:
+        return table.to_pandas(types_mapper=pd.ArrowDtype)
+    return table.to_pandas()
@@ -0,0 +1,180 @@
+import numpy as np
+import torch
+from functools import partial
+
+
+class SequenceStore:
+    """ user 별 sequence 를 column 단위 연속 array 로 저장하는 store
+
+    전체 interaction 을 [n_rows, n_cols] float32 array 하나에 담고,
+    각 sample 은 (start, end) row 범위로만 표현한다.
+    indexing / slicing / window 분할은 범위 array 만 새로 만들고 값은 복사하지 않는다.
+
+    Args:
+        values (np.ndarray): [n_rows, n_cols] float32 array
+        starts (np.ndarray): 각 sample 의 시작 row
+        ends (np.ndarray): 각 sample 의 끝 row (미포함)
+        columns (list): values 의 column 이름
+    """
+
+    def __init__(self, values, starts, ends, columns):
+        self.values = values
+        self.starts = np.asarray(starts, dtype=np.int64)
+        self.ends = np.asarray(ends, dtype=np.int64)
+        self.columns = list(columns)
+
+    @classmethod
+    def from_frame(cls, df, columns, group_col="userID"):
+        """ group_col 기준으로 정렬된 df 에서 group 별 sequence store 를 만든다. """
+        values = np.empty((len(df), len(columns)), dtype=np.float32)
+        for i, col in enumerate(columns):
+            values[:, i] = df[col].to_numpy(dtype=np.float32)
+
+        keys = df[group_col].to_numpy()
+        bounds = np.flatnonzero(keys[1:] != keys[:-1]) + 1
+        starts = np.concatenate([[0], bounds])
+        ends = np.concatenate([bounds, [len(df)]])
+        return cls(values, starts, ends, columns)
+
+    @property
+    def shape(self):
+        return (len(self),)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __getitem__(self, index):
+        if isinstance(index, (int, np.integer)):
+            return self.values[self.starts[index]:self.ends[index]]
+        # slice / index array 는 같은 values 를 공유하는 store 로 반환
+        return SequenceStore(self.values, self.starts[index], self.ends[index], self.columns)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
+def as_store(data):
+    """ Subset(store) 은 index 만 골라 store 로 변환한다. """
+    if isinstance(data, torch.utils.data.Subset) and isinstance(data.dataset, SequenceStore):
+        return data.dataset[np.asarray(data.indices)]
+    return data
+
+
+class DKTDataset(torch.utils.data.Dataset):
+    def __init__(self, data, args):
+        self.data = as_store(data)
+        self.args = args
+
+    def __getitem__(self, index):
+        # [seq_len, n_cols] : max seq len 보다 길면 뒤에서부터 자른다
+        seq = self.data[index][-self.args.max_seq_len:]
+        return torch.from_numpy(np.ascontiguousarray(seq))
+
+    def __len__(self):
+        return len(self.data)
+
+
+def collate(batch, max_seq_len):
+    """ sample 을 앞쪽 padding 해서 column 별 tensor 와 mask 로 묶는다.
+
+    column 수와 관계없이 sample 당 복사는 한번만 일어난다.
+    """
+    n_cols = batch[0].size(1)
+    padded = torch.zeros(len(batch), max_seq_len, n_cols)
+    mask = torch.zeros(len(batch), max_seq_len)
+
+    for i, seq in enumerate(batch):
+        padded[i, -len(seq):] = seq
+        mask[i, -len(seq):] = 1
+
+    return tuple(padded.unbind(2)) + (mask,)
+
+
+def get_loaders(args, train, valid):
+
+    pin_memory = False
+    train_loader, valid_loader = None, None
+
+    if train is not None:
+        trainset = DKTDataset(train, args)
+        train_loader = torch.utils.data.DataLoader(
+            trainset,
+            num_workers=args.num_workers,
+            shuffle=True,
+            batch_size=args.batch_size,
+            pin_memory=pin_memory,
+            collate_fn=partial(collate, max_seq_len=args.max_seq_len),
+        )
+    if valid is not None:
+        valset = DKTDataset(valid, args)
+        valid_loader = torch.utils.data.DataLoader(
+            valset,
+            num_workers=args.num_workers,
+            shuffle=False,
+            batch_size=args.batch_size,
+            pin_memory=pin_memory,
+            collate_fn=partial(collate, max_seq_len=args.max_seq_len),
+        )
+
+    return train_loader, valid_loader
+
+
+# data augumentation
+
+def slidding_window(data, args):
+    """ window_size(max_seq_len) / stride 로 sequence 를 잘라 sample 을 늘린다.
+
+    - window 크기 이하의 sequence 는 그대로 사용
+    - 앞에서부터 stride 간격으로 window 를 만들고, 뒷부분이 누락되면 마지막 window 를 추가
+    shuffle 을 쓰지 않으면 (start, end) 범위만 계산해서 store 로 반환한다.
+    """
+    data = as_store(data)
+    window_size = args.max_seq_len
+    stride = args.stride
+
+    lengths = data.ends - data.starts
+    is_long = lengths > window_size
+    n_window = np.where(is_long, (lengths - window_size) // stride + 1, 1)
+    has_tail = is_long & ((lengths - window_size) % stride != 0)
+    n_sample = n_window + has_tail
+
+    seq_id = np.repeat(np.arange(len(data)), n_sample)
+    window_i = np.arange(n_sample.sum()) - np.repeat(np.cumsum(n_sample) - n_sample, n_sample)
+    seq_end = data.ends[seq_id]
+
+    starts = data.starts[seq_id] + window_i * stride
+    ends = np.minimum(starts + window_size, seq_end)
+    is_tail = window_i == n_window[seq_id]
+    starts[is_tail] = seq_end[is_tail] - window_size
+    ends[is_tail] = seq_end[is_tail]
+
+    windows = SequenceStore(data.values, starts, ends, data.columns)
+    if not args.shuffle:
+        return windows
+
+    # Shuffle : 마지막 window 가 아닌 window 는 shuffle_n 개의 섞인 window 로 대체
+    do_shuffle = is_long[seq_id] & (window_i < n_window[seq_id] - 1)
+    augmented_datas = []
+    for i in range(len(windows)):
+        if do_shuffle[i]:
+            augmented_datas += shuffle(windows[i], window_size, args)
+        else:
+            augmented_datas.append(windows[i])
+    return augmented_datas
+
+
+def shuffle(data, data_size, args):
+    shuffle_datas = []
+    for i in range(args.shuffle_n):
+        # shuffle 횟수만큼 window를 랜덤하게 계속 섞어서 데이터로 추가
+        random_index = np.random.permutation(data_size)
+        shuffle_datas.append(data[random_index])
+    return shuffle_datas
+
+
+def data_augmentation(data, args):
+    if args.window == True:
+        data = slidding_window(data, args)
+
+    return data
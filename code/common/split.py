@@ -0,0 +1,66 @@
+import numpy as np
+
+
+def _rng(seed):
+    """ seed 가 없으면 np.random 전역 상태 (setSeeds / np.random.seed 로 고정) 를 사용 """
+    return np.random if seed is None else np.random.default_rng(seed)
+
+
+def last_interaction_mask(user_ids):
+    """ 유저별로 정렬된 row 에서 각 유저의 마지막 interaction 위치 """
+    user_ids = np.asarray(user_ids)
+    return np.append(user_ids[1:] != user_ids[:-1], True)
+
+
+def user_permutation(user_ids, seed=None):
+    """ 유저를 섞은 순서와, 그 순서의 유저별 interaction 수 누적합
+
+    Returns:
+        inverse : row 별 유저 번호 (np.unique 기준)
+        order : 섞인 유저 번호
+        cum_count : order 순서의 interaction 수 누적합
+    """
+    _, inverse, counts = np.unique(np.asarray(user_ids), return_inverse=True, return_counts=True)
+    order = _rng(seed).permutation(len(counts))
+    return inverse, order, np.cumsum(counts[order])
+
+
+def user_split_index(user_ids, ratio=0.7, seed=None, last_only=True):
+    """ user 단위로 train / valid row 위치(index array) 를 나눈다.
+
+    유저를 섞은 뒤 interaction 수 누적합이 ratio * 전체 row 수 를 넘지 않는 유저까지 train 으로 사용한다.
+    last_only 이면 valid 는 각 유저의 마지막 interaction 만 사용한다 (user_ids 는 유저별로 정렬된 순서).
+    """
+    inverse, order, cum_count = user_permutation(user_ids, seed)
+    n_train_user = np.searchsorted(cum_count, ratio * len(inverse), side="right")
+
+    is_train_user = np.zeros(len(order), dtype=bool)
+    is_train_user[order[:n_train_user]] = True
+    is_train = is_train_user[inverse]
+
+    is_valid = ~is_train
+    if last_only:
+        is_valid &= last_interaction_mask(user_ids)
+    return np.flatnonzero(is_train), np.flatnonzero(is_valid)
+
+
+def user_kfold_index(user_ids, n_splits=5, seed=None, last_only=False):
+    """ user 단위 k-fold. 섞인 유저를 interaction 수 누적합 기준으로 비슷한 크기의 n_splits 묶음으로 나눈다.
+
+    Yields:
+        (train_idx, valid_idx) : fold 별 row 위치 array
+    """
+    inverse, order, cum_count = user_permutation(user_ids, seed)
+    # 누적합에서 자기 이전까지의 비율로 fold 를 정하므로 fold 가 섞인 순서에서 연속된 유저 묶음이 된다
+    start = np.append(0, cum_count[:-1])
+    user_fold = np.empty(len(order), dtype=np.int64)
+    user_fold[order] = start * n_splits // cum_count[-1]
+    row_fold = user_fold[inverse]
+
+    is_last = last_interaction_mask(user_ids) if last_only else None
+    for fold in range(n_splits):
+        is_valid = row_fold == fold
+        train_idx = np.flatnonzero(~is_valid)
+        if is_last is not None:
+            is_valid &= is_last
+        yield train_idx, np.flatnonzero(is_valid)
@@ -0,0 +1,15 @@
+import numpy as np
+
+
+def write_submission(write_path, predictions):
+    """ id,prediction 제출 파일을 한번에 쓴다.
+
+    row 마다 format / write 하지 않고 id 와 prediction 을 str 로 한번에 바꿔 이어 붙인 뒤 write 한번으로 쓴다.
+    (DataFrame.to_csv / np.savetxt 보다 빠름)
+    """
+    predictions = np.asarray(predictions, dtype=np.float64).ravel().tolist()
+    lines = map(",".join, zip(map(str, range(len(predictions))), map(repr, predictions)))
+    with open(write_path, "w", encoding="utf8") as w:
+        w.write("id,prediction\n")
+        w.write("\n".join(lines))
+        w.write("\n")
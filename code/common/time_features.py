@@ -0,0 +1,108 @@
+import numpy as np
+import pandas as pd
+
+from .group_stats import factorize_keys
+
+SECONDS_PER_DAY = 86400
+
+
+def to_epoch_seconds(timestamp):
+    """ Timestamp column(str / datetime) 을 int64 epoch seconds array 로 한번만 변환한다. """
+    return pd.to_datetime(timestamp).to_numpy().astype("datetime64[s]").astype(np.int64)
+
+
+def group_codes(df, key, cache=None):
+    """ group key 의 factorize code (cache 는 factorize_keys 의 column 별 cache) """
+    return factorize_keys(df, key, cache)[0]
+
+
+def group_diff(codes, values):
+    """ groupby(key).diff() 와 같이 같은 group 안에서 직전 row 와의 차이 (group 첫 row 는 NaN)
+
+    group 안의 순서는 row 순서를 따른다. code 가 이미 정렬되어 있으면 argsort 를 생략한다.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    diff = np.full(len(values), np.nan)
+    if len(values) < 2:
+        return diff
+
+    is_sorted = (codes[1:] >= codes[:-1]).all()
+    order = None if is_sorted else np.argsort(codes, kind="stable")
+    sorted_codes = codes if is_sorted else codes[order]
+    sorted_values = values if is_sorted else values[order]
+
+    sorted_diff = np.full(len(values), np.nan)
+    sorted_diff[1:] = sorted_values[1:] - sorted_values[:-1]
+    sorted_diff[1:][sorted_codes[1:] != sorted_codes[:-1]] = np.nan
+
+    if is_sorted:
+        return sorted_diff
+    diff[order] = sorted_diff
+    return diff
+
+
+def next_group_diff(codes, values):
+    """ 기존 groupby(key).diff().shift(-1) 과 같은 값
+
+    shift(-1) 은 group 이 아니라 전체 row 기준이므로 group 별 diff 를 한 칸 당겨서 만든다.
+    (user 별로 정렬된 data 에서는 다음 interaction 까지의 시간, group 마지막 row 는 NaN)
+    """
+    diff = group_diff(codes, values)
+    shifted = np.full(len(diff), np.nan)
+    shifted[:-1] = diff[1:]
+    return shifted
+
+
+def fill_group_median(codes, values):
+    """ NaN 을 같은 group 의 median 으로 채운다. (group 이 전부 NaN 이면 NaN 유지)
+
+    group 별 lambda 를 호출하는 대신 (code, 값) 으로 정렬해서 가운데 값을 한번에 꺼낸다.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    nan = np.isnan(values)
+    if not nan.any():
+        return values
+
+    n_group = codes.max() + 1
+    valid_codes, valid_values = codes[~nan], values[~nan]
+    order = np.lexsort((valid_values, valid_codes))
+    valid_values = valid_values[order]
+
+    count = np.bincount(valid_codes, minlength=n_group)
+    start = np.cumsum(count) - count
+    has_value = count > 0
+    lo = (start + (count - 1) // 2)[has_value]
+    hi = (start + count // 2)[has_value]
+
+    median = np.full(n_group, np.nan)
+    median[has_value] = (valid_values[lo] + valid_values[hi]) / 2
+
+    filled = values.copy()
+    filled[nan] = median[codes[nan]]
+    return filled
+
+
+def solved_time(df, key="userID", timestamp=None, clip=14400):
+    """ key 별 다음 interaction 까지 걸린 시간(초) 으로 문제 풀이 시간을 만든다.
+
+    기존 .dt.seconds 와 같이 하루 미만 부분(초)만 사용하고,
+    clip 초를 넘는 값은 이상치로 보고 key 별 median 으로 채운다.
+    """
+    codes = group_codes(df, key)
+    if timestamp is None:
+        timestamp = to_epoch_seconds(df["Timestamp"])
+
+    elapsed = next_group_diff(codes, timestamp) % SECONDS_PER_DAY
+    elapsed[elapsed > clip] = np.nan
+    return fill_group_median(codes, elapsed)
+
+
+def day_diff(df, key="userID", timestamp=None, max_day=3):
+    """ key 별 직전 interaction 과의 일 수 차이. 첫 interaction 은 0, max_day 초과는 max_day + 1 """
+    codes = group_codes(df, key)
+    if timestamp is None:
+        timestamp = to_epoch_seconds(df["Timestamp"])
+
+    days = np.nan_to_num(group_diff(codes, timestamp), nan=0.0) // SECONDS_PER_DAY
+    days = days.astype(np.int64)
+    return np.where((days >= 0) & (days <= max_day), days, max_day + 1)
@@ -14,6 +14,9 @@ class Ensemble:
             self.output_list.append(pd.read_csv(path)['prediction'].to_list())
         for filename,output in zip(filenames,self.output_list):
             self.output_df[filename] = output
+        # [n_models, n_rows] 예측 행렬. 앙상블 방법은 모두 이 행렬에서 row loop 없이 계산한다
+        # (csv 의 float64 값을 그대로 써서 기존 결과와 같게 유지)
+        self.output_matrix = np.array(self.output_list, dtype=np.float64)
 
     # Simple Weighted
     # 직접 weight를 지정하여, 앙상블합니다.
@@ -23,42 +26,35 @@ class Ensemble:
         if np.sum(weight)!=1:
             raise ValueError("weight의 합이 1이 되도록 입력해 주세요.")
 
-        pred_arr = np.append([self.output_list[0]], [self.output_list[1]], axis=0)
-        for i in range(2, len(self.output_list)):
-            pred_arr = np.append(pred_arr, [self.output_list[i]], axis=0)
-        result = np.dot(pred_arr.T, np.array(weight))
+        result = np.dot(self.output_matrix.T, np.array(weight))
         return result.tolist()
 
     # Average Weighted
     # (1/n)의 가중치로 앙상블을 진행합니다.
     def average_weighted(self):
-        weight = [1/len(self.output_list) for _ in range(len(self.output_list))]
-        pred_weight_list = [pred*np.array(w) for pred, w in zip(self.output_list,weight)]
-        result = np.sum(pred_weight_list, axis=0)
+        result = np.sum(self.output_matrix * (1/len(self.output_list)), axis=0)
         return result.tolist()
 
     # Mixed 
     # Negative case 발생 시, 다음 순서에서 예측한 rating으로 넘어가서 앙상블합니다.
     def mixed(self):
-        result = self.output_df[self.filenames[0]].copy()
-        for idx in range(len(self.filenames)-1):
-            pre_idx = self.filenames[idx]
-            post_idx = self.filenames[idx+1]
-            result[self.output_df[pre_idx]<1] = self.output_df.loc[self.output_df[pre_idx]<1,post_idx]
+        # row 마다 마지막으로 1 보다 작은 model 의 다음 model 값을 사용 (없으면 첫 model)
+        negative = self.output_matrix[:-1] < 1
+        if len(negative) == 0:
+            return self.output_matrix[0].tolist()
+        last = len(negative) - 1 - np.argmax(negative[::-1], axis=0)
+        pick = np.where(negative.any(axis=0), last + 1, 0)
+        result = self.output_matrix[pick, np.arange(self.output_matrix.shape[1])]
         return result.tolist()
 
     # Hard
     def voting_hard(self):
-        result = []
-        output_np = np.array(self.output_list).T
-        row_len = len(output_np[0])
-        for row in output_np[:]:
-            ans = np.where(row > 0.5, 1, 0) # voting
-            if ans.sum() > row_len//2:
-                value = np.average(row[np.where(ans == 1)]) # 1의 개수가 더 많으면 0.5 보다 큰 prob를 평균
-            elif ans.sum() < row_len//2:
-                value = np.average(row[np.where(ans == 0)]) # 0의 개수가 더 많으면 0.5 보다 작은 prob 평균
-            else:
-                value = np.average(row) # 동일한 경우 전체 평균
-            result.append(value)
-        return result
\ No newline at end of file
+        output_np = self.output_matrix
+        row_len = len(output_np)
+        ans = output_np > 0.5 # voting
+        n_one = ans.sum(axis=0)
+        # 1의 개수가 더 많으면 0.5 보다 큰 prob를 평균, 0의 개수가 더 많으면 0.5 보다 작은 prob 평균, 동일한 경우 전체 평균
+        use = np.where(n_one > row_len//2, ans, np.where(n_one < row_len//2, ~ans, True))
+        count = use.sum(axis=0)
+        value = np.sum(np.where(use, output_np, 0), axis=0) / count
+        return value.tolist()
\ No newline at end of file
@@ -1,6 +1,5 @@
 import pandas as pd
 import os
-import random
 
 import torch
 import wandb
@@ -11,6 +10,19 @@ from sklearn.metrics import accuracy_score
 import numpy as np
 
 import argparse
+import sys
+
+# code/common 의 공용 모듈 사용 : key 별 평균 / 표준편차 feature 를 한번에 계산
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from common.group_stats import HYUNHO_GROUP_FEATS, group_features
+from common.ingest import read_interactions
+from common.time_features import group_codes, next_group_diff, to_epoch_seconds
+from common.split import user_split_index
+
+# common.group_stats 의 HYUNHO_GROUP_FEATS 에 유저의 시험지별 평균 정답률을 추가
+GROUP_FEATS = (HYUNHO_GROUP_FEATS[:4]
+               + [('user_avg_bytest', ['userID', 'testId'], 'answerCode', 'mean')]
+               + HYUNHO_GROUP_FEATS[4:])
 
 def feature_engineering(df):
     
@@ -33,39 +45,18 @@ def feature_engineering(df):
     # total['elapsed'] = diff
     
     # 유저, test, same_item_cnt 구분했을 때 문제 푸는데 걸린 시간 > shift, fillna x
-    diff_shift = df.loc[:, ['userID', 'testId', 'Timestamp', 'same_item_cnt']].groupby(['userID', 'testId', 'same_item_cnt']).diff().shift(-1)
-    diff_shift = diff_shift['Timestamp'].apply(lambda x: x.total_seconds())
-    df['solved_time_shift'] = diff_shift
+    timestamp = to_epoch_seconds(df['Timestamp'])
+    df['solved_time_shift'] = next_group_diff(group_codes(df, ['userID', 'testId', 'same_item_cnt']), timestamp)
     # total['solved_time_shift'] = total.groupby(['userID', 'testId', 'same_item_cnt'])['solved_time_shift'].apply(lambda x:x.fillna(x.mean()))
     
-    # 1. agg 값 구하기
-    ## 1-1. 유저/문제/시험지/태그별 평균 정답률
-    df['user_avg'] = df.groupby('userID')['answerCode'].transform('mean')
-    df['item_avg'] = df.groupby('assessmentItemID')['answerCode'].transform('mean')
-    df['test_avg'] = df.groupby('testId')['answerCode'].transform('mean')
-    df['tag_avg'] = df.groupby('KnowledgeTag')['answerCode'].transform('mean')
-    df['user_avg_bytest'] = df.groupby(['userID','testId'])['answerCode'].transform('mean')
-
-    ## 1-2. 유저/문제/시험지별 평균 풀이시간
-    df['user_time_avg'] = df.groupby('userID')['solved_time_shift'].transform('mean')
-    df['item_time_avg'] = df.groupby('assessmentItemID')['solved_time_shift'].transform('mean')
-    df['test_time_avg'] = df.groupby('testId')['solved_time_shift'].transform('mean')
-    df['tag_time_avg'] = df.groupby('KnowledgeTag')['solved_time_shift'].transform('mean')
-    
-    # 맞은 사람의 문제별 평균 풀이시간
-    df = df.set_index('assessmentItemID')
-    df['Item_mean_solved_time'] = df[df['answerCode'] == 1].groupby('assessmentItemID')['solved_time_shift'].mean()
-    df = df.reset_index(drop = False)
-     
-    # 유저/문제/시험지/태그별 표준편차
-    df['user_std'] = df.groupby('userID')['answerCode'].transform('std')
-    df['item_std'] = df.groupby('assessmentItemID')['answerCode'].transform('std')
-    df['test_std'] = df.groupby('testId')['answerCode'].transform('std')
-    df['tag_std'] = df.groupby('KnowledgeTag')['answerCode'].transform('std')
-    
-    ## 1-3. 현재 유저의 해당 문제지 평균 정답률/풀이시간
-    df['user_current_avg'] = df.groupby(['userID', 'testId', 'same_item_cnt'])['answerCode'].transform('mean')
-    df['user_current_time_avg'] = df.groupby(['userID', 'testId', 'same_item_cnt'])['solved_time_shift'].transform('mean')
+    # 1. agg 값 구하기 : key 마다 한번만 factorize 해서 평균 정답률, 풀이시간, 표준편차를 계산
+    df['correct_solved_time'] = df['solved_time_shift'].where(df['answerCode'] == 1)
+    feats = group_features(df, GROUP_FEATS)
+    df = df.drop(columns='correct_solved_time').assign(**feats)
+
+    # 기존 set_index / reset_index 와 같이 assessmentItemID 를 첫번째 column 으로, index 는 초기화
+    df = df[['assessmentItemID'] + [col for col in df.columns if col != 'assessmentItemID']]
+    df = df.reset_index(drop=True)
     
     # 2. 컬럼 추가
     df['hour'] = df['Timestamp'].dt.hour
@@ -89,51 +80,22 @@ def feature_engineering(df):
     
     df['Bigcat'] = df['testId'].str[2]
     df['Bigcat'] = df['Bigcat'].astype('category')
-    df['Bigcat_avg'] = df.groupby('Bigcat')['answerCode'].transform('mean')
+    df['Bigcat_avg'] = group_features(df, [('Bigcat_avg', 'Bigcat', 'answerCode', 'mean')])['Bigcat_avg']
     
     return df
 
 
-# train과 test 데이터셋은 사용자 별로 묶어서 분리를 해주어야함
-def custom_train_test_split(df, ratio=0.7, split=True):
-    
-    users = list(zip(df['userID'].value_counts().index, df['userID'].value_counts()))
-    random.shuffle(users)
-    
-    max_train_data_len = ratio*len(df)
-    sum_of_train_data = 0
-    user_ids =[]
-
-    for user_id, count in users:
-        sum_of_train_data += count
-        if max_train_data_len < sum_of_train_data:
-            break
-        user_ids.append(user_id)
-
-
-    train = df[df['userID'].isin(user_ids)]
-    test = df[df['userID'].isin(user_ids) == False]
-
-    #test데이터셋은 각 유저의 마지막 interaction만 추출
-    test = test[test['userID'] != test['userID'].shift(-1)]
-    return train, test
-
-
-
-
-
 def main(args):
     wandb.login()
 
     data_dir = '../../data' # 경로는 상황에 맞춰서 수정해주세요!
     csv_file_path = os.path.join(data_dir, 'train_data.csv') # 데이터는 대회홈페이지에서 받아주세요 :)
-    df = pd.read_csv(csv_file_path) 
+    df = read_interactions(csv_file_path) 
 
     df = feature_engineering(df)
-    random.seed(args.seed)
 
-    # 유저별 분리
-    train, test = custom_train_test_split(df, ratio=args.train_ratio)
+    # 유저별 분리 : frame 을 복사하지 않고 row 위치만 나눈다 (test 는 각 유저의 마지막 interaction)
+    train_idx, test_idx = user_split_index(df['userID'].to_numpy(), ratio=args.train_ratio, seed=args.seed)
 
     # 사용할 Feature 설정
     # FEATS = ['KnowledgeTag', 'user_correct_answer', 'user_total_answer', 
@@ -142,15 +104,11 @@ def main(args):
        'test_time_avg', 'tag_time_avg', 'user_current_avg', 'user_current_time_avg', 'hour', 'item_num', 'Bigcat','Bigcat_avg']
 
     # X, y 값 분리
-    y_train = train['answerCode']
-    train = train.drop(['answerCode'], axis=1)
-
-    y_test = test['answerCode']
-    test = test.drop(['answerCode'], axis=1)
-
+    X, y = df[FEATS], df['answerCode']
+    y_train, y_test = y.iloc[train_idx], y.iloc[test_idx]
 
-    lgb_train = lgb.Dataset(train[FEATS], y_train)
-    lgb_test = lgb.Dataset(test[FEATS], y_test)
+    lgb_train = lgb.Dataset(X.iloc[train_idx], y_train)
+    lgb_test = lgb.Dataset(X.iloc[test_idx], y_test)
 
     ##########
     wandb.init(project="lgbm", config=vars(args))
@@ -171,7 +129,7 @@ def main(args):
     )
     wandb.lightgbm.log_summary(model, save_model_checkpoint=True)
 
-    preds = model.predict(test[FEATS])
+    preds = model.predict(X.iloc[test_idx])
 
     acc = accuracy_score(y_test, np.where(preds >= 0.5, 1, 0))
     auc = roc_auc_score(y_test, preds)
@@ -185,7 +143,7 @@ def main(args):
 
     # LOAD TESTDATA
     test_csv_file_path = os.path.join(data_dir, 'test_data.csv')
-    test_df = pd.read_csv(test_csv_file_path)
+    test_df = read_interactions(test_csv_file_path)
 
     # FEATURE ENGINEERING
     test_df = feature_engineering(test_df)
@@ -1,9 +1,16 @@
 import os
+import sys
 
+import numpy as np
 import pandas as pd
 import torch
 from sklearn.model_selection import train_test_split
 
+# code/common 의 공용 모듈 사용 : csv 를 parquet 로 한번 변환해서 dtype 을 지정해 읽음
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+from common.ingest import read_interactions
+from common.graph import NodeIndex, edge_index
+
 def prepare_dataset(device, basepath, verbose=True, logger=None):
     data = load_data(basepath)
     train_data, test_data = separate_data(data)
@@ -26,8 +33,9 @@ def prepare_dataset(device, basepath, verbose=True, logger=None):
 def load_data(basepath):
     path1 = os.path.join(basepath, "train_data.csv")
     path2 = os.path.join(basepath, "test_data.csv")
-    data1 = pd.read_csv(path1)
-    data2 = pd.read_csv(path2)
+    columns = ["userID", "assessmentItemID", "testId", "answerCode", "Timestamp", "KnowledgeTag"]
+    data1 = read_interactions(path1, columns)
+    data2 = read_interactions(path2, columns)
 
     data = pd.concat([data1, data2])
     data.drop_duplicates(
@@ -45,33 +53,19 @@ def separate_data(data):
 
 
 def indexing_data(data):
-    userid, itemid = (
-        sorted(list(set(data.userID))),
-        sorted(list(set(data.assessmentItemID))),
-    )
-    n_user, n_item = len(userid), len(itemid)
-
-    userid_2_index = {v: i for i, v in enumerate(userid)}
-    itemid_2_index = {v: i + n_user for i, v in enumerate(itemid)}
-    # userid_2_index dict 에 itemid_2_index 를 concat
-    id_2_index = dict(userid_2_index, **itemid_2_index)
+    # user 는 0 ~ n_user-1, item 은 n_user 부터 (정렬 순서) 의 node 번호
+    id_2_index = NodeIndex(data.userID, data.assessmentItemID)
 
     return id_2_index
 
 
 def process_data(data, id_2_index, device):
-    edge, label = [], []
     # user : userID, item : assessmentItemID, value : answerCode
-    for user, item, acode in zip(data.userID, data.assessmentItemID, data.answerCode):
-    # for user, item, solved_cnt in zip(data.userID, data.assessmentItemID, data.solved_cnt):
-        uid, iid = id_2_index[user], id_2_index[item]
-        edge.append([uid, iid])
-        label.append(acode)
-        # label.append(solved_cnt)
-
-    edge = torch.LongTensor(edge).T
+    # row 별 dict 조회 없이 column 전체를 node 번호로 바꾸고 numpy buffer 에서 바로 tensor 를 만든다
+    edge = torch.from_numpy(edge_index(data, id_2_index))
     
-    label = torch.LongTensor(label)
+    label = torch.from_numpy(data.answerCode.to_numpy(dtype=np.int64))
+    # label = torch.from_numpy(data.solved_cnt.to_numpy(dtype=np.int64))
 
     return dict(edge=edge.to(device), label=label.to(device))
 
@@ -9,6 +9,8 @@ class CFG:
     # data
     basepath = "/opt/ml/input/data/"
     loader_verbose = True
+    elo_state = None  # ex) "./weight/elo_state.npz" : 저장된 Elo snapshot 이후 interaction 만 반영 (update.py 에서 필수, train.py 부터 설정)
+    graph_store = "./weight/graph_store.npz"  # train.py 가 저장하는 graph / node index. update.py 와 inference.py 에서 사용
 
     # dump
     output_dir = "./output/"
@@ -27,8 +29,17 @@ class CFG:
     n_epoch = 3000
     early_stop = 3000
     learning_rate = 0.0015
+    batch_size = None  # int : supervised edge mini-batch 크기. None 이면 epoch 마다 전체 graph 로 한번 update
+    refresh_every = None  # int : mini-batch 에서 layer embedding (2-hop 이상) 을 다시 계산하는 batch 주기. None 이면 epoch 마다
+    eval_every = 1  # int : valid 평가 epoch 주기. early_stop 은 평가 횟수로 센다
+    n_jobs = 1  # int : K-fold 를 동시에 학습할 process 수 (cpu 에서만)
     weight_basepath = "./weight"
 
+    # update (update.py : 새 interaction 으로 graph 를 늘리고 fold model 을 이어서 학습)
+    update_file = "/opt/ml/input/data/new_data.csv"
+    update_epoch = 20
+    update_valid_ratio = 0.1  # 새 edge 중 valid 로 쓸 비율
+
     # sweep
     sweep=False
     sweep_count = 20
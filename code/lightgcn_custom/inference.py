@@ -1,13 +1,18 @@
 import os
+import sys
 
 import pandas as pd
 import numpy as np
 import torch
 from config import CFG, logging_conf
-from lightgcn.datasets import prepare_dataset
-from lightgcn.models import build, inference
+from lightgcn.datasets import GraphStore, prepare_dataset, prepare_test_from_store
+from lightgcn.models import build, ensemble_inference
 from lightgcn.utils import get_logger
 
+# code/common 의 공용 모듈 사용 : 제출 파일 writer
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from common.submission import write_submission
+
 logger = get_logger(logging_conf)
 use_cuda = torch.cuda.is_available() and CFG.use_cuda_if_available
 device = torch.device("cuda" if use_cuda else "cpu")
@@ -20,9 +25,20 @@ def main():
     logger.info("Task Started")
 
     logger.info("[1/4] Data Preparing - Start")
-    train_data, valid,test_data,num_info,additional_data= prepare_dataset(
-        device, CFG.basepath, verbose=CFG.loader_verbose, logger=logger.getChild("data")
-    )
+    if CFG.graph_store and os.path.exists(CFG.graph_store):
+        # update.py 로 늘어난 graph 의 node 번호 / 부가 정보를 사용
+        store = GraphStore.load(CFG.graph_store)
+        test_data = prepare_test_from_store(device, CFG.basepath, store, elo_state=CFG.elo_state)
+        num_info, additional_data = store.num_info, store.side_information(device)
+        # 전달은 저장된 graph (answerCode >= 0 인 edge 전체) 로
+        graph = store.edges(device=device)
+    else:
+        train_data, valid,test_data,num_info,additional_data= prepare_dataset(
+            device, CFG.basepath, verbose=CFG.loader_verbose, logger=logger.getChild("data"),
+            elo_state=CFG.elo_state, save_elo=False,
+        )
+        # 전달은 test edge 가 아니라 답이 있는 edge 전체 (train + valid) 로
+        graph = {key: torch.cat([train_data[0][key], valid[0][key]], dim=-1) for key in train_data[0]}
     logger.info("[1/4] Data Preparing - Done")
 
     logger.info("[2/4] Model Building - Start")
@@ -45,22 +61,17 @@ def main():
     #     logger=logger.getChild("build"),
     #     **CFG.build_kwargs
     # )
-    pred_list = [] 
     for model in model_list : 
         model.to(device)
-        logger.info("[2/4] Model Building - Done")
-
-        logger.info("[3/4] Inference - Start")
-        pred = inference(model, test_data, additional_data,logger=logger.getChild("infer"))
-        logger.info("[3/4] Inference - Done")
+    logger.info("[2/4] Model Building - Done")
 
-        logger.info("[4/4] Result Dump - Start")
-        pred = pred.detach().cpu().numpy()
-        pred_list.append(pred)
+    logger.info("[3/4] Inference - Start")
+    # fold 별 embedding 을 [k, n_nodes, d] 로 쌓아서 한번에 전달 / 점수화하고 fold 평균
+    pred = ensemble_inference(model_list, test_data, additional_data, graph=graph, logger=logger.getChild("infer"))
+    logger.info("[3/4] Inference - Done")
 
-    pd.DataFrame({"prediction":  np.mean(pred_list, axis = 0)}).to_csv(
-        os.path.join(CFG.output_dir, CFG.pred_file), index_label="id"
-    )
+    logger.info("[4/4] Result Dump - Start")
+    write_submission(os.path.join(CFG.output_dir, CFG.pred_file), pred.cpu().numpy())
     logger.info("[4/4] Result Dump - Done")
 
     logger.info("Task Complete")
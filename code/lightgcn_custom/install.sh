@@ -2,5 +2,6 @@
 pip install pandas
 pip install scikit-learn
 pip install wandb
+pip install numba
 conda install -y pytorch==1.11.0 torchvision==0.12.0 torchaudio==0.11.0 cudatoolkit=11.3 -c pytorch
 conda install pyg -c pyg
\ No newline at end of file
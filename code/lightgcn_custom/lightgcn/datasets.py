@@ -5,43 +5,27 @@ import torch
 import numpy as np
 from sklearn.model_selection import train_test_split
 from sklearn.model_selection import StratifiedKFold
-import random
-from tqdm import tqdm
+import sys
 
-# train과 test 데이터셋은 사용자 별로 묶어서 분리를 해주어야함
-def custom_train_test_split(df, ratio=0.7, split=True):
-    
-    users = list(zip(df['userID'].value_counts().index, df['userID'].value_counts()))
-    random.shuffle(users)
-    
-    max_train_data_len = ratio*len(df)
-    sum_of_train_data = 0
-    user_ids =[]
-
-    for user_id, count in users:
-        sum_of_train_data += count
-        if max_train_data_len < sum_of_train_data:
-            break
-        user_ids.append(user_id)
-
-    train = df[df['userID'].isin(user_ids)]
-    test = df[df['userID'].isin(user_ids) == False]
+# code/common 의 공용 모듈 사용
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+from common.elo import estimate_elo
+from common.time_features import day_diff, solved_time
+from common.ingest import read_interactions
+from common.graph import NodeIndex, edge_index
 
-    #test데이터셋은 각 유저의 마지막 interaction만 추출
-    test = test[test['userID'] != test['userID'].shift(-1)]
-    return train, test
-
-
-def prepare_dataset(device, basepath, verbose=True, logger=None):
+def prepare_dataset(device, basepath, verbose=True, logger=None, elo_state=None, graph_store=None, save_elo=True):
     data = load_data(basepath)
-    data =  preprocessing_data(data)
+    data =  preprocessing_data(data, elo_state, save_elo)
     train_data, test_data = separate_data(data)
     # train,valid, test_data = separate_data_v2(data)
     # add split function 
+    # valid 는 edge 단위로 나눈다 : user 단위로 나누면 valid user 는 학습 edge 가 없어 embedding 이 학습되지 않는다
     train,valid = train_test_split(train_data, test_size=0.2)
-    # train,valid = custom_train_test_split(train_data)
-    id2index, num_info = indexing_data(data)
-    additional_data = get_additional_data_list(data)
+    id2index, num_info, categories = indexing_data(data)
+    additional_data = get_additional_data_list(data, id2index, device)
+    if graph_store:
+        GraphStore.from_frame(data, id2index, categories).save(graph_store)
     train_data_proc = process_data(train, id2index, device)
     valid_data_proc = process_data(valid, id2index, device)
     test_data_proc = process_data(test_data, id2index, device)
@@ -55,16 +39,18 @@ def prepare_dataset(device, basepath, verbose=True, logger=None):
     # return train_data_proc, test_data_proc, len(id2index)
     return train_data_list,valid_data_list, test_data_proc, num_info,  additional_data
 
-def prepare_dataset_kfold(device, basepath, num_fold= 10, verbose=True, logger=None):
+def prepare_dataset_kfold(device, basepath, num_fold= 10, verbose=True, logger=None, elo_state=None, graph_store=None):
     data = load_data(basepath)
-    data = preprocessing_data(data)
+    data = preprocessing_data(data, elo_state)
     train_data, test_data = separate_data(data)
-    # add split function 
+    # add split function : prepare_dataset 과 같이 edge 단위 (모든 user 가 fold 마다 학습 edge 를 가짐)
     skf = StratifiedKFold(n_splits=num_fold)
     # skf.get_n_splits(train_data, train_data["answerCode"])
     
-    id2index, num_info = indexing_data(data)
-    additional_data = get_additional_data_list(data)
+    id2index, num_info, categories = indexing_data(data)
+    additional_data = get_additional_data_list(data, id2index, device)
+    if graph_store:
+        GraphStore.from_frame(data, id2index, categories).save(graph_store)
 
     train_data_list, valid_data_list = [], []
 
@@ -83,11 +69,34 @@ def prepare_dataset_kfold(device, basepath, num_fold= 10, verbose=True, logger=N
 
 
 
+def prepare_test_from_store(device, basepath, store, elo_state=None):
+    """ GraphStore 의 node 번호로 csv 의 test row (answerCode < 0) edge 를 만든다. (update.py 로 graph 를 이어 붙인 뒤 추론)
+
+    추론용이므로 Elo snapshot 은 읽기만 하고 저장하지 않는다.
+    """
+    data = load_data(basepath)
+    data = preprocessing_data(data, elo_state, save_elo=False)
+    _, test_data = separate_data(data)
+    return process_data(test_data, store.node_index, device)
+
+
+def load_new_data(path, elo_state=None, elo_save_path=None):
+    """ incremental update 용 : 새 interaction csv 만 읽어서 학습 때와 같이 전처리한다. (Elo 는 elo_state snapshot 에서 이어서)
+
+    elo_save_path 를 주면 갱신된 Elo snapshot 을 elo_state 대신 그 위치에 저장한다.
+    """
+    columns = ["userID", "assessmentItemID", "testId", "answerCode", "Timestamp", "KnowledgeTag"]
+    data = read_interactions(path, columns)
+    data.drop_duplicates(subset=["userID", "assessmentItemID"], keep="last", inplace=True)
+    return preprocessing_data(data, elo_state, elo_save_path=elo_save_path)
+
+
 def load_data(basepath):
     path1 = os.path.join(basepath, "train_data.csv")
     path2 = os.path.join(basepath, "test_data.csv")
-    data1 = pd.read_csv(path1)
-    data2 = pd.read_csv(path2)
+    columns = ["userID", "assessmentItemID", "testId", "answerCode", "Timestamp", "KnowledgeTag"]
+    data1 = read_interactions(path1, columns)
+    data2 = read_interactions(path2, columns)
 
     data = pd.concat([data1, data2])
     data.drop_duplicates(
@@ -115,16 +124,9 @@ def indexing_data( data : pd.DataFrame ):
         
     """
     
-    userid, itemid = (
-        sorted(list(set(data.userID))),
-        sorted(list(set(data.assessmentItemID))),
-    )   
-    n_user, n_item = len(userid), len(itemid)
-
-    userid_2_index = {v: i for i, v in enumerate(userid)}
-    itemid_2_index = {v: i + n_user for i, v in enumerate(itemid)}
-    # userid_2_index dict 에 itemid_2_index 를 concat
-    id_2_index = dict(userid_2_index, **itemid_2_index)
+    # user 는 0 ~ n_user-1, item 은 n_user 부터 (정렬 순서) 의 node 번호
+    id_2_index = NodeIndex(data.userID, data.assessmentItemID)
+    n_user, n_item = id_2_index.n_user, id_2_index.n_item
     
     tagid = sorted(list(set(data.KnowledgeTag)))
     tagid_2_index = {v: i for i, v in enumerate(tagid)}
@@ -146,104 +148,32 @@ def indexing_data( data : pd.DataFrame ):
         "n_testids" : len(testid),
         "n_bigcat" : len(bigcatid),
     }
+    # code 순서의 원래 값 (GraphStore 에 저장해서 새 interaction 을 같은 code 로 바꿀 때 사용)
+    categories = {"KnowledgeTag": tagid, "testId": testid, "big_category": bigcatid}
 
-    return id_2_index, num_info
-
-def elo(df, key):
-    def get_new_theta(is_good_answer, beta, left_asymptote, theta, nb_previous_answers):
-        return theta + learning_rate_theta(nb_previous_answers) * (
-            is_good_answer - probability_of_good_answer(theta, beta, left_asymptote)
-        )
-
-    def get_new_beta(is_good_answer, beta, left_asymptote, theta, nb_previous_answers):
-        return beta - learning_rate_beta(nb_previous_answers) * (
-            is_good_answer - probability_of_good_answer(theta, beta, left_asymptote)
-        )
-
-    def learning_rate_theta(nb_answers):
-        return max(0.3 / (1 + 0.01 * nb_answers), 0.04)
-
-    def learning_rate_beta(nb_answers):
-        return 1 / (1 + 0.05 * nb_answers)
-
-    def probability_of_good_answer(theta, beta, left_asymptote):
-        return left_asymptote + (1 - left_asymptote) * sigmoid(theta - beta)
-
-    def sigmoid(x):
-        return 1 / (1 + np.exp(-x))
-
-    def estimate_parameters(answers_df, granularity_feature_name=key):
-        item_parameters = {
-            granularity_feature_value: {"beta": 0, "nb_answers": 0}
-            for granularity_feature_value in np.unique(
-                answers_df[granularity_feature_name]
-            )
-        }
-        student_parameters = {
-            student_id: {"theta": 0, "nb_answers": 0}
-            for student_id in np.unique(answers_df.userID)
-        }
+    return id_2_index, num_info, categories
 
-        print("\nParameter estimation is starting...", flush=True)
-
-        for student_id, item_id, left_asymptote, answered_correctly in tqdm(
-            zip(
-                answers_df['userID'].values,
-                answers_df[granularity_feature_name].values,
-                answers_df['left_asymptote'].values,
-                answers_df['answerCode'].values,
-            ),
-            total=len(answers_df),
-        ):
-            theta = student_parameters[student_id]["theta"]
-            beta = item_parameters[item_id]["beta"]
-
-            item_parameters[item_id]["beta"] = get_new_beta(
-                answered_correctly,
-                beta,
-                left_asymptote,
-                theta,
-                item_parameters[item_id]["nb_answers"],
-            )
-            student_parameters[student_id]["theta"] = get_new_theta(
-                answered_correctly,
-                beta,
-                left_asymptote,
-                theta,
-                student_parameters[student_id]["nb_answers"],
-            )
-
-            item_parameters[item_id]["nb_answers"] += 1
-            student_parameters[student_id]["nb_answers"] += 1
-
-        print(f"Theta & beta estimations on {granularity_feature_name} are completed.\n")
-        return student_parameters, item_parameters
-
-    def gou_func(theta, beta):
-        return 1 / (1 + np.exp(-(theta - beta)))
-
-    df["left_asymptote"] = 0
+def elo(df, key, state_path=None, save=True, save_path=None):
+    """ userID 와 key column 기준으로 Elo rating 을 추정해 정답 확률 column 을 추가한다.
 
+    key 가 assessmentItemID 면 'elo', 그 외에는 '{key}_elo' column 으로 저장
+    state_path 가 주어지면 저장된 snapshot 이후의 interaction 만 반영한다.
+    save / save_path 는 common.elo.estimate_elo 와 같다.
+    """
     print('======================================')
     print(f"Dataset of shape {df.shape}")
-    # print(f"Columns are {list(df.columns)}")
 
-    student_parameters, item_parameters = estimate_parameters(df)
+    prob = estimate_elo(df, key, state_path=state_path, save=save, save_path=save_path)
+    print(f"Theta & beta estimations on {key} are completed.\n")
 
-    prob = [
-        gou_func(student_parameters[student]["theta"], item_parameters[item]["beta"])
-        for student, item in zip(df.userID.values, df[key].values)
-    ]
     if key == 'assessmentItemID':
         df['elo'] = prob
-        print("여기 !?")
     else:
         df[f"{key}_elo"] = prob
-    df = df.drop(columns=["left_asymptote"])
 
     return df
 
-def preprocessing_data(data):
+def preprocessing_data(data, elo_state=None, save_elo=True, elo_save_path=None):
     
     """ data preprocessing 
     1. KnowledgeTag 가 assessmentItemId 와 1 대 1 매칭되는지 확인
@@ -265,22 +195,19 @@ def preprocessing_data(data):
     5. (further more) user - assessmentItemId 에 따른 소요시간 추가 
     """
     data["Timestamp"] = pd.to_datetime( data["Timestamp"] )
-    data["solved_time"] = data.groupby('userID')["Timestamp"].diff().shift(-1).dt.seconds
-    data.loc[ data["solved_time"] > 14400,"solved_time"] = np.NaN
-
-    fill_mean_func = lambda g: g["solved_time"].fillna(g["solved_time"].median())
-    data["solved_time"] = data.groupby('userID').apply(fill_mean_func).reset_index()["solved_time"]
+    # 4 시간 이상은 이상치로 보고 user 별 중앙값으로 채운다
+    data["solved_time"] = solved_time(data, 'userID', clip=14400)
     # 5분 이상 풀었다면 가중치를 낮춘다. 
     data.loc[ data["solved_time"] > 300,"solved_time"] = 0
+    # row 가 1개뿐이거나 모든 간격이 4 시간을 넘는 user 는 중앙값도 NaN : 풀이 시간을 모르므로 5분 이상과 같이 0
+    # (update.py 의 새 interaction 은 user 의 row 가 적어서 자주 생기고, NaN edge weight 는 학습 전체를 NaN 으로 만든다)
+    data["solved_time"] = data["solved_time"].fillna(0)
     
     data = data.sort_values(by=["userID", "Timestamp"]).reset_index(drop=True)
-    data = elo(data,"assessmentItemID")
+    data = elo(data,"assessmentItemID", elo_state, save_elo, elo_save_path)
 
     print('day_diff')
-    day_diff = data.loc[:,['userID','Timestamp']].groupby('userID').diff().fillna(pd.Timedelta(seconds=0))
-    day_diff = day_diff['Timestamp'].apply(lambda x: x.days)
-    data['day_diff'] = day_diff
-    data['day_diff'] = data['day_diff'].apply(lambda x: x if x <= 3 and x>=0 else 4)   # 0-3은 그대로 / 나머지 1일로 클립
+    data['day_diff'] = day_diff(data, 'userID', max_day=3)   # 0-3은 그대로 / 나머지 4로 클립
 
     # normalized_time
     # data["solved_time"] = np.log( data["solved_time"])
@@ -289,44 +216,226 @@ def preprocessing_data(data):
     
     return data
 
-def get_additional_data_list(data):
-
-    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-    # assessmentItemId 기준으로 group 지어 상위 1 개 데이터만 가져옴 
-    question_info = data[['assessmentItemID','testId','big_category', 'KnowledgeTag']].groupby("assessmentItemID").head(1).copy()
-    user_info = data[['userID','day_diff']].groupby("userID").head(1).copy()
-    return {
-        "user" : { "day_diff":torch.IntTensor( user_info["day_diff"] ).to(device),},
-        "item":{
-            "KnowledgeTag" : torch.IntTensor( question_info["KnowledgeTag"] ).to(device),
-            "testId" : torch.IntTensor( question_info["testId"] ).to(device),
-            "big_category" : torch.IntTensor( question_info["big_category"] ).to(device),
+class SideInformation(dict):
+    """ node 번호 순서로 정렬한 user / item 부가 정보 : { user : { day_diff }, item : { KnowledgeTag, testId, big_category } }
+
+    groupby().head(1) 의 row 순서 (item 은 처음 등장한 순서) 에 기대지 않고
+    NodeIndex 로 user / item 마다 첫 row 의 값을 자기 node 번호 위치에 넣는다.
+    같은 store 를 train / valid / inference 에서 사용하고, model 은 store 별로 fused embedding 을 cache 한다.
+    """
+    USER_COLUMNS = ["day_diff"]
+    ITEM_COLUMNS = ["KnowledgeTag", "testId", "big_category"]
+
+    @classmethod
+    def from_frame(cls, data, node_index, device=None):
+        user_info = data.drop_duplicates("userID")
+        item_info = data.drop_duplicates("assessmentItemID")
+        user_pos = node_index.user_index(user_info["userID"])
+        item_pos = node_index.item_index(item_info["assessmentItemID"]) - node_index.n_user
+        return cls(
+            user=_align(user_info, cls.USER_COLUMNS, user_pos, node_index.n_user, device),
+            item=_align(item_info, cls.ITEM_COLUMNS, item_pos, node_index.n_item, device),
+        )
+
+    def to(self, device):
+        return SideInformation({
+            kind: {name: value.to(device) for name, value in info.items()} for kind, info in self.items()
+        })
+
+
+def _align(info, columns, pos, n_node, device=None):
+    """ info 의 column 값을 pos (node 번호 순서의 위치) 에 넣은 [n_node] LongTensor dict """
+    if len(pos) != n_node:
+        raise ValueError(f"부가 정보가 없는 node 가 있습니다 : {n_node - len(pos)} 개")
+    aligned = {}
+    for column in columns:
+        values = np.empty(n_node, dtype=np.int64)
+        values[pos] = info[column].to_numpy(dtype=np.int64)
+        aligned[column] = torch.from_numpy(values).to(device)
+    return aligned
+
+
+def get_additional_data_list(data, id_2_index, device=None):
+    # user / assessmentItemId 별 첫 row 의 부가 정보를 node 번호 순서로
+    return SideInformation.from_frame(data, id_2_index, device)
+
+
+class GraphStore:
+    """ 학습 graph (answerCode >= 0 인 interaction edge) 와 node index / 범주 code / 부가 정보를 파일로 저장해 두는 store
+
+    새 interaction 은 append 로 이어 붙인다. 새 user / item / 범주 값은 기존 순서 뒤에 붙이므로
+    기존 embedding 행의 위치가 바뀌지 않아 학습된 model 을 models.grow 로 warm start 할 수 있다.
+    item 의 node 번호는 새 user 수만큼 밀리므로 edge 는 (user 위치, item 위치) 로 저장하고 edges 에서 node 번호로 바꾼다.
+    """
+    CATEGORY_COLUMNS = SideInformation.ITEM_COLUMNS
+
+    def __init__(self, node_index, categories, user_info, item_info, user_pos, item_pos, label, weight):
+        self.node_index = node_index
+        self.categories = categories  # column -> code 순서의 원래 값 (pd.Index)
+        self.user_info = user_info  # column -> [n_user] int64
+        self.item_info = item_info  # column -> [n_item] int64
+        self.user_pos, self.item_pos = user_pos, item_pos
+        self.label, self.weight = label, weight
+
+    @classmethod
+    def from_frame(cls, data, node_index, categories):
+        """ indexing_data 로 범주 code 를 바꾼 전체 data 로 store 를 만든다. """
+        side_info = SideInformation.from_frame(data, node_index)
+        answered = data[data.answerCode >= 0]
+        return cls(
+            node_index,
+            {column: pd.Index(values) for column, values in categories.items()},
+            {column: value.numpy() for column, value in side_info["user"].items()},
+            {column: value.numpy() for column, value in side_info["item"].items()},
+            node_index.user_index(answered["userID"]),
+            node_index.item_index(answered["assessmentItemID"]) - node_index.n_user,
+            answered.answerCode.to_numpy(dtype=np.int64),
+            edge_weight(answered),
+        )
+
+    @property
+    def n_edge(self):
+        return len(self.label)
+
+    @property
+    def num_info(self):
+        return {
+            "n_user" : self.node_index.n_user,
+            "n_item" : self.node_index.n_item,
+            "n_tags" : len(self.categories["KnowledgeTag"]),
+            "n_testids" : len(self.categories["testId"]),
+            "n_bigcat" : len(self.categories["big_category"]),
         }
-    }
+
+    def append(self, data):
+        """ preprocessing_data 를 거친 새 interaction (범주 column 은 원래 값) 을 이어 붙인다.
+
+        이미 저장된 (user, item) 의 edge 는 load_data 의 drop_duplicates(keep="last") 와 같이 새 interaction 으로 바꾼다.
+        새 edge 는 항상 마지막에 붙으므로 n_edge - 새 edge 수 이후가 새 edge 이다.
+
+        Returns:
+            새 user 수, 새 item 수, 새 edge 수
+        """
+        weight = edge_weight(data[data.answerCode >= 0])
+        if not np.isfinite(weight).all():
+            raise ValueError(f"edge weight 에 NaN / inf 가 있습니다 : {(~np.isfinite(weight)).sum()} 개")
+
+        data = data.copy()
+        for column in self.CATEGORY_COLUMNS:
+            index = self.categories[column]
+            index = index.append(pd.Index(sorted(set(data[column]))).difference(index, sort=False))
+            self.categories[column] = index
+            data[column] = index.get_indexer(data[column])
+
+        old = self.node_index
+        self.node_index = old.extend(data["userID"], data["assessmentItemID"])
+        n_new_user = self.node_index.n_user - old.n_user
+        n_new_item = self.node_index.n_item - old.n_item
+
+        # 새 user / item 만 첫 row 의 부가 정보를 뒤에 붙인다 (기존 node 의 값은 그대로)
+        new_users = data[~data["userID"].isin(old.users)].drop_duplicates("userID")
+        new_items = data[~data["assessmentItemID"].isin(old.items)].drop_duplicates("assessmentItemID")
+        user_pos = self.node_index.user_index(new_users["userID"]) - old.n_user
+        item_pos = self.node_index.item_index(new_items["assessmentItemID"]) - self.node_index.n_user - old.n_item
+        for info, new_info in ((self.user_info, _align(new_users, SideInformation.USER_COLUMNS, user_pos, n_new_user)),
+                               (self.item_info, _align(new_items, SideInformation.ITEM_COLUMNS, item_pos, n_new_item))):
+            for column, value in new_info.items():
+                info[column] = np.concatenate([info[column], value.numpy()])
+
+        answered = data[data.answerCode >= 0]
+        user_pos = self.node_index.user_index(answered["userID"])
+        item_pos = self.node_index.item_index(answered["assessmentItemID"]) - self.node_index.n_user
+
+        # user / item 위치는 append 로 바뀌지 않으므로 (user 위치, item 위치) 쌍으로 이미 있는 edge 를 찾는다
+        n_item = self.node_index.n_item
+        stored = self.user_pos.astype(np.int64) * n_item + self.item_pos
+        keep = ~np.isin(stored, user_pos.astype(np.int64) * n_item + item_pos)
+
+        self.user_pos = np.concatenate([self.user_pos[keep], user_pos])
+        self.item_pos = np.concatenate([self.item_pos[keep], item_pos])
+        self.label = np.concatenate([self.label[keep], answered.answerCode.to_numpy(dtype=np.int64)])
+        self.weight = np.concatenate([self.weight[keep], weight])
+        return n_new_user, n_new_item, len(answered)
+
+    def edges(self, rows=None, device=None):
+        """ rows (None 이면 전체) edge 의 process_data 와 같은 dict """
+        rows = slice(None) if rows is None else rows
+        edge = np.stack([self.user_pos[rows], self.item_pos[rows] + self.node_index.n_user])
+        return dict(
+            edge=torch.from_numpy(edge).to(device),
+            label=torch.from_numpy(self.label[rows]).to(device),
+            weight=torch.from_numpy(self.weight[rows]).to(device),
+        )
+
+    def split_new(self, n_old_edge, valid_ratio=0.1, seed=42, device=None, min_new=10, n_valid=1000):
+        """ n_old_edge 이후 (새로 붙인) edge 의 valid_ratio 만큼을 valid 로, 나머지 전체 edge 를 train 으로
+
+        새 edge 가 min_new 개보다 적으면 전체 edge 에서 n_valid 개 (많아도 valid_ratio 만큼) 를 valid 로 뽑는다.
+        어느 경우든 valid edge 는 train 에서 뺀다.
+        """
+        rng = np.random.default_rng(seed)
+        new_rows = np.arange(n_old_edge, self.n_edge)
+        if len(new_rows) >= min_new:
+            valid_rows = rng.choice(new_rows, int(len(new_rows) * valid_ratio), replace=False)
+        else:
+            valid_rows = rng.choice(self.n_edge, min(n_valid, int(self.n_edge * valid_ratio)), replace=False)
+        valid_rows = np.sort(valid_rows)
+        train_rows = np.setdiff1d(np.arange(self.n_edge), valid_rows)
+        return self.edges(train_rows, device), self.edges(valid_rows, device)
+
+    def side_information(self, device=None):
+        return SideInformation(
+            user={column: torch.from_numpy(value).to(device) for column, value in self.user_info.items()},
+            item={column: torch.from_numpy(value).to(device) for column, value in self.item_info.items()},
+        )
+
+    def save(self, path):
+        arrays = dict(users=_savable(self.node_index.users), items=_savable(self.node_index.items),
+                      user_pos=self.user_pos, item_pos=self.item_pos, label=self.label, weight=self.weight)
+        arrays.update({f"category_{column}": _savable(index) for column, index in self.categories.items()})
+        arrays.update({f"user_{column}": value for column, value in self.user_info.items()})
+        arrays.update({f"item_{column}": value for column, value in self.item_info.items()})
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            np.savez(f, **arrays)
+
+    @classmethod
+    def load(cls, path):
+        state = np.load(path)
+        return cls(
+            NodeIndex.from_ordered(state["users"], state["items"]),
+            {column: pd.Index(state[f"category_{column}"]) for column in cls.CATEGORY_COLUMNS},
+            {column: state[f"user_{column}"] for column in SideInformation.USER_COLUMNS},
+            {column: state[f"item_{column}"] for column in SideInformation.ITEM_COLUMNS},
+            state["user_pos"], state["item_pos"], state["label"], state["weight"],
+        )
+
+
+def _savable(index):
+    """ np.load 에서 pickle 없이 읽을 수 있도록 object (str) index 는 unicode array 로 """
+    values = index.to_numpy()
+    return values.astype(str) if values.dtype == object else values
 
 
 def process_data(data, id_2_index, device):
 
     ################################ 1. node and label information ################################
-    edge, label = [], []
-    weight = []
     # user : userID, item : assessmentItemID, value : answerCode
     # 그래프의 연결성을 정의한다. 
     # userID 와 assessmentItemID 가 node 가 되고 각각의 uid, iid 를 이용해 두 node 가 연결되어 있음을 전달.
-    for user, item, acode, elo, solved_time in zip(data.userID, data.assessmentItemID, data.answerCode, data["elo"], data.solved_time):
-    # for user, item, acode, solved_time in zip(data.userID, data.assessmentItemID, data.answerCode, data.solved_time):
-        uid, iid = id_2_index[user], id_2_index[item]
-        edge.append([uid, iid])
-        label.append(acode)
-        # weight.append(solved_time)
-        weight.append(elo+solved_time)
-
-    edge = torch.LongTensor(edge).T
-    label = torch.LongTensor(label)
-    weight = torch.FloatTensor(weight)
+    # row 별 dict 조회 없이 column 전체를 node 번호로 바꾸고 numpy buffer 에서 바로 tensor 를 만든다
+    edge = torch.from_numpy(edge_index(data, id_2_index))
+    label = torch.from_numpy(data.answerCode.to_numpy(dtype=np.int64))
+    # weight = data.solved_time
+    weight = torch.from_numpy(edge_weight(data))
     return dict(edge=edge.to(device), label=label.to(device), weight = weight.to(device))
 
 
+def edge_weight(data):
+    return (data["elo"] + data.solved_time).to_numpy(dtype=np.float32)
+
+
 def print_data_stat(data, name, logger):
     userid, itemid = list(set(data.userID)), list(set(data.assessmentItemID))
     n_user, n_item = len(userid), len(itemid)
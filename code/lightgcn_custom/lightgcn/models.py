@@ -1,18 +1,20 @@
 from typing import Optional, Union, Tuple
 from torch_geometric.typing import Adj, OptTensor
 
+import math
 import os
 import numpy as np
 import torch
 from torch import Tensor
-from sklearn.metrics import accuracy_score, roc_auc_score
 from torch_geometric.nn.models import LightGCN
 from torch_geometric.nn import MessagePassing
-from torch.nn import Embedding, ModuleList
-from torch_geometric.nn.conv import LGConv
-from torch_sparse import SparseTensor
+from torch.nn import Embedding
+# torch_sparse 가 없으면 torch_geometric 의 placeholder class 를 사용 (isinstance 확인용)
+from torch_geometric.typing import SparseTensor
 from torch import nn
 import torch.nn.functional as F
+from .propagation import Propagation
+from .utils import CheckpointSaver, ValidationScheduler, accuracy, roc_auc
 try:
     from transformers.modeling_bert import BertConfig, BertEncoder, BertModel
 except:
@@ -91,7 +93,14 @@ class MyLightGCN(torch.nn.Module):
             """
 
             self.daydiff_embedding  = Embedding(5, embedding_dim)
-            self.convs = ModuleList([LGConv(**kwargs) for _ in range(num_layers)])
+            # LGConv 대신 정규화된 인접 행렬(CSR) 을 edge_index 별로 cache 해 두고 layer 마다 SpMM 한번으로 전달
+            self.propagation = Propagation(num_info["n_user"] + num_info["n_item"])
+            # mini-batch 학습에서 주기적으로 다시 계산하는 layer 1 ~ num_layers-1 embedding
+            self.history = []
+            # 추론용 최종 node embedding table (cache_embedding)
+            self.embedding_table = None
+            # 평가 / 추론에서 다시 쓰는 layer 0 embedding (부가 정보 store, weight version, x)
+            self.input_cache = None
         
             # embedding layer 및 convolutional layer 의 weight 초기화 
             self.reset_parameters()
@@ -104,12 +113,54 @@ class MyLightGCN(torch.nn.Module):
         torch.nn.init.xavier_uniform_(self.bigcat_embedding.weight)
         torch.nn.init.xavier_uniform_(self.daydiff_embedding.weight)
 
-        for conv in self.convs:
-            conv.reset_parameters()
+    def edge_dropout_mask(self, n_edge: int, p: float = 0.5, training: bool = True,
+                          device=None) -> Optional[Tensor]:
+        """ dropout_edge 와 같은 확률로 남길 edge 의 mask. dropout 을 하지 않으면 None """
+        if p < 0. or p > 1.:
+            raise ValueError(f'Dropout probability has to be between 0 and 1 '
+                            f'(got {p}')
+        if not training or p == 0.0:
+            return None
+        return torch.rand(n_edge, device=device) >= p
 
-    def get_embedding(self, edge_index: Adj, additional_info:dict=None, edge_weight: OptTensor = None, 
-                      training:bool=True, dropout:float=0.2) -> Tensor:
+    def propagate(self, x: Tensor, edge_index: Adj, edge_weight: OptTensor = None,
+                  training: bool = True, dropout: float = 0.2, out: OptTensor = None) -> Tensor:
+        """ x 를 num_layers 번 전달해서 alpha 가중합을 만든다.
 
+        edge dropout 은 edge 를 지우지 않고 정규화 행렬의 weight 만 0 으로 바꿔 다시 계산한다. (CSR 구조는 재사용)
+        """
+        adj = self.propagation.adjacency(edge_index, edge_weight)
+        edge_mask = self.edge_dropout_mask(adj.n_edge, p=dropout, training=training, device=x.device)
+        self.edge_mask = edge_mask
+        matrix = adj.matrix if edge_mask is None else adj.masked(edge_mask)
+        return self.propagation.propagate(x, matrix, self.alpha, out)
+
+    def input_embedding(self, additional_info:dict=None) -> Tensor:
+        """ layer 0 의 node embedding x : [user ; item]
+
+        gradient 를 계산하지 않을 때 (평가 / 추론) 는 같은 부가 정보 store 에서 embedding weight 가
+        바뀌지 않았으면 (optimizer step / load_state_dict 가 없었으면) 이전에 합친 결과를 그대로 사용한다.
+        """
+        if torch.is_grad_enabled():
+            return self.fuse_embedding(additional_info)
+
+        key = (self._embedding_version(), self.user_embedding.weight.device)
+        cache = self.input_cache
+        if cache is not None and cache[0] is additional_info and cache[1] == key:
+            return cache[2]
+        x = self.fuse_embedding(additional_info)
+        self.input_cache = (additional_info, key, x)
+        return x
+
+    def _embedding_version(self) -> tuple:
+        """ embedding weight 의 in-place 수정 횟수 (optimizer step 마다 증가) """
+        return tuple(weight._version for weight in (
+            self.user_embedding.weight, self.item_embedding.weight, self.tag_embedding.weight,
+            self.testId_embedding.weight, self.bigcat_embedding.weight, self.daydiff_embedding.weight,
+        ))
+
+    def fuse_embedding(self, additional_info:dict=None) -> Tensor:
+        """ user / item embedding 에 부가 정보 embedding 을 합친다. """
         item_embedding_weight = self.item_embedding.weight 
         tag_embedding_weight  = self.tag_embedding(additional_info["item"]["KnowledgeTag"] )
         testId_embedding_weight  = self.testId_embedding(additional_info["item"]["testId"] )
@@ -148,25 +199,21 @@ class MyLightGCN(torch.nn.Module):
               total_embedding_weight
             # total_embedding_weight
             ],dim= 0)
-        
+        return x
+
+    def layer0_embedding(self, x: Tensor) -> Tensor:
+        """ alpha 가중합의 layer 0 항 """
         # x = self.embedding.weight
-        out = x * self.alpha[0]
+        return x * self.alpha[0]
 
-        # edge drop out
-        edge_index, edge_mask = self.dropout_edge(edge_index,p=dropout,training=training)
-        edge_weight = torch.masked_select(edge_weight, edge_mask) 
-        self.edge_mask = edge_mask
-        
-        """
-        for i in range(self.num_layers):
-            # edge_weight =  torch.ones(edge_index.size(1))
-            # print(edge_weight)
-            # print(edge_weight.shape)
-            x = self.convs[i](x, edge_index, edge_weight = None ) # edge_weight
-            out = out + x * self.alpha[i + 1]
-        """
-            
-        return out
+    def get_embedding(self, edge_index: Adj, additional_info:dict=None, edge_weight: OptTensor = None, 
+                      training:bool=True, dropout:float=0.2) -> Tensor:
+        x = self.input_embedding(additional_info)
+        out = self.layer0_embedding(x)
+
+        # layer 전달 : edge_weight 로 정규화한 인접 행렬 (edge_index 별 cache) 을 num_layers 번 곱한다.
+        # edge dropout 은 training 일 때만 (weight 를 0 으로 바꿔 정규화 값만 다시 계산)
+        return self.propagate(x, edge_index, edge_weight, training=training, dropout=dropout, out=out)
 
 
     def forward(self, edge_index: Adj, additional_info:dict=None,
@@ -196,6 +243,42 @@ class MyLightGCN(torch.nn.Module):
 
         return (out_src * out_dst).sum(dim=-1)
 
+    ##########################################################################################################
+    # mini-batch 학습 : batch 의 node 만 1-hop 전달하고, 2-hop 이상은 주기적으로 다시 계산한 layer embedding 사용
+    ##########################################################################################################
+
+    def edge_values(self, edge_index: Adj, edge_weight: OptTensor = None,
+                    training: bool = True, dropout: float = 0.2) -> Tensor:
+        """ epoch 마다 한번 edge dropout 을 뽑아서 정규화 값을 만든다. (epoch 안의 batch 는 같은 mask 를 사용) """
+        adj = self.propagation.adjacency(edge_index, edge_weight)
+        edge_mask = self.edge_dropout_mask(adj.n_edge, p=dropout, training=training, device=edge_index.device)
+        return adj.values(edge_mask)
+
+    @torch.no_grad()
+    def refresh_history(self, edge_index: Adj, additional_info:dict=None, edge_weight: OptTensor = None,
+                        values: OptTensor = None):
+        """ 현재 parameter 로 layer 1 ~ num_layers-1 의 전체 node embedding 을 다시 계산해 둔다. """
+        adj = self.propagation.adjacency(edge_index, edge_weight)
+        matrix = adj.matrix if values is None else adj.build(values)
+        self.history = self.propagation.history(self.input_embedding(additional_info), matrix, self.num_layers)
+
+    def forward_batch(self, edge_index: Adj, additional_info:dict=None, edge_label_index: OptTensor = None,
+                      edge_weight: OptTensor = None, values: OptTensor = None) -> Tensor:
+        """ edge_label_index 의 edge 만 예측한다. 전달은 batch node 의 정규화 행렬 행에서만 계산한다.
+
+        refresh_history 를 먼저 불러 두어야 한다. (num_layers 가 1 이면 history 없이 정확히 계산)
+        """
+        adj = self.propagation.adjacency(edge_index, edge_weight)
+        nodes, inverse = torch.unique(edge_label_index, return_inverse=True)
+
+        x = self.input_embedding(additional_info)
+        out = self.layer0_embedding(x)[nodes]
+        out = self.propagation.propagate_rows(x, adj.rows(nodes, values), self.history, self.alpha, out)
+
+        out_src = out[inverse[0]]
+        out_dst = out[inverse[1]]
+        return (out_src * out_dst).sum(dim=-1)
+
     def dropout_edge(self,edge_index: Tensor, p: float = 0.5,
                  force_undirected: bool = False,
                  training: bool = True) -> Tuple[Tensor, Tensor]:
@@ -268,9 +351,48 @@ class MyLightGCN(torch.nn.Module):
             prob (bool): Whether probabilities should be returned. (default:
                 :obj:`False`)
         """
-        pred = self(edge_index, additional_info,edge_label_index,edge_weight = edge_weight).sigmoid()
+        if edge_label_index is None:
+            edge_label_index = edge_index
+        self.cache_embedding(edge_index, additional_info, edge_weight)
+        return self.score_link(edge_label_index, prob=prob)
+
+    ##########################################################################################################
+    # 추론 : 최종 embedding table 을 한번 계산해 두고 edge 점수는 table 의 dot product 로만 계산
+    ##########################################################################################################
+
+    @torch.no_grad()
+    def cache_embedding(self, edge_index: Adj, additional_info:dict=None, edge_weight: OptTensor = None) -> Tensor:
+        """ edge_index graph 로 (dropout 없이) 전달한 최종 node embedding table 을 저장한다.
+
+        parameter 가 바뀌면 (학습 step 이후) 다시 불러야 한다.
+        """
+        self.embedding_table = self.get_embedding(edge_index, additional_info, edge_weight, training=False)
+        return self.embedding_table
+
+    def clear_embedding(self):
+        self.embedding_table = None
+        self.input_cache = None
+
+    @torch.no_grad()
+    def score_link(self, edge_label_index: Tensor, prob: bool = True, batch_size: int = 1 << 16) -> Tensor:
+        """ cache 된 embedding table 에서 edge_label_index 의 (src, dst) dot product 를 batch_size 개씩 계산한다. """
+        if self.embedding_table is None:
+            raise RuntimeError("cache_embedding 을 먼저 호출해야 합니다")
+        table = self.embedding_table
+        pred = torch.empty(edge_label_index.size(1), device=table.device)
+        for start in range(0, edge_label_index.size(1), batch_size):
+            src, dst = edge_label_index[:, start:start + batch_size]
+            pred[start:start + batch_size] = torch.einsum("ij,ij->i", table[src], table[dst])
+        pred = pred.sigmoid()
         return pred if prob else pred.round()
 
+    def score_pairs(self, user_node: Tensor, item_node: Tensor, prob: bool = True) -> Tensor:
+        """ 새 (user, item) 쌍의 점수. graph 전달 없이 cache 된 table 에서 쌍마다 O(embedding_dim)
+
+        node 번호는 common.graph.NodeIndex 의 user_index / item_index 결과 (item 은 n_user 부터)
+        """
+        return self.score_link(torch.stack([user_node, item_node]), prob=prob)
+
     def link_pred_loss(self, pred: Tensor, edge_label: Tensor,
                     **kwargs) -> Tensor:
         r"""Computes the model loss for a link prediction objective via the
@@ -388,49 +510,8 @@ class MyLightGCNWithAttn(MyLightGCN):
 
         return (h, c)
 
-    def get_embedding(self, edge_index: Adj, additional_info:dict=None, edge_weight: OptTensor = None, 
-                      training:bool=True, dropout:float=0.2) -> Tensor:
-
-        item_embedding_weight = self.item_embedding.weight 
-        tag_embedding_weight  = self.tag_embedding(additional_info["item"]["KnowledgeTag"] )
-        testId_embedding_weight  = self.testId_embedding(additional_info["item"]["testId"] )
-        bigcat_embedding_weight  = self.bigcat_embedding(additional_info["item"]["big_category"] )
-        daydiff_embedding_weight = self.daydiff_embedding(additional_info["user"]["day_diff"])
-        total_embedding_weight = item_embedding_weight
-
-        embedding_list = [
-                          tag_embedding_weight,
-                          testId_embedding_weight,
-                          bigcat_embedding_weight,
-                         ]
-        
-        """ projection 0.821
-        embed = torch.cat( [item_embedding_weight,
-                    tag_embedding_weight,
-                    testId_embedding_weight,
-                    bigcat_embedding_weight])
-        
-        x = self.comb_proj(embed)
-        """
-
-        for emb in embedding_list : 
-            total_embedding_weight = total_embedding_weight + emb
-
-        total_embedding_weight = total_embedding_weight / (len(embedding_list) + 1 )
-
-        # total_embedding_weight = (  item_embedding_weight + tag_embedding_weight + testId_embedding_weigsht + bigcat_embedding_weight ) / 4
-
-        # if additional_info["item"] is not None :
-        #     for k in additional_info["item"] :
-        #         self.item_embedding( additional_info["item"][k] )
-
-        x = torch.cat([
-            ( self.user_embedding.weight + daydiff_embedding_weight ) / 2, 
-              total_embedding_weight
-            # total_embedding_weight
-            ],dim= 0)
-        
-                      
+    def layer0_embedding(self, x: Tensor) -> Tensor:
+        """ layer 0 항으로 x 대신 attention 을 통과한 embedding 을 사용 """
         q = self.query(x)
         k = self.key(x)
         v = self.value(x)
@@ -440,20 +521,15 @@ class MyLightGCNWithAttn(MyLightGCN):
         out = self.ln2(out)
         
         # x = self.embedding.weight
-        out = out * self.alpha[0]
+        return out * self.alpha[0]
 
-        # edge drop out
-        edge_index, edge_mask = self.dropout_edge(edge_index,p=dropout,training=training)
-        edge_weight = torch.masked_select(edge_weight, edge_mask) 
-        self.edge_mask = edge_mask
-        
-        for i in range(self.num_layers):
-            # edge_weight =  torch.ones(edge_index.size(1))
-            # print(edge_weight)
-            # print(edge_weight.shape)
-            x = self.convs[i](x, edge_index, edge_weight = edge_weight ) # edge_weight
-            out = out + x * self.alpha[i + 1]
-        return out
+    def get_embedding(self, edge_index: Adj, additional_info:dict=None, edge_weight: OptTensor = None, 
+                      training:bool=True, dropout:float=0.2) -> Tensor:
+        x = self.input_embedding(additional_info)
+        out = self.layer0_embedding(x)
+
+        # edge drop out + layer 전달 : 정규화 행렬은 edge_index 별로 cache
+        return self.propagate(x, edge_index, edge_weight, training=training, dropout=dropout, out=out)
 
 
 ##############################################################################################################
@@ -475,6 +551,57 @@ def build( num_info:dict, weight=None, logger=None, **kwargs):
         return model
 
 
+@torch.no_grad()
+def grow(model, num_info:dict):
+    """ num_info 크기로 embedding table 을 늘린 새 model (warm start)
+
+    GraphStore.append 는 새 user / item / 범주 값을 기존 순서 뒤에 붙이므로
+    기존 행은 그대로 복사하고 새 행만 reset_parameters 의 초기값을 쓴다.
+    """
+    new_model = type(model)(num_info, model.embedding_dim, model.num_layers, alpha=model.alpha.clone()).to(model.alpha.device)
+    new_state = new_model.state_dict()
+    for name, value in model.state_dict().items():
+        if new_state[name].shape == value.shape:
+            new_state[name].copy_(value)
+        else:
+            new_state[name][:value.size(0)].copy_(value)
+    return new_model
+
+
+def train_minibatch_epoch(model, optimizer, train_data, additional_data=None, batch_size=1024,
+                          refresh_every=None, training=True, dropout=0.2):
+    """ supervised edge 를 섞어서 batch_size 개씩 학습하는 epoch 하나. batch 마다 optimizer step 한번
+
+    graph (propagation 에 쓰는 edge) 는 train_data 의 edge 전체이고, edge dropout 은 epoch 마다 한번 뽑는다.
+    layer 2 이상에 쓰는 history embedding 은 refresh_every batch 마다 다시 계산한다. (None 이면 epoch 마다 한번)
+
+    Returns:
+        epoch 평균 loss
+    """
+    edge, label, edge_weight = train_data["edge"], train_data["label"], train_data["weight"]
+    n_edge = label.size(0)
+    n_batch = (n_edge + batch_size - 1) // batch_size
+    refresh_every = refresh_every or n_batch
+
+    values = model.edge_values(edge, edge_weight, training=training, dropout=dropout)
+    perm = torch.randperm(n_edge, device=edge.device)
+    total_loss = 0.
+    for b in range(n_batch):
+        if b % refresh_every == 0:
+            model.refresh_history(edge, additional_data, edge_weight, values)
+
+        eids = perm[b * batch_size:(b + 1) * batch_size]
+        pred = model.forward_batch(edge, additional_data, edge[:, eids], edge_weight, values)
+        loss = model.link_pred_loss(pred, label[eids])
+
+        optimizer.zero_grad()
+        loss.backward()
+        optimizer.step()
+        total_loss += loss.item() * eids.size(0)
+
+    return total_loss / n_edge
+
+
 def train(
     model,
     train_data,
@@ -483,168 +610,282 @@ def train(
     n_epoch=100,
     early_stop = 10,
     learning_rate=0.01,
+    batch_size=None,
+    refresh_every=None,
+    eval_every=1,
     use_wandb=False,
     weight=None,
     logger=None,
 ):
-    model.train()
-
-    optimizer = torch.optim.Adam(model.parameters(), lr=learning_rate)
-
+    """ model 하나를 학습한다. (edge dropout 없이, best_model.pt / last_model.pt 저장) """
     if not os.path.exists(weight):
         os.makedirs(weight)
 
     if valid_data is None:
-        eids = np.arange(len(train_data["label"]))
-        eids = np.random.permutation(eids)[:1000]
-        edge, label = train_data["edge"], train_data["label"]
-        weight = train_data["weight"]
-        label = label.to("cpu").detach().numpy()
-        weight = weight.to("cpu").detach().numpy()
-        valid_data = dict(edge=edge[:, eids], label=label[eids], weight=weight[eids])
+        valid_data = sample_valid_data(train_data)
 
     logger.info(f"Training Started : n_epoch={n_epoch}")
-    best_auc, best_epoch = 0, -1
-    stop_check = 0 
-    
-    for e in range(n_epoch):
-        # forward
-        pred = model(train_data["edge"],additional_data,edge_weight = train_data["weight"])
-        loss = model.link_pred_loss(pred, train_data["label"])
+    return fit(model, train_data, additional_data, valid_data,
+               n_epoch=n_epoch, early_stop=early_stop, learning_rate=learning_rate, dropout=0.0,
+               batch_size=batch_size, refresh_every=refresh_every, eval_every=eval_every,
+               use_wandb=use_wandb, weight=weight, logger=logger)
 
-        # backward
-        optimizer.zero_grad()
-        loss.backward()
-        optimizer.step()
-
-        with torch.no_grad():
-            # additional_data 는 user 와 item 을 key 로 가지고, 각 key 의 값도 dictionary 
-            # { user: {} , item : { knowledgeTag : tensor, ...} }
-            prob = model.predict_link(valid_data["edge"],additional_data,edge_weight = valid_data["weight"],prob=True)
-            prob = prob.detach().cpu().numpy()
-            acc = accuracy_score(valid_data["label"].cpu().numpy(), prob > 0.5)
-            auc = roc_auc_score(valid_data["label"].cpu().numpy(), prob)
-            logger.info(
-                f" * In epoch {(e+1):04}, loss={loss:.03f}, acc={acc:.03f}, AUC={auc:.03f}"
-            )
-            if use_wandb:
-                import wandb
-
-                wandb.log(dict(loss=loss, acc=acc, auc=auc))
-
-        if weight:
-            if auc > best_auc:
-                logger.info(
-                    f" * In epoch {(e+1):04}, loss={loss:.03f}, acc={acc:.03f}, AUC={auc:.03f}, Best AUC"
-                )
-                best_auc, best_epoch = auc, e
-                torch.save(
-                    {"model": model.state_dict(), "epoch": e + 1},
-                    os.path.join(weight, f"best_model.pt"),
-                )
-                stop_check = 0 
-            elif auc < best_auc : 
-                stop_check += 1 
-            
-            if ( stop_check >= early_stop ):
-                break
 
-            
-    torch.save(
-        {"model": model.state_dict(), "epoch": e + 1},
-        os.path.join(weight, f"last_model.pt"),
-    )
-    logger.info(f"Best Weight Confirmed : {best_epoch+1}'th epoch")
+# fold process 가 받는 학습 설정과 data. process 마다 initializer 로 한번 받는다
+# (spawn process 로 넘길 때 cpu tensor 는 shared memory 로 옮겨지므로 edge tensor 는 복사하지 않고 읽기 전용으로 공유)
+_FOLD_STATE = {}
 
 
 def train_kfold(
-    model,
+    num_info,
     train_data,
     additional_data = None,
     valid_data=None,
+    build_kwargs=None,
     n_epoch=100,
     early_stop = 10,
     learning_rate=0.01,
     dropout=0.2,
+    batch_size=None,
+    refresh_every=None,
+    eval_every=1,
+    n_jobs=1,
+    seed=42,
     use_wandb=False,
     weight=None,
     logger=None,
 ):
-    model.train()
+    """ fold 마다 build(num_info, **build_kwargs) 로 새 model / optimizer 를 만들어 학습한다.
 
-    optimizer = torch.optim.Adam(model.parameters(), lr=learning_rate)
+    n_jobs > 1 이면 (cpu 에서) fold 를 process pool 에서 동시에 학습하고, process 별 thread 수는 cpu 수 / n_jobs 로 제한한다.
+    checkpoint 는 fold 별로 best_model_{k}.pt / last_model_{k}.pt 로 저장한다.
 
+    Returns:
+        fold 별 metric dict list (fold, best_auc, best_epoch, n_epoch)
+    """
     if not os.path.exists(weight):
         os.makedirs(weight)
 
     if valid_data is None:
-        eids = np.arange(len(train_data["label"]))
-        eids = np.random.permutation(eids)[:1000]
-        edge, label = train_data["edge"], train_data["label"]
-        weight = train_data["weight"]
-        label = label.to("cpu").detach().numpy()
-        weight = weight.to("cpu").detach().numpy()
-        valid_data = [dict(edge=edge[:, eids], label=label[eids], weight=weight[eids])]
+        valid_data = [sample_valid_data(cur_train_data) for cur_train_data in train_data]
+
+    device = train_data[0]["edge"].device
+    n_jobs = min(n_jobs, len(train_data))
+    if n_jobs > 1 and device.type != "cpu":
+        logger.info("fold 병렬 학습은 cpu 에서만 사용합니다 : n_jobs=1")
+        n_jobs = 1
+
+    state = dict(
+        num_info=num_info,
+        train_data=train_data,
+        additional_data=additional_data,
+        valid_data=valid_data,
+        build_kwargs=dict(build_kwargs or {}),
+        fit_kwargs=dict(n_epoch=n_epoch, early_stop=early_stop, learning_rate=learning_rate, dropout=dropout,
+                        batch_size=batch_size, refresh_every=refresh_every, eval_every=eval_every, weight=weight,
+                        # 여러 process 에서 wandb.log 를 하지 않도록 병렬일 때는 fold 결과만 부모에서 기록
+                        use_wandb=use_wandb and n_jobs == 1),
+        device=device,
+        seed=seed,
+        logger=logger,
+        threads=max(1, (os.cpu_count() or 1) // n_jobs),
+    )
 
-    logger.info(f"Training Started : n_epoch={n_epoch}")
-    best_auc, best_epoch = 0, -1
-    stop_check = 0 
-    
-    for k_idx ,( cur_train_data, cur_valid_data) in enumerate(zip(train_data,valid_data)) :
-        # forward
-        best_auc, best_epoch = 0, -1
-        stop_check = 0 
-        
-        for e in range(n_epoch):
-            pred = model(cur_train_data["edge"],additional_data,edge_weight = cur_train_data["weight"],training=True, dropout=dropout)
-            loss = model.link_pred_loss(pred, cur_train_data["label"])
+    logger.info(f"Training Started : n_epoch={n_epoch}, n_fold={len(train_data)}, n_jobs={n_jobs}")
+    if n_jobs == 1:
+        _init_fold_process(state, set_threads=False)
+        try:
+            results = [_run_fold(k_idx) for k_idx in range(len(train_data))]
+        finally:
+            _FOLD_STATE.clear()
+    else:
+        ctx = torch.multiprocessing.get_context("spawn")
+        with ctx.Pool(n_jobs, initializer=_init_fold_process, initargs=(state,)) as pool:
+            results = pool.map(_run_fold, range(len(train_data)))
+
+    for result in results:
+        logger.info(f" * Fold {result['fold']} : best AUC={result['best_auc']:.03f} in epoch {result['best_epoch']}")
+    mean_auc = np.mean([result["best_auc"] for result in results])
+    logger.info(f"K-fold mean best AUC : {mean_auc:.03f}")
+    if use_wandb:
+        import wandb
+
+        if n_jobs > 1:
+            # 병렬일 때는 epoch 별 기록이 없으므로 sweep metric (auc) 도 fold 평균으로 기록
+            for result in results:
+                wandb.log({f"fold_{result['fold']}_auc": result["best_auc"]})
+            wandb.log(dict(auc=mean_auc))
+        wandb.log(dict(kfold_auc=mean_auc))
+    return results
+
+
+def sample_valid_data(train_data, n_valid=1000):
+    """ valid data 가 없을 때 train edge 에서 임의로 뽑은 n_valid 개 """
+    eids = np.random.permutation(len(train_data["label"]))[:n_valid]
+    return dict(edge=train_data["edge"][:, eids], label=train_data["label"][eids], weight=train_data["weight"][eids])
+
+
+def _init_fold_process(state, set_threads=True):
+    _FOLD_STATE.update(state)
+    if set_threads:
+        torch.set_num_threads(state["threads"])
+
+
+def _run_fold(k_idx):
+    """ fold 하나를 새 model 로 학습하고 metric 을 돌려준다. """
+    state = _FOLD_STATE
+    torch.manual_seed(state["seed"] + k_idx)
+    np.random.seed(state["seed"] + k_idx)
+    logger = state["logger"].getChild(f"fold_{k_idx}")
+
+    model = build(state["num_info"], logger=logger, **state["build_kwargs"]).to(state["device"])
+    result = fit(model, state["train_data"][k_idx], state["additional_data"], state["valid_data"][k_idx],
+                 suffix=f"_{k_idx}", logger=logger, **state["fit_kwargs"])
+    result["fold"] = k_idx
+    return result
+
+
+def fit(
+    model,
+    train_data,
+    additional_data=None,
+    valid_data=None,
+    n_epoch=100,
+    early_stop=10,
+    learning_rate=0.01,
+    dropout=0.2,
+    batch_size=None,
+    refresh_every=None,
+    eval_every=1,
+    use_wandb=False,
+    weight=None,
+    suffix="",
+    best_score=0,
+    logger=None,
+):
+    """ train / valid edge 한 쌍의 학습 loop. 새 Adam optimizer 로 학습하고 best_model{suffix}.pt 를 저장한다.
+
+    valid 는 eval_every epoch 마다 (와 마지막 epoch) 계산하고, early_stop 은 AUC 가 나빠진 평가 횟수다.
+    AUC / acc 는 valid tensor 가 있는 device 에서 계산하고, checkpoint 는 background thread 에서 저장한다.
+    best_score 보다 AUC 가 좋아야 best_model 을 저장하고, loss 가 NaN / inf 가 되면 저장 없이 학습을 멈춘다.
+    """
+    model.train()
+    optimizer = torch.optim.Adam(model.parameters(), lr=learning_rate)
+    scheduler = ValidationScheduler(eval_every=eval_every, patience=early_stop, best_score=best_score)
+    saver = CheckpointSaver()
+    diverged = False
+
+    for e in range(n_epoch):
+        if batch_size:
+            loss = train_minibatch_epoch(model, optimizer, train_data, additional_data,
+                                         batch_size=batch_size, refresh_every=refresh_every,
+                                         training=True, dropout=dropout)
+        else:
+            pred = model(train_data["edge"],additional_data,edge_weight = train_data["weight"],training=True, dropout=dropout)
+            loss = model.link_pred_loss(pred, train_data["label"])
 
             # backward
             optimizer.zero_grad()
             loss.backward()
             optimizer.step()
+            loss = loss.item()
 
-            with torch.no_grad():
-                # additional_data 는 user 와 item 을 key 로 가지고, 각 key 의 값도 dictionary 
-                # { user: {} , item : { knowledgeTag : tensor, ...} }
-                prob = model.predict_link(cur_valid_data["edge"],additional_data,edge_weight = cur_valid_data["weight"],prob=True)
-                prob = prob.detach().cpu().numpy()
-                acc = accuracy_score(cur_valid_data["label"].cpu().numpy(), prob > 0.5)
-                auc = roc_auc_score(cur_valid_data["label"].cpu().numpy(), prob)
-                logger.info(
-                    f" * In epoch {(e+1):04}, loss={loss:.03f}, acc={acc:.03f}, AUC={auc:.03f}"
-                )
-                if use_wandb:
-                    import wandb
+        if not math.isfinite(loss):
+            # NaN weight 등으로 발산한 model 은 평가 / 저장하지 않는다
+            logger.warning(f" * In epoch {(e+1):04}, loss={loss}, stop training")
+            diverged = True
+            break
 
-                    wandb.log(dict(loss=loss, acc=acc, auc=auc))
+        if not scheduler.should_eval(e, n_epoch):
+            continue
 
+        with torch.no_grad():
+            # 학습과 같은 graph (train edge 전체) 로 전달한 embedding 으로 valid edge 를 점수화
+            acc, auc = evaluate(model, valid_data, additional_data, graph=train_data)
+            logger.info(
+                f" * In epoch {(e+1):04}, loss={loss:.03f}, acc={acc:.03f}, AUC={auc:.03f}"
+            )
+            if use_wandb:
+                import wandb
+
+                wandb.log(dict(loss=loss, acc=acc, auc=auc, epoch=e + 1))
+
+        if scheduler.update(auc, e):
+            logger.info(
+                f" * In epoch {(e+1):04}, loss={loss:.03f}, acc={acc:.03f}, AUC={auc:.03f}, Best AUC"
+            )
             if weight:
-                if auc > best_auc:
-                    logger.info(
-                        f" * In epoch {(e+1):04}, loss={loss:.03f}, acc={acc:.03f}, AUC={auc:.03f}, Best AUC"
-                    )
-                    best_auc, best_epoch = auc, e
-                    torch.save(
-                        {"model": model.state_dict(), "epoch": e + 1},
-                        os.path.join(weight, f"best_model_{k_idx}.pt"),
-                    )
-                    stop_check = 0 
-                elif auc < best_auc : 
-                    stop_check += 1 
-                
-                if ( stop_check >= early_stop ):
-                    break
-
-                
-        torch.save(
+                saver.save(
+                    {"model": model.state_dict(), "epoch": e + 1},
+                    os.path.join(weight, f"best_model{suffix}.pt"),
+                )
+        if scheduler.stop:
+            break
+
+    model.clear_embedding()
+    if weight and not diverged:
+        saver.save(
             {"model": model.state_dict(), "epoch": e + 1},
-            os.path.join(weight, f"last_model.pt"),
+            os.path.join(weight, f"last_model{suffix}.pt"),
         )
-        logger.info(f"Best Weight Confirmed : {best_epoch+1}'th epoch")
+    saver.close()
+    logger.info(f"Best Weight Confirmed : {scheduler.best_epoch+1}'th epoch")
+    return dict(best_auc=scheduler.best_score, best_epoch=scheduler.best_epoch + 1, n_epoch=e + 1)
+
+
+@torch.no_grad()
+def evaluate(model, valid_data, additional_data=None, graph=None):
+    """ valid edge 의 (acc, AUC)
+
+    embedding 은 graph (학습에 쓴 edge dict, 기본은 valid_data) 로 전달하고 valid edge 는 점수만 계산한다.
+    additional_data 는 user 와 item 을 key 로 가지고, 각 key 의 값도 dictionary
+    { user: {} , item : { knowledgeTag : tensor, ...} }
+    """
+    graph = valid_data if graph is None else graph
+    prob = model.predict_link(graph["edge"], additional_data, valid_data["edge"], edge_weight=graph["weight"], prob=True)
+    return accuracy(valid_data["label"], prob), roc_auc(valid_data["label"], prob)
 
-def inference(model, data,additional_data, logger=None):
+
+@torch.no_grad()
+def ensemble_embedding(models, edge_index, additional_info=None, edge_weight=None) -> Tensor:
+    """ fold model 들의 최종 embedding table 을 [k, n_nodes, d] 로 쌓는다.
+
+    graph 가 같으므로 정규화 행렬은 첫 model 의 cache 하나를 모든 fold 가 같이 사용한다. (fold 마다 다시 만들지 않음)
+    fold 의 x 를 column 으로 이어 붙여 [n_nodes, k*d] 를 한번에 곱하는 것은 CPU CSR SpMM 에서 오히려 느려서
+    전달은 fold 별로 한다.
+    """
+    propagation = models[0].propagation
+    matrix = propagation.adjacency(edge_index, edge_weight).matrix
+    tables = []
+    for model in models:
+        x = model.input_embedding(additional_info)
+        tables.append(propagation.propagate(x, matrix, model.alpha, model.layer0_embedding(x)))
+    return torch.stack(tables)
+
+
+def ensemble_inference(models, data, additional_data, graph=None, logger=None):
+    """ fold model 들의 data edge 확률 평균. 모든 fold 의 점수를 einsum 한번으로 계산한다.
+
+    graph 는 학습 graph (답이 있는 edge 전체) 를 넘긴다. None 이면 data edge 만으로 전달하므로 test 처럼 user 당 edge 가
+    하나뿐인 data 에서는 학습 때와 전혀 다른 embedding 이 된다.
+    """
+    for model in models:
+        model.eval()
+    graph = data if graph is None else graph
+    table = ensemble_embedding(models, graph["edge"], additional_data, graph["weight"])
+    src, dst = data["edge"]
+    pred = torch.einsum("knd,knd->kn", table[:, src], table[:, dst]).sigmoid()
+    return pred.mean(dim=0)
+
+
+def inference(model, data,additional_data, graph=None, logger=None):
+    """ graph (전달에 쓰는 edge, 기본은 data) 로 model 의 embedding table 을 한번 만들고 data 의 edge 를 점수화
+
+    ensemble_inference 와 같이 graph 는 학습 graph 를 넘긴다.
+    """
     model.eval()
-    with torch.no_grad():
-        pred = model.predict_link(data["edge"],additional_data,edge_weight=data["weight"], prob=True)
-        return pred
+    graph = data if graph is None else graph
+    model.cache_embedding(graph["edge"], additional_data, graph["weight"])
+    pred = model.score_link(data["edge"], prob=True)
+    model.clear_embedding()
+    return pred
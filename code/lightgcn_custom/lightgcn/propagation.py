@@ -0,0 +1,151 @@
+from typing import Optional
+
+import torch
+from torch import Tensor
+
+try:
+    # torch_sparse 가 있으면 (requirements 의 torch 1.11 환경) SparseTensor 의 CSR SpMM 을 사용
+    from torch_sparse import SparseTensor
+except ImportError:
+    SparseTensor = None
+
+
+def _csr(crow: Tensor, col: Tensor, value: Tensor, size) -> Tensor:
+    if SparseTensor is not None:
+        return SparseTensor(rowptr=crow, col=col, value=value, sparse_sizes=size, is_sorted=True)
+    return torch.sparse_csr_tensor(crow, col, value, size)
+
+
+class NormalizedAdjacency:
+    """ LightGCN propagation 에 사용하는 정규화된 인접 행렬 D^-1/2 A D^-1/2 (CSR SparseTensor / torch.sparse_csr)
+
+    LGConv 는 forward 마다 edge_index 로 degree 정규화와 scatter 를 다시 계산하므로
+    CSR 구조 (crow / col index) 는 한번만 만들어 두고 layer 하나를 SpMM 한번으로 계산한다.
+    edge dropout 때는 CSR 구조를 그대로 두고 버려진 edge 의 weight 를 0 으로 바꿔 값만 다시 계산한다.
+    (버려진 edge 는 degree 와 message 에 모두 빠지므로 edge 를 지운 graph 에 LGConv 를 쓴 결과와 같다)
+
+    Args:
+        edge_index (Tensor): [2, n_edge] (user node, item node)
+        num_nodes (int): 전체 node 수 (n_user + n_item)
+        edge_weight (Tensor, optional): edge 별 weight. None 이면 1
+        symmetric (bool): True 면 반대 방향 edge 를 추가해서 user <-> item 양방향으로 전달한다.
+            user -> item 한 방향 edge 만 LGConv 에 넘기면 user 의 (들어오는) degree 가 0 이라
+            정규화 값이 모두 0 이 되어 layer 출력이 0 이 된다.
+    """
+
+    def __init__(self, edge_index: Tensor, num_nodes: int, edge_weight: Optional[Tensor] = None,
+                 symmetric: bool = True):
+        src, dst = edge_index
+        weight = torch.ones(src.size(0), device=src.device) if edge_weight is None else edge_weight.float()
+        self.n_edge = src.size(0)
+        self.num_nodes = num_nodes
+        self.symmetric = symmetric
+
+        if symmetric:
+            src, dst = torch.cat([src, dst]), torch.cat([dst, src])
+            weight = torch.cat([weight, weight])
+
+        # message 는 src -> dst 로 전달되므로 CSR 의 행은 dst, 열은 src
+        self.order = torch.argsort(dst * num_nodes + src)
+        self.src, self.dst = src[self.order], dst[self.order]
+        self.weight = weight[self.order]
+
+        counts = torch.bincount(self.dst, minlength=num_nodes)
+        self.crow = torch.cat([counts.new_zeros(1), torch.cumsum(counts, 0)])
+        self.value = self.normalize(self.weight)
+        self.matrix = self.build(self.value)
+
+    def normalize(self, weight: Tensor) -> Tensor:
+        """ CSR 순서의 edge weight 를 D^-1/2 w D^-1/2 값으로 """
+        deg = torch.zeros(self.num_nodes, device=weight.device).scatter_add_(0, self.dst, weight)
+        deg_inv_sqrt = deg.pow(-0.5)
+        deg_inv_sqrt[torch.isinf(deg_inv_sqrt)] = 0
+        return deg_inv_sqrt[self.src] * weight * deg_inv_sqrt[self.dst]
+
+    def build(self, value: Tensor) -> Tensor:
+        return _csr(self.crow, self.src, value, (self.num_nodes, self.num_nodes))
+
+    def values(self, edge_mask: Optional[Tensor] = None) -> Tensor:
+        """ edge_mask (원래 edge 순서의 bool) 에서 False 인 edge 를 뺀 정규화 값. mask 가 없으면 cache 된 값 """
+        if edge_mask is None:
+            return self.value
+        if self.symmetric:
+            edge_mask = torch.cat([edge_mask, edge_mask])
+        return self.normalize(self.weight * edge_mask[self.order])
+
+    def masked(self, edge_mask: Tensor) -> Tensor:
+        """ edge_mask 에서 False 인 edge 를 뺀 정규화 행렬 """
+        return self.build(self.values(edge_mask))
+
+    def rows(self, nodes: Tensor, value: Optional[Tensor] = None) -> Tensor:
+        """ 정규화 행렬에서 nodes 의 행만 잘라낸 [len(nodes), num_nodes] CSR (mini-batch 의 1-hop 전달용)
+
+        잘라낸 행의 edge 수만큼만 계산하므로 batch 의 node 가 적으면 전체 graph 보다 훨씬 작다.
+        """
+        value = self.value if value is None else value
+        start = self.crow[nodes]
+        counts = self.crow[nodes + 1] - start
+        crow = torch.cat([counts.new_zeros(1), torch.cumsum(counts, 0)])
+        # 행 별 [start, start + count) 구간의 edge 번호
+        eid = torch.arange(int(crow[-1]), device=nodes.device) + torch.repeat_interleave(start - crow[:-1], counts)
+        return _csr(crow, self.src[eid], value[eid], (nodes.size(0), self.num_nodes))
+
+
+class Propagation:
+    """ edge_index 별로 NormalizedAdjacency 를 cache 해 두고 multi-layer propagation 을 계산한다.
+
+    같은 edge_index / edge_weight tensor 가 다시 들어오면 (매 epoch 의 train edge) 정규화 행렬을 다시 만들지 않는다.
+    """
+
+    def __init__(self, num_nodes: int, symmetric: bool = True, max_cache: int = 4):
+        self.num_nodes = num_nodes
+        self.symmetric = symmetric
+        self.max_cache = max_cache
+        self.cache = []
+
+    def adjacency(self, edge_index: Tensor, edge_weight: Optional[Tensor] = None) -> NormalizedAdjacency:
+        for cached_index, cached_weight, adj in self.cache:
+            if cached_index is edge_index and cached_weight is edge_weight:
+                return adj
+
+        adj = NormalizedAdjacency(edge_index, self.num_nodes, edge_weight, self.symmetric)
+        # tensor 참조를 같이 들고 있어서 id 가 다른 tensor 에 재사용되지 않는다
+        self.cache = [(edge_index, edge_weight, adj)] + self.cache[:self.max_cache - 1]
+        return adj
+
+    def clear(self):
+        self.cache = []
+
+    @staticmethod
+    def propagate(x: Tensor, matrix: Tensor, alpha: Tensor, out: Optional[Tensor] = None) -> Tensor:
+        """ out = alpha[0] * x0 + sum_i alpha[i] * A^i x, layer 수는 len(alpha) - 1
+
+        out 을 주면 layer 0 항으로 x * alpha[0] 대신 사용한다.
+        """
+        out = x * alpha[0] if out is None else out
+        for i in range(1, alpha.size(0)):
+            x = matrix @ x
+            out = out + x * alpha[i]
+        return out
+
+    @staticmethod
+    def history(x: Tensor, matrix: Tensor, num_layers: int) -> list:
+        """ layer 1 ~ num_layers-1 의 전체 node embedding A^i x (mini-batch 학습에서 주기적으로 다시 계산해 두는 값) """
+        layers = []
+        for _ in range(num_layers - 1):
+            x = matrix @ x
+            layers.append(x)
+        return layers
+
+    @staticmethod
+    def propagate_rows(x: Tensor, rows: Tensor, history: list, alpha: Tensor, out: Tensor) -> Tensor:
+        """ rows (batch node 의 정규화 행렬 행) 로 batch node 의 alpha 가중합만 계산한다.
+
+        layer 1 은 현재 x 를 전달해서 정확히 계산하고 (gradient 도 전달),
+        layer i >= 2 는 저장해 둔 history[i-2] (A^(i-1) x) 를 한번 전달한다. history 를 다시 계산한 직후에는 전체 propagation 과 같다.
+        out 은 batch node 의 layer 0 항.
+        """
+        out = out + (rows @ x) * alpha[1]
+        for i, h in enumerate(history):
+            out = out + (rows @ h) * alpha[i + 2]
+        return out
@@ -1,5 +1,6 @@
 import os
 import random
+from concurrent.futures import ThreadPoolExecutor
 
 import numpy as np
 import torch
@@ -41,3 +42,85 @@ def class2dict(f):
     return dict(
         (name, getattr(f, name)) for name in dir(f) if not name.startswith("__")
     )
+
+def accuracy(label, prob, threshold=0.5):
+    """ sklearn accuracy_score(label, prob > threshold) 를 tensor 가 있는 device 에서 계산 """
+    return ((prob > threshold) == label.bool()).double().mean().item()
+
+
+def roc_auc(label, prob):
+    """ sklearn roc_auc_score 와 같은 값 (같은 prob 는 평균 순위) 을 tensor 가 있는 device 에서 계산
+
+    Mann-Whitney U : (정답 row 의 순위 합 - n_pos (n_pos + 1) / 2) / (n_pos * n_neg)
+    """
+    label = label.bool()
+    n_pos = label.sum().double()
+    n_neg = label.numel() - n_pos
+    _, inverse, counts = torch.unique(prob, sorted=True, return_inverse=True, return_counts=True)
+    end = torch.cumsum(counts, 0).double()
+    rank = (end - (counts.double() - 1) / 2)[inverse]
+    return ((rank[label].sum() - n_pos * (n_pos + 1) / 2) / (n_pos * n_neg)).item()
+
+
+class ValidationScheduler:
+    """ eval_every epoch 마다 (마지막 epoch 포함) 평가하고, early stop patience 는 평가 횟수로 센다.
+
+    best_score 를 주면 (이어서 학습할 때 불러온 model 의 AUC) 그보다 좋아야 best 로 본다.
+    """
+
+    def __init__(self, eval_every=1, patience=10, best_score=0):
+        self.eval_every = max(1, eval_every or 1)
+        self.patience = patience
+        self.best_score, self.best_epoch = best_score, -1
+        self.bad_evals = 0
+
+    def should_eval(self, epoch, n_epoch):
+        return (epoch + 1) % self.eval_every == 0 or epoch + 1 == n_epoch
+
+    def update(self, score, epoch):
+        """ 평가 결과를 반영하고 best 이면 True """
+        if score > self.best_score:
+            self.best_score, self.best_epoch = score, epoch
+            self.bad_evals = 0
+            return True
+        if score < self.best_score:
+            self.bad_evals += 1
+        return False
+
+    @property
+    def stop(self):
+        return self.bad_evals >= self.patience
+
+
+class CheckpointSaver:
+    """ torch.save 를 background thread 에서 실행한다.
+
+    저장 요청 시점에 tensor 를 cpu 로 복사해 두므로 이후 optimizer step 이 저장 내용을 바꾸지 않는다.
+    대기 중인 저장은 하나만 두고, 다음 저장 / close 때 이전 저장이 끝나기를 기다린다.
+    """
+
+    def __init__(self):
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.pending = None
+
+    def save(self, state, path):
+        state = _to_cpu(state)
+        self.wait()
+        self.pending = self.executor.submit(torch.save, state, path)
+
+    def wait(self):
+        if self.pending is not None:
+            self.pending.result()
+            self.pending = None
+
+    def close(self):
+        self.wait()
+        self.executor.shutdown()
+
+
+def _to_cpu(state):
+    if isinstance(state, torch.Tensor):
+        return state.detach().to("cpu", copy=True)
+    if isinstance(state, dict):
+        return type(state)((k, _to_cpu(v)) for k, v in state.items())
+    return state
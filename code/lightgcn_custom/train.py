@@ -3,7 +3,7 @@ import pandas as pd
 import torch
 from config import CFG, logging_conf,sweep_conf
 from lightgcn.datasets import prepare_dataset, prepare_dataset_kfold
-from lightgcn.models import build, train, train_kfold
+from lightgcn.models import train, train_kfold
 from lightgcn.utils import class2dict, get_logger,setSeeds
 
 logger = get_logger(logging_conf)
@@ -20,12 +20,14 @@ def main():
 
     if 1 == CFG.kfold : 
         train_data, valid_data,test_data, num_info, additional_data = prepare_dataset(
-            device, CFG.basepath, verbose=CFG.loader_verbose, logger=logger.getChild("data")
+            device, CFG.basepath, verbose=CFG.loader_verbose, logger=logger.getChild("data"),
+            elo_state=CFG.elo_state, graph_store=CFG.graph_store,
         )
 
     else:
         train_data, valid_data,test_data, num_info, additional_data = prepare_dataset_kfold(
-            device, CFG.basepath, verbose=CFG.loader_verbose, logger=logger.getChild("data")
+            device, CFG.basepath, verbose=CFG.loader_verbose, logger=logger.getChild("data"),
+            elo_state=CFG.elo_state, graph_store=CFG.graph_store,
         )
     
     logger.info("[1/1] Data Preparing - Done")
@@ -39,26 +41,20 @@ def main():
             wandb.init(config=class2dict(CFG))
             cur_config = wandb.config
 
-            model = build(
-                num_info,
+            # fold 마다 build 로 새 model 을 만든다
+            build_kwargs = dict(
                 embedding_dim=cur_config.embedding_dim,
                 num_layers=cur_config.num_layers,
                 alpha=CFG.alpha,
-                logger=logger.getChild("build"),
                 **CFG.build_kwargs
             )
-            model.to(device)
-            wandb.watch(model)
-
-            if CFG.user_wandb:
-                wandb.watch(model)
 
             logger.info("[2/2] Model Building - Done")
 
             logger.info("[3/3] Model Training - Start")
             # train(
             train_kfold(
-                model,
+                num_info,
                 train_data,
                 additional_data,
                 valid_data,
@@ -66,6 +62,11 @@ def main():
                 early_stop = CFG.early_stop,
                 learning_rate=cur_config.learning_rate,
                 dropout=cur_config.dropout,
+                batch_size=CFG.batch_size,
+                refresh_every=CFG.refresh_every,
+                eval_every=CFG.eval_every,
+                build_kwargs=build_kwargs,
+                n_jobs=CFG.n_jobs,
                 use_wandb= CFG.user_wandb,
                 weight=cur_config.weight_basepath,
                 logger=logger.getChild("train"),
@@ -79,32 +80,31 @@ def main():
             import wandb
             wandb.init(**CFG.wandb_kwargs, config=class2dict(CFG))
 
-        model = build(
-                num_info,
+        # fold 마다 build 로 새 model 을 만든다
+        build_kwargs = dict(
                 embedding_dim=CFG.embedding_dim,
                 num_layers=CFG.num_layers,
                 alpha=CFG.alpha,
-                logger=logger.getChild("build"),
                 **CFG.build_kwargs
             )
-            
-        model.to(device)
-
-        if CFG.user_wandb:
-            wandb.watch(model)
 
         logger.info("[2/2] Model Building - Done")
 
         logger.info("[3/3] Model Training - Start")
         # train(
         train_kfold(
-            model,
+            num_info,
             train_data,
             additional_data,
             valid_data,
             n_epoch=CFG.n_epoch,
             early_stop = CFG.early_stop,
             learning_rate=CFG.learning_rate,
+            batch_size=CFG.batch_size,
+            refresh_every=CFG.refresh_every,
+            eval_every=CFG.eval_every,
+            build_kwargs=build_kwargs,
+            n_jobs=CFG.n_jobs,
             use_wandb=CFG.user_wandb,
             weight=CFG.weight_basepath,
             logger=logger.getChild("train"),
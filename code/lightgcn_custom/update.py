@@ -0,0 +1,116 @@
+import math
+import os
+
+import torch
+from config import CFG, logging_conf
+from lightgcn.datasets import GraphStore, load_new_data
+from lightgcn.models import build, evaluate, fit, grow
+from lightgcn.utils import get_logger, setSeeds
+
+logger = get_logger(logging_conf)
+use_cuda = torch.cuda.is_available() and CFG.use_cuda_if_available
+device = torch.device("cuda" if use_cuda else "cpu")
+
+
+def main():
+    """ 새 interaction 을 저장된 graph 에 이어 붙이고, fold model 을 마지막 checkpoint 에서 몇 epoch 만 더 학습한다.
+
+    train.py 로 전체 학습을 다시 하지 않고 (graph_store 와 elo_state 가 train.py 에서 저장되어 있어야 함)
+    새 user / item 은 embedding table 뒤에 행을 추가해서 (models.grow) 학습한다.
+    fine-tuning 은 weight_basepath/update 에 checkpoint 와 갱신된 Elo snapshot 을 쓰고, 모든 fold 가 끝난 뒤에
+    불러온 model 보다 valid AUC 가 좋은 fold 만 checkpoint 를 바꾸고 graph_store 와 elo_state 를 저장한다.
+    """
+    # 새 edge 의 weight 가 저장된 edge 와 같은 Elo 기준이 되도록 train.py 의 snapshot 에서 이어서 계산해야 한다
+    if CFG.elo_state is None or not os.path.exists(CFG.elo_state):
+        raise FileNotFoundError(f"Elo snapshot 이 없습니다 (CFG.elo_state={CFG.elo_state}). "
+                                "elo_state 를 설정하고 train.py 를 다시 실행해 주세요.")
+
+    setSeeds()
+    logger.info("Task Started")
+
+    logger.info("[1/3] Graph Update - Start")
+    staging = os.path.join(CFG.weight_basepath, "update")
+    os.makedirs(staging, exist_ok=True)
+    store = GraphStore.load(CFG.graph_store)
+    old_num_info, n_stored_edge = store.num_info, store.n_edge
+    # 갱신된 Elo snapshot 은 staging 에 두었다가 graph_store 와 같이 바꾼다 (중간에 실패하면 elo_state 유지)
+    staged_elo = os.path.join(staging, os.path.basename(CFG.elo_state))
+    new_data = load_new_data(CFG.update_file, CFG.elo_state, elo_save_path=staged_elo)
+    n_new_user, n_new_item, n_new_edge = store.append(new_data)
+    # 이미 있던 (user, item) 은 새 interaction 으로 바뀌었으므로 새 edge 는 마지막 n_new_edge 개
+    n_old_edge = store.n_edge - n_new_edge
+    logger.info(f"new user : {n_new_user}, new item : {n_new_item}, new edge : {n_new_edge}, "
+                f"replaced edge : {n_stored_edge - n_old_edge}, total edge : {store.n_edge}")
+
+    additional_data = store.side_information(device)
+    # 새로 들어온 edge 의 일부로 valid (새 edge 가 10 개 미만이면 전체 edge 에서), valid edge 는 train 에서 뺀다
+    train_data, valid_data = store.split_new(n_old_edge, CFG.update_valid_ratio, device=device, min_new=10)
+    logger.info("[1/3] Graph Update - Done")
+
+    logger.info("[2/3] Model Building - Start")
+    model_list = []
+    for k_idx in range(CFG.kfold):
+        model = build(
+            old_num_info,
+            embedding_dim=CFG.embedding_dim,
+            num_layers=CFG.num_layers,
+            alpha=CFG.alpha,
+            weight=f"{CFG.weight}_{k_idx}.pt",
+            logger=logger.getChild("build"),
+            **CFG.build_kwargs
+        )
+        model_list.append(grow(model, store.num_info).to(device))
+    logger.info("[2/3] Model Building - Done")
+
+    logger.info("[3/3] Model Fine-tuning - Start")
+    fallback = {}
+    for k_idx, model in enumerate(model_list):
+        staged = os.path.join(staging, f"best_model_{k_idx}.pt")
+        if os.path.exists(staged):
+            os.remove(staged)  # 지난 update 에서 남은 checkpoint
+
+        # 불러온 model (새 node 행만 추가) 의 AUC 보다 좋아야 best_model 을 저장한다
+        _, base_auc = evaluate(model, valid_data, additional_data, graph=train_data)
+        logger.info(f" * Fold {k_idx} : loaded model AUC={base_auc:.03f}")
+        if old_num_info != store.num_info:
+            # 더 좋아지지 않아도 embedding table 크기는 store 와 맞아야 하므로 학습 전 state 를 둔다
+            fallback[k_idx] = {name: value.detach().cpu().clone() for name, value in model.state_dict().items()}
+
+        fit(
+            model,
+            train_data,
+            additional_data,
+            valid_data,
+            n_epoch=CFG.update_epoch,
+            early_stop=CFG.early_stop,
+            learning_rate=CFG.learning_rate,
+            batch_size=CFG.batch_size,
+            refresh_every=CFG.refresh_every,
+            eval_every=CFG.eval_every,
+            weight=staging,
+            suffix=f"_{k_idx}",
+            best_score=base_auc if math.isfinite(base_auc) else 0,
+            logger=logger.getChild(f"update_{k_idx}"),
+        )
+
+    # 모든 fold 의 fine-tuning 이 끝난 뒤에 checkpoint, graph store, Elo snapshot 을 바꾼다
+    for k_idx in range(CFG.kfold):
+        staged = os.path.join(staging, f"best_model_{k_idx}.pt")
+        target = f"{CFG.weight}_{k_idx}.pt"
+        if os.path.exists(staged):
+            os.replace(staged, target)
+            logger.info(f" * Fold {k_idx} : checkpoint updated")
+        elif k_idx in fallback:
+            torch.save({"model": fallback[k_idx], "epoch": 0}, target)
+            logger.info(f" * Fold {k_idx} : no improvement, keep loaded weights (embedding rows added)")
+        else:
+            logger.info(f" * Fold {k_idx} : no improvement, checkpoint kept")
+    store.save(CFG.graph_store)
+    os.replace(staged_elo, CFG.elo_state)
+    logger.info("[3/3] Model Fine-tuning - Done")
+
+    logger.info("Task Complete")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+""" common.elo snapshot test
+
+test row (answerCode == -1) 는 snapshot 에 반영하지 않고, 같은 row 가 정답과 함께 다시 들어오면 그때 반영되는지 확인한다.
+실행 : python -m pytest tests  (code/ 에서 실행)
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from common.elo import EloEstimator, estimate_elo
+
+
+def interactions():
+    """ user 3 명, item 4 개. 마지막 row 는 처음 보는 user 의 test row """
+    rows = [
+        (0, "A001", 1, "2020-01-01 00:00:00"),
+        (0, "A002", 0, "2020-01-01 00:01:00"),
+        (1, "A001", 0, "2020-01-01 00:00:00"),
+        (1, "A003", 1, "2020-01-01 00:02:00"),
+        (2, "A002", 1, "2020-01-01 00:03:00"),
+        (2, "A004", 1, "2020-01-01 00:04:00"),
+        (3, "A003", 0, "2020-01-01 00:05:00"),
+    ]
+    return pd.DataFrame(rows, columns=["userID", "assessmentItemID", "answerCode", "Timestamp"])
+
+
+def reference_prob(df):
+    """ 정답을 아는 row 만으로 처음부터 추정한 정답 확률 (처음 보는 user / item 은 parameter 0) """
+    known = df[df["answerCode"] >= 0]
+    estimator = EloEstimator().fit(known["userID"], known["assessmentItemID"], known["answerCode"])
+    return estimator.predict(df["userID"], df["assessmentItemID"])
+
+
+def test_unanswered_row_is_applied_with_real_answer(tmp_path):
+    state_path = str(tmp_path / "elo_state.npz")
+    df = interactions()
+
+    test_df = df.copy()
+    test_df.loc[[5, 6], "answerCode"] = -1
+    prob = estimate_elo(test_df, state_path=state_path)
+    np.testing.assert_allclose(prob, reference_prob(test_df))
+    assert len(EloEstimator.load(state_path).applied) == 5
+
+    prob = estimate_elo(df, state_path=state_path)
+    np.testing.assert_allclose(prob, reference_prob(df))
+    assert len(EloEstimator.load(state_path).applied) == len(df)
+
+
+def test_unanswered_row_is_not_applied_twice(tmp_path):
+    state_path = str(tmp_path / "elo_state.npz")
+    test_df = interactions()
+    test_df.loc[6, "answerCode"] = -1
+
+    first = estimate_elo(test_df, state_path=state_path)
+    second = estimate_elo(test_df, state_path=state_path)
+    np.testing.assert_allclose(first, second)
+    np.testing.assert_allclose(first, reference_prob(test_df))
+
+
+def test_save_false_keeps_snapshot(tmp_path):
+    state_path = str(tmp_path / "elo_state.npz")
+    df = interactions()
+    estimate_elo(df.iloc[:5], state_path=state_path)
+    before = EloEstimator.load(state_path)
+
+    # snapshot 은 그대로 두고, 새 row 까지 반영한 확률만 계산
+    prob = estimate_elo(df, state_path=state_path, save=False)
+    np.testing.assert_allclose(prob, reference_prob(df))
+    after = EloEstimator.load(state_path)
+    np.testing.assert_array_equal(after.applied, before.applied)
+    np.testing.assert_array_equal(after.theta, before.theta)
+
+
+def test_save_path_leaves_state_path(tmp_path):
+    state_path, staged = str(tmp_path / "elo_state.npz"), str(tmp_path / "staging" / "elo_state.npz")
+    df = interactions()
+    estimate_elo(df.iloc[:5], state_path=state_path)
+
+    estimate_elo(df, state_path=state_path, save_path=staged)
+    assert len(EloEstimator.load(state_path).applied) == 5
+    assert len(EloEstimator.load(staged).applied) == len(df)
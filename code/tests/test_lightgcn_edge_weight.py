@@ -0,0 +1,68 @@
+""" lightgcn_custom edge weight (elo + solved_time) test
+
+preprocessing_data 는 user 별 중앙값으로도 채우지 못한 solved_time (row 1개 user, 모든 간격이 4 시간 초과인 user) 을
+0 으로 채운다. prepare_dataset 이 저장하는 graph 의 weight 가 이 값으로 고정되어 있는지 확인한다.
+실행 : python -m pytest tests  (code/ 에서 실행)
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("sklearn")
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "lightgcn_custom")))
+from lightgcn.datasets import GraphStore, prepare_dataset, preprocessing_data
+
+COLUMNS = ["userID", "assessmentItemID", "testId", "answerCode", "Timestamp", "KnowledgeTag"]
+
+
+def interactions():
+    """ (user, item 번호, answerCode, Timestamp) 와 그 row 의 기대 solved_time
+
+    - user 0 : row 1개 -> 중앙값도 NaN -> 0
+    - user 1 : 30초, 400초 (5분 초과 -> 0), 마지막 row 는 (30, 400) 의 중앙값 215
+    - user 2 : 간격이 모두 4 시간 초과 -> NaN -> 0
+    - user 3 : 20초, 40초, 마지막 row 는 중앙값 30
+    """
+    rows = [
+        (0, 1, 1, "2020-01-01 10:00:00", 0),
+        (1, 1, 1, "2020-01-01 10:00:00", 30),
+        (1, 2, 0, "2020-01-01 10:00:30", 0),
+        (1, 3, 1, "2020-01-01 10:07:10", 215),
+        (2, 1, 0, "2020-01-01 00:00:00", 0),
+        (2, 2, 1, "2020-01-01 05:00:00", 0),
+        (2, 3, 1, "2020-01-01 10:00:00", 0),
+        (3, 1, 1, "2020-01-02 09:00:00", 20),
+        (3, 2, 1, "2020-01-02 09:00:20", 40),
+        (3, 3, 0, "2020-01-02 09:01:00", 30),
+    ]
+    df = pd.DataFrame([(u, f"A010001{i:03d}", "A010000001", a, t, 100 + i) for u, i, a, t, _ in rows], columns=COLUMNS)
+    return df, np.array([row[-1] for row in rows], dtype=np.float64)
+
+
+def test_preprocessing_solved_time_is_filled():
+    df, expected = interactions()
+    data = preprocessing_data(df.copy())
+    np.testing.assert_array_equal(data["solved_time"].to_numpy(), expected)
+
+
+def test_prepare_dataset_edge_weight(tmp_path):
+    df, expected = interactions()
+    df.to_csv(tmp_path / "train_data.csv", index=False)
+    # test 는 user 마다 마지막 문항 하나 (answerCode -1)
+    test = pd.DataFrame([(u, "A010001009", "A010000001", -1, "2020-01-03 00:00:00", 109) for u in range(4)], columns=COLUMNS)
+    test.to_csv(tmp_path / "test_data.csv", index=False)
+
+    store_path = str(tmp_path / "weight" / "graph_store.npz")
+    prepare_dataset("cpu", str(tmp_path), verbose=False, graph_store=store_path)
+    store = GraphStore.load(store_path)
+
+    # store 의 edge 는 (userID, Timestamp) 순서의 답이 있는 row, weight = elo + solved_time
+    data = preprocessing_data(pd.concat([df, test], ignore_index=True))
+    answered = data[data.answerCode >= 0]
+    assert np.isfinite(store.weight).all()
+    np.testing.assert_allclose(store.weight, (answered["elo"] + expected).to_numpy(dtype=np.float32), rtol=1e-6)
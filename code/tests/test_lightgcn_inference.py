@@ -0,0 +1,76 @@
+""" lightgcn_custom 추론 test
+
+fold ensemble (ensemble_inference) 이 학습 graph 로 전달한 fold 별 inference 의 평균과 같은지,
+그리고 graph 를 넘기면 test edge 가 아니라 그 graph 로 전달하는지 확인한다.
+실행 : python -m pytest tests  (code/ 에서 실행)
+"""
+import os
+import sys
+
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("torch_geometric")
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "lightgcn_custom")))
+from lightgcn.models import MyLightGCN, ensemble_inference, evaluate, inference
+from lightgcn.utils import roc_auc
+
+
+def make_graph(n_users=50, n_items=40, n_edges=600, seed=0):
+    """ 학습 graph (답이 있는 edge), user 마다 edge 하나인 test edge, 부가 정보 """
+    generator = torch.Generator().manual_seed(seed)
+    users = torch.randint(0, n_users, (n_edges,), generator=generator)
+    items = torch.randint(0, n_items, (n_edges,), generator=generator)
+    train_data = dict(edge=torch.stack([users, items + n_users]),
+                      label=torch.randint(0, 2, (n_edges,), generator=generator),
+                      weight=torch.rand(n_edges, generator=generator) + 1)
+    test_items = torch.randint(0, n_items, (n_users,), generator=generator)
+    test_data = dict(edge=torch.stack([torch.arange(n_users), test_items + n_users]),
+                     label=torch.randint(0, 2, (n_users,), generator=generator),
+                     weight=torch.rand(n_users, generator=generator) + 1)
+
+    num_info = dict(n_user=n_users, n_item=n_items, n_tags=10, n_testids=8, n_bigcat=3)
+    additional_info = dict(
+        user=dict(day_diff=torch.randint(0, 5, (n_users,), generator=generator)),
+        item=dict(KnowledgeTag=torch.randint(0, 10, (n_items,), generator=generator),
+                  testId=torch.randint(0, 8, (n_items,), generator=generator),
+                  big_category=torch.randint(0, 3, (n_items,), generator=generator)),
+    )
+    return train_data, test_data, num_info, additional_info
+
+
+def make_models(num_info, n_fold=3):
+    models = []
+    for k in range(n_fold):
+        torch.manual_seed(k)
+        models.append(MyLightGCN(num_info, embedding_dim=8, num_layers=2))
+    return models
+
+
+def test_ensemble_matches_fold_inference_on_train_graph():
+    train_data, test_data, num_info, additional_info = make_graph()
+    models = make_models(num_info)
+
+    pred = ensemble_inference(models, test_data, additional_info, graph=train_data)
+    fold_pred = torch.stack([inference(model, test_data, additional_info, graph=train_data) for model in models])
+    torch.testing.assert_close(pred, fold_pred.mean(dim=0), rtol=1e-5, atol=1e-6)
+
+
+def test_inference_propagates_over_given_graph():
+    """ test edge 만으로 전달한 결과 (graph 를 넘기지 않은 경우) 와는 달라야 한다 """
+    train_data, test_data, num_info, additional_info = make_graph()
+    models = make_models(num_info)
+
+    on_train = ensemble_inference(models, test_data, additional_info, graph=train_data)
+    on_test = ensemble_inference(models, test_data, additional_info)
+    assert not torch.allclose(on_train, on_test)
+
+
+def test_evaluate_uses_train_graph():
+    train_data, valid_data, num_info, additional_info = make_graph(seed=1)
+    model = make_models(num_info, n_fold=1)[0]
+
+    _, auc = evaluate(model, valid_data, additional_info, graph=train_data)
+    prob = inference(model, valid_data, additional_info, graph=train_data)
+    assert auc == pytest.approx(roc_auc(valid_data["label"], prob))
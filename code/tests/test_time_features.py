@@ -0,0 +1,140 @@
+""" common.time_features 와 기존 pandas 구현의 동등성 test
+
+기존 preprocessing 코드 (Timedelta .apply / groupby().apply(lambda)) 를 그대로 reference 로 두고
+한 row 짜리 group, clip 을 넘는 간격, 날짜 경계 (자정 / 정확히 하루 / 음수 간격) 에서 값을 비교한다.
+실행 : python -m pytest tests  (code/ 에서 실행)
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from common.time_features import (day_diff, group_codes, next_group_diff, solved_time,
+                                  to_epoch_seconds)
+
+
+def reference_solved_time_shift(df):
+    """ 기존 preprocessing_hyunho / lgbm feature_engineering """
+    diff_shift = df.loc[:, ['userID', 'testId', 'Timestamp', 'same_item_cnt']].groupby(['userID', 'testId', 'same_item_cnt']).diff().shift(-1)
+    return diff_shift['Timestamp'].apply(lambda x: x.total_seconds())
+
+
+def reference_solved_time(df):
+    """ 기존 preprocessing_yujin / lightgcn_custom preprocessing_data """
+    df["solved_time"] = df.groupby('userID')["Timestamp"].diff().shift(-1).dt.seconds
+    df.loc[df["solved_time"] > 14400, "solved_time"] = np.nan
+    fill_mean_func = lambda g: g["solved_time"].fillna(g["solved_time"].median())
+    return df.groupby('userID').apply(fill_mean_func).reset_index()["solved_time"]
+
+
+def reference_day_diff(df):
+    """ 기존 lightgcn_custom preprocessing_data """
+    diff = df.loc[:, ['userID', 'Timestamp']].groupby('userID').diff().fillna(pd.Timedelta(seconds=0))
+    diff = diff['Timestamp'].apply(lambda x: x.days)
+    return diff.apply(lambda x: x if x <= 3 and x >= 0 else 4)
+
+
+def edge_case_frame():
+    """ userID / Timestamp 순으로 정렬된 경계 case 모음
+
+    - user 0 : row 1개 (solved_time / solved_time_shift 는 NaN, day_diff 는 0)
+    - user 1 : 자정을 넘는 2초 간격, 정확히 하루 간격, 하루 + 30초 (.dt.seconds 는 30)
+    - user 2 : clip(14400초) 을 넘는 간격과 딱 clip 인 간격, 3일 23시간 / 4일 간격
+    - user 3 : 모든 간격이 clip 을 넘어서 median 도 NaN
+    - user 4 : 같은 testId 를 same_item_cnt 로 나눠서 다시 푼 경우
+    """
+    rows = [
+        (0, "A001", 1, "2020-01-01 10:00:00"),
+        (1, "A001", 1, "2020-01-01 23:59:59"),
+        (1, "A001", 1, "2020-01-02 00:00:01"),
+        (1, "A001", 1, "2020-01-03 00:00:01"),
+        (1, "A002", 1, "2020-01-04 00:00:31"),
+        (2, "A003", 1, "2020-01-01 00:00:00"),
+        (2, "A003", 1, "2020-01-01 05:00:00"),
+        (2, "A003", 1, "2020-01-01 09:00:00"),
+        (2, "A003", 1, "2020-01-01 09:00:40"),
+        (2, "A004", 1, "2020-01-05 08:00:40"),
+        (2, "A004", 1, "2020-01-09 08:00:40"),
+        (3, "A005", 1, "2020-01-01 00:00:00"),
+        (3, "A005", 1, "2020-01-01 06:00:00"),
+        (3, "A005", 1, "2020-01-01 12:00:00"),
+        (4, "A006", 1, "2020-01-01 00:00:00"),
+        (4, "A006", 1, "2020-01-01 00:00:20"),
+        (4, "A006", 2, "2020-01-01 00:01:00"),
+        (4, "A006", 2, "2020-01-01 00:01:50"),
+    ]
+    df = pd.DataFrame(rows, columns=["userID", "testId", "same_item_cnt", "Timestamp"])
+    df["Timestamp"] = pd.to_datetime(df["Timestamp"])
+    return df
+
+
+def random_frame(n_rows=3000, n_users=60, seed=0):
+    """ 대부분 수십초 간격이고 일부는 몇 시간 ~ 며칠 간격인 interaction. user 의 절반은 row 1개 """
+    rng = np.random.default_rng(seed)
+    users = np.sort(np.concatenate([rng.integers(0, n_users, n_rows), np.arange(n_users, 2 * n_users)]))
+    n_rows = len(users)
+
+    gap = rng.exponential(40, n_rows).astype(np.int64)
+    jump = rng.random(n_rows) < 0.1
+    gap[jump] = rng.integers(3600, 6 * 86400, jump.sum())
+    seconds = np.datetime64("2020-01-01T00:00:00").astype(np.int64) + np.cumsum(gap)
+
+    return pd.DataFrame({
+        "userID": users,
+        "testId": pd.Series(rng.integers(0, 20, n_rows)).map("A{:03d}".format),
+        "same_item_cnt": rng.integers(1, 3, n_rows),
+        "Timestamp": pd.to_datetime(seconds.astype("datetime64[s]")),
+    })
+
+
+def assert_same(new, ref):
+    np.testing.assert_array_equal(np.asarray(new, dtype=np.float64), np.asarray(ref, dtype=np.float64))
+
+
+@pytest.fixture(params=["edge", "random"])
+def frame(request):
+    return edge_case_frame() if request.param == "edge" else random_frame()
+
+
+def test_solved_time_shift(frame):
+    codes = group_codes(frame, ['userID', 'testId', 'same_item_cnt'])
+    assert_same(next_group_diff(codes, to_epoch_seconds(frame['Timestamp'])), reference_solved_time_shift(frame))
+
+
+def test_solved_time(frame):
+    assert_same(solved_time(frame, 'userID', clip=14400), reference_solved_time(frame.copy()))
+
+
+def test_day_diff(frame):
+    assert_same(day_diff(frame, 'userID', max_day=3), reference_day_diff(frame))
+
+
+def test_unsorted_rows():
+    """ user 가 섞여 있고 user 안에서 시간이 거꾸로 가는 (음수 간격) row 도 기존과 같은 값 """
+    df = random_frame(seed=1).sample(frac=1, random_state=0).reset_index(drop=True)
+    codes = group_codes(df, ['userID', 'testId', 'same_item_cnt'])
+    assert_same(next_group_diff(codes, to_epoch_seconds(df['Timestamp'])), reference_solved_time_shift(df))
+    assert_same(day_diff(df, 'userID', max_day=3), reference_day_diff(df))
+
+
+def test_edge_case_values():
+    """ 경계 case 의 기대값을 직접 확인 """
+    df = edge_case_frame()
+    elapsed = solved_time(df, 'userID', clip=14400)
+    # 한 row 짜리 user 는 median 을 구할 값이 없어서 NaN
+    assert np.isnan(elapsed[0])
+    # 자정을 넘는 2초, 하루 + 30초 는 하루 미만 부분인 30초
+    assert elapsed[1] == 2 and elapsed[3] == 30
+    # 5 시간 간격은 clip 을 넘어서 user 2 의 median (14400, 40, 0) 인 40 으로 채운다
+    assert elapsed[5] == 40 and elapsed[6] == 14400
+    # 모든 간격이 clip 을 넘는 user 는 NaN 으로 남는다
+    assert np.isnan(elapsed[11:14]).all()
+
+    days = day_diff(df, 'userID', max_day=3)
+    assert days[0] == 0
+    assert list(days[1:5]) == [0, 0, 1, 1]
+    # 3일 23시간 은 3, 정확히 4일 은 max_day + 1
+    assert list(days[9:11]) == [3, 4]